@@ -0,0 +1,120 @@
+import re
+from typing import Callable
+from langchain_core.documents import Document
+from src.app.utilities.ProcessEnum import ScoreType
+from src.app.utilities.tokenizer import TokenCounter
+from src.helper.config import get_settings, Settings
+
+WORD_PATTERN = re.compile(r"\w+")
+# Words per shingle when comparing chunks
+SHINGLE_SIZE = 3
+
+
+def shingles(text: str) -> set[tuple[str, ...]]:
+    """Set of consecutive word triples of the text, used to compare chunks lexically."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Fits the retrieved context and the chat history into token budgets before they reach the prompt.
+    Chunks below the score threshold and near-duplicates of better chunks are dropped; the others are
+    picked by maximal marginal relevance (MMR) over word shingles until the token budget or
+    CONTEXT_MAX_DOCUMENTS is reached, so short chunks leave room for more of them than long ones.
+    History keeps the most recent messages that fit its own budget.
+    """
+
+    def __init__(self, formatter: Callable[[Document], str]):
+        self.settings: Settings = get_settings()
+        self.formatter = formatter
+        self.token_counter = TokenCounter(self.settings.CONTEXT_TOKENIZER or None)
+        self.max_tokens = self.settings.CONTEXT_MAX_TOKENS
+        self.history_max_tokens = self.settings.CONTEXT_HISTORY_MAX_TOKENS
+        self.max_documents = self.settings.CONTEXT_MAX_DOCUMENTS
+        self.min_score = self.settings.CONTEXT_MIN_SCORE
+        self.min_rerank_score = self.settings.CONTEXT_MIN_RERANK_SCORE
+        self.dedup_threshold = self.settings.CONTEXT_DEDUP_THRESHOLD
+        self.mmr_lambda = self.settings.CONTEXT_MMR_LAMBDA
+
+    def _is_relevant(self, doc: Document) -> bool:
+        if "rerank_score" in doc.metadata:
+            return doc.metadata["rerank_score"] >= self.min_rerank_score
+        if doc.metadata.get("score_type") == ScoreType.SIMILARITY.value:
+            return doc.metadata.get("relevance_score", 0.0) >= self.min_score
+        # Distances (Euclid, Manhattan) have no scale-free threshold, and fused (RRF) scores only
+        # rank the hits of one search: neither can be compared to a minimum similarity
+        return True
+
+    def _select(self, candidates: list[Document], budget: int) -> tuple[list[Document], int]:
+        """MMR selection of candidates (best first) within budget tokens; returns the picks and the tokens used."""
+        candidate_shingles = [shingles(doc.page_content) for doc in candidates]
+        # Candidates arrive best first; their rank is the relevance, whatever kind of score produced it
+        relevance = [1 - rank / len(candidates) for rank in range(len(candidates))]
+        remaining = list(range(len(candidates)))
+        picked: list[int] = []
+        used = 0
+
+        while remaining and len(picked) < self.max_documents:
+            best, best_value = None, float("-inf")
+            for i in list(remaining):
+                redundancy = max(
+                    (jaccard(candidate_shingles[i], candidate_shingles[j]) for j in picked), default=0.0
+                )
+                if redundancy >= self.dedup_threshold:
+                    remaining.remove(i)
+                    continue
+                value = self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+                if value > best_value:
+                    best, best_value = i, value
+            if best is None:
+                break
+            remaining.remove(best)
+            tokens = self.token_counter.count(self.formatter(candidates[best]))
+            if used + tokens > budget:
+                # A shorter chunk further down may still fit
+                continue
+            picked.append(best)
+            used += tokens
+
+        return [candidates[i] for i in picked], used
+
+    def pack_documents(self, docs: list[Document], chat_history: str = "") -> list[Document]:
+        """Selects the memories and chunks that go into the prompt, memories first."""
+        memories, used = [], 0
+        for doc in docs:
+            if doc.metadata.get("source_type") != "history":
+                continue
+            # The recent messages are already in the prompt as chat history
+            if doc.metadata.get("message", "") in chat_history:
+                continue
+            tokens = self.token_counter.count(self.formatter(doc))
+            if used + tokens <= self.max_tokens:
+                memories.append(doc)
+                used += tokens
+
+        candidates = [
+            doc for doc in docs
+            if doc.metadata.get("source_type") != "history" and self._is_relevant(doc)
+        ]
+        selected, _ = self._select(candidates, self.max_tokens - used)
+        return memories + selected
+
+    def pack_history(self, messages: list[str]) -> str:
+        """Keeps the most recent messages (given oldest first) that fit the history budget."""
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = self.token_counter.count(message)
+            if used + tokens > self.history_max_tokens:
+                break
+            kept.append(message)
+            used += tokens
+        return "\n".join(reversed(kept))
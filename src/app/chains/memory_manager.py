@@ -1,18 +1,21 @@
 import uuid
 import asyncio
+from typing import Optional
 from datetime import datetime, timezone
 from src.app.database.mongo_db import MessageModel
 from src.app.database.mongo_db.schema import Message
 from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
-from src.app.utilities.embeder import Embeder
+from src.app.utilities.query_embedder import QueryEmbedder
+from src.app.utilities.turn_writer import TurnWriter
 from src.helper.config import get_settings
 
 
 class MemoryManager:
-    def __init__(self, message_model: MessageModel, qdrant_model: QdrantdbModel):
+    def __init__(self, message_model: MessageModel, qdrant_model: QdrantdbModel, query_embedder: QueryEmbedder, turn_writer: Optional[TurnWriter] = None):
         self.message_model = message_model
         self.qdrant_model = qdrant_model
-        self.embeder = Embeder()
+        self.query_embedder = query_embedder
+        self.turn_writer = turn_writer
         self.settings = get_settings()
 
     async def save_turn(self, chat_id: str, role: str, content: str):
@@ -20,7 +23,11 @@ class MemoryManager:
         Does two things at the same time:
         1. Stores the message as text in MongoDB.
         2. Converts it to a vector and stores it in Qdrant.
+        With a turn writer, both happen later in a batch and this only journals the turn.
         """
+        if self.turn_writer is not None:
+            await self.turn_writer.add(chat_id, role, content)
+            return True
 
         msg_obj = Message(
             chat_id=chat_id,
@@ -30,7 +37,7 @@ class MemoryManager:
         )
         mongo_task = self.message_model.insert_message(msg_obj)
 
-        vector = self.embeder.embed_text(content)
+        vector = await self.query_embedder.embed(content)
 
         payload = {
             "chat_id": chat_id,
@@ -51,10 +58,10 @@ class MemoryManager:
         await asyncio.gather(mongo_task, qdrant_task)
         return True
 
-    async def get_short_term_memory(self, chat_id: str, limit: int = 6) -> str:
+    async def get_short_term_turns(self, chat_id: str, limit: int = 6) -> list[str]:
         """
         Retrieves the most recent messages for a given chat_id from MongoDB.
-        Returns a formatted string of the conversation history.
+        Returns them formatted as "Role: content", oldest first.
         """
 
         messages = await self.message_model.get_last_messages_by_chat_id(
@@ -62,10 +69,18 @@ class MemoryManager:
             limit=limit
         )
 
-        # Format the messages into a single string
+        # Mongo returns the newest first; the prompt reads the conversation in order
+        messages = messages[::-1]
+        if self.turn_writer is not None:
+            # Turns not written yet are part of the conversation too
+            messages = self.turn_writer.with_pending(chat_id, messages)[-limit:]
         formatted_history = []
         for msg in messages:
             role_prefix = "User" if msg.role == "user" else "Assistant"
             formatted_history.append(f"{role_prefix}: {msg.content}")
-            
-        return "\n".join(formatted_history)
\ No newline at end of file
+
+        return formatted_history
+
+    async def get_short_term_memory(self, chat_id: str, limit: int = 6) -> str:
+        """Returns the most recent messages of a chat as a single formatted string."""
+        return "\n".join(await self.get_short_term_turns(chat_id, limit))
\ No newline at end of file
@@ -19,6 +19,20 @@ rephrase_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
+# First turns have nothing to rephrase; this only keeps the "none" check of the rephrase prompt
+relevance_system_prompt = (
+    "The documents available in this session are: [{file_names}]. "
+    "If the user question is Greeting or ask question not related to documents, just return \"none\". "
+    "Otherwise return \"search\". Return only that one word."
+)
+
+relevance_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", relevance_system_prompt),
+        ("human", "{question}"),
+    ]
+)
+
 
 
 
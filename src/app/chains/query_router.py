@@ -0,0 +1,46 @@
+import re
+from src.app.utilities.ProcessEnum import QueryRoute
+
+# Greetings, thanks, farewells, acknowledgements and questions about the assistant itself
+SMALL_TALK_PHRASE = (
+    r"(?:hi|hello|hey|hiya|yo|howdy|greetings|good (?:morning|afternoon|evening|day)"
+    r"|thanks?(?: you)?(?: (?:so|very) much| a lot)?|thx|ty|cheers|much appreciated"
+    r"|bye|goodbye|see you(?: later| soon)?|good night|take care"
+    r"|ok(?:ay)?|k|cool|great|nice|awesome|perfect|got it|sounds good|no problem|np"
+    r"|who are you|what are you|what is your name|how are you(?: doing)?|how is it going"
+    r"|what can you do|help)"
+)
+SMALL_TALK_PATTERN = re.compile(
+    rf"^{SMALL_TALK_PHRASE}(?: (?:there|again|everyone|all|assistant|bot))?(?: {SMALL_TALK_PHRASE})*$"
+)
+NON_WORD_PATTERN = re.compile(r"[^\w\s]")
+SPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase text without punctuation or emoji and with single spaces."""
+    return SPACE_PATTERN.sub(" ", NON_WORD_PATTERN.sub(" ", text.lower())).strip()
+
+
+def is_small_talk(question: str) -> bool:
+    """Whether the question is only small talk that no document can answer."""
+    return bool(SMALL_TALK_PATTERN.match(normalize(question)))
+
+
+def is_no_search(standalone_question: str) -> bool:
+    """Whether the rephrase LLM answered "none", i.e. judged the question unrelated to the documents."""
+    return normalize(standalone_question) == "none"
+
+
+def checked_question(question: str, verdict: str) -> str:
+    """Standalone question of a first turn: the question itself, or "none" if the relevance check says so."""
+    return "none" if is_no_search(verdict) else question
+
+
+def route_query(question: str, chat_history: str) -> QueryRoute:
+    """Picks the cheapest path that can still answer the question."""
+    if is_small_talk(question):
+        return QueryRoute.SMALL_TALK
+    if not chat_history.strip():
+        return QueryRoute.DIRECT
+    return QueryRoute.REPHRASE
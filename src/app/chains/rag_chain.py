@@ -1,13 +1,22 @@
+import time
+import asyncio
+import logging
 from operator import itemgetter
-from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+from typing import AsyncIterator
+from langchain_core.runnables import RunnableBranch, RunnableGenerator, RunnableLambda, RunnableParallel, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field
-from src.app.chains.prompts import qa_prompt , rephrase_prompt
-from src.app.chains.retriever import get_retriever_runnable
+from src.app.chains.prompts import qa_prompt , rephrase_prompt, relevance_prompt
+from src.app.chains.retriever import Retriever
 from src.app.chains.memory_manager import MemoryManager
-from src.app.database.mongo_db import MessageModel, FileModel
+from src.app.chains.context_packer import ContextPacker
+from src.app.chains.query_router import checked_question, route_query, is_no_search
+from src.app.container import AppContainer
+from src.app.utilities.semantic_cache import file_fingerprint
+from src.app.utilities.ProcessEnum import QueryRoute
 
+logger = logging.getLogger("uvicorn.error")
 
 class ChainInput(BaseModel):
     question: str
@@ -16,13 +25,16 @@ class ChainInput(BaseModel):
 
 
 
-async def get_memory_manager(mongo_client, qdrant_model):
-    """Create a MemoryManager instance with initialized dependencies."""
-    message_model = await MessageModel.create_instance(mongo_client)
-    return MemoryManager(message_model, qdrant_model)
-
+def format_doc_with_citation(doc: Document) -> str:
+    """Format one retrieved document with its citation metadata (filename and page number)."""
+    filename = doc.metadata.get("original_filename", "Unknown File")
+    page = doc.metadata.get("page_number", "N/A")
 
+    source_type = doc.metadata.get("source_type", "document")
 
+    if source_type == "history":
+        return f"{doc.page_content}"
+    return f"[FILE: {filename} | PAGE: {page}]\n{doc.page_content}\n"
 
 
 def format_docs_with_citations(docs: list[Document]) -> str:
@@ -30,88 +42,222 @@ def format_docs_with_citations(docs: list[Document]) -> str:
     Format the retrieved documents to include citation metadata 
     (filename and page number) alongside the text content.
     """
-    formatted_texts = []
-    for doc in docs:
-        filename = doc.metadata.get("original_filename", "Unknown File")
-        page = doc.metadata.get("page_number", "N/A")
-        
-        source_type = doc.metadata.get("source_type", "document")
-        
-        if source_type == "history":
-            formatted_texts.append(f"{doc.page_content}")
-        else:
-            formatted_texts.append(
-                f"[FILE: {filename} | PAGE: {page}]\n{doc.page_content}\n"
-            )
-            
-    return "\n\n".join(formatted_texts)
+    return "\n\n".join(format_doc_with_citation(doc) for doc in docs)
 
 
-def create_full_rag_chain(llm, mongo_client, qdrant_model):
-    """Create a complete RAG chain with memory management and citations."""
+def create_full_rag_chain(llm, container: AppContainer):
+    """Create a complete RAG chain with memory management and citations, on the app's shared dependencies."""
 
-    retriever = get_retriever_runnable(qdrant_model)
+    settings = container.settings
+    query_embedder = container.query_embedder
+    semantic_cache = container.semantic_cache
+    latency_stats = container.latency_stats
+    retriever = Retriever(container.chunk_model, container.vector_store, query_embedder, semantic_cache)
+    memory_manager = MemoryManager(
+        container.message_model, container.vector_store, query_embedder, container.turn_writer
+    )
+    context_packer = ContextPacker(format_doc_with_citation)
+    # Assistant turns being saved after their stream ended; the container awaits them on shutdown
+    pending_saves = container.pending_saves
 
-    async def fetch_file_names(inputs: dict) -> str:
+    async def fetch_chat_files(inputs: dict) -> dict:
+        """Fetch the file names and the fingerprint of the indexed content of the chat in one query."""
         chat_id = inputs["chat_id"]
-        file_model = await FileModel.create_instance(mongo_client)
-        files = await file_model.find_files_by_chat_id(chat_id)
-        return ", ".join([f.original_filename for f in files]) if files else "No files"
+        files = await container.file_model.find_files_by_chat_id(chat_id)
+        return {
+            "file_names": ", ".join([f.original_filename for f in files]) if files else "No files",
+            "file_fingerprint": file_fingerprint(files),
+        }
+
+    def route(inputs: dict) -> str:
+        """Route of the turn: small talk skips rephrasing and retrieval, first turns only check relevance."""
+        if not settings.QUERY_ROUTER_ENABLED:
+            return QueryRoute.REPHRASE.value
+        return route_query(inputs["question"], inputs["chat_history"]).value
+
+    def speculate(inputs: dict) -> bool:
+        """Search the raw question while the LLM rephrases it or checks its relevance; small talk is not searched."""
+        return (
+            settings.SPECULATIVE_RETRIEVAL_ENABLED
+            and inputs["route"] in (QueryRoute.REPHRASE.value, QueryRoute.DIRECT.value)
+        )
+
+    def needs_retrieval(inputs: dict) -> bool:
+        """Small talk, and questions the rephrase LLM judged unrelated to the documents, need no search."""
+        return (
+            inputs["original_inputs"]["route"] != QueryRoute.SMALL_TALK.value
+            and not is_no_search(inputs["standalone_question"])
+        )
+
+    async def lookup_cached_answer(inputs: dict):
+        """Answer of a similar earlier question when the semantic cache keeps answers."""
+        if semantic_cache is None or not semantic_cache.cache_answers or not needs_retrieval(inputs):
+            return None
+        # Hits the embedding cache: the retriever embeds the same standalone question
+        vector = await query_embedder.embed(inputs["standalone_question"])
+        return semantic_cache.lookup_answer(
+            inputs["original_inputs"]["chat_id"], vector, inputs["original_inputs"]["file_fingerprint"]
+        )
     
     async def save_user_input(inputs: dict) -> dict:
         """Save user message to storage."""
-        memory_manager = await get_memory_manager(mongo_client, qdrant_model)
         await memory_manager.save_turn(inputs["chat_id"], "user", inputs["question"])
         return inputs
 
-    async def save_ai_output(inputs: dict) -> str:
+    async def save_ai_output(inputs: dict):
         """Save AI response to storage."""
-        memory_manager = await get_memory_manager(mongo_client, qdrant_model)
         await memory_manager.save_turn(inputs["chat_id"], "assistant", inputs["answer"])
-        return inputs["answer"]
+        if (
+            semantic_cache is not None and semantic_cache.cache_answers
+            and inputs["retrieved"] and inputs["cached_answer"] is None
+        ):
+            vector = await query_embedder.embed(inputs["standalone_question"])
+            semantic_cache.store_answer(
+                inputs["chat_id"], vector, inputs["file_fingerprint"], inputs["answer"]
+            )
+
+    def on_saved(task: asyncio.Task):
+        pending_saves.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to save the assistant turn: {task.exception()}")
+
+    async def stream_answer(chunks: AsyncIterator[dict]) -> AsyncIterator[str]:
+        """
+        Yield the answer tokens as the LLM produces them. The turn is saved once the answer is
+        complete, in the background, so the end of the stream does not wait for MongoDB and Qdrant.
+        """
+        inputs, answer_parts = {}, []
+        first_token_at = None
+        async for chunk in chunks:
+            for key, value in chunk.items():
+                if key != "answer":
+                    inputs[key] = value
+                    continue
+                if value and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                answer_parts.append(value)
+                yield value
+
+        finished_at = time.perf_counter()
+        first_token_at = first_token_at or finished_at
+        first_token_seconds = first_token_at - inputs["started_at"]
+        total_seconds = finished_at - inputs["started_at"]
+        if latency_stats is not None:
+            latency_stats.record(first_token_seconds, total_seconds)
+        logger.info(
+            f"Chat {inputs['chat_id']}: first token after {first_token_seconds:.2f}s, "
+            f"full answer after {total_seconds:.2f}s"
+        )
+
+        inputs["answer"] = "".join(answer_parts)
+        task = asyncio.create_task(save_ai_output(inputs))
+        pending_saves.add(task)
+        task.add_done_callback(on_saved)
 
     async def fetch_chat_history(inputs: dict) -> str:
-        """Fetch recent chat history from MongoDB."""
-        memory_manager = await get_memory_manager(mongo_client, qdrant_model)
-        return await memory_manager.get_short_term_memory(inputs["chat_id"], limit=6)
+        """Fetch recent chat history from MongoDB, trimmed to the history token budget."""
+        turns = await memory_manager.get_short_term_turns(
+            inputs["chat_id"], limit=settings.CONTEXT_HISTORY_MESSAGES
+        )
+        return context_packer.pack_history(turns)
+
+    def pack_context(inputs: dict) -> list[Document]:
+        """Fit the retrieved documents into the context token budget."""
+        return context_packer.pack_documents(inputs["docs"], inputs["chat_history"])
 
     initial_prep = RunnableParallel({
         "chat_history": RunnableLambda(fetch_chat_history),
-        "file_names": RunnableLambda(fetch_file_names),
+        "chat_files": RunnableLambda(fetch_chat_files),
         "question": itemgetter("question"),
         "chat_id": itemgetter("chat_id"),
-        "persona": lambda x: x.get("persona", "expert assistant That Provides Detailed Answers")
-    })
+        "persona": lambda x: x.get("persona", "expert assistant That Provides Detailed Answers"),
+        "started_at": lambda x: time.perf_counter(),
+    }) | RunnableLambda(lambda x: {**x, **x["chat_files"]}) # expose file_names and file_fingerprint
+
+    route_step = RunnablePassthrough.assign(route=RunnableLambda(route))
     
     rephrase_step = RunnableParallel({
-            "standalone_question": rephrase_prompt | llm | StrOutputParser(),
+            "standalone_question": RunnableBranch(
+                (lambda x: x["route"] == QueryRoute.REPHRASE.value, rephrase_prompt | llm | StrOutputParser()),
+                (
+                    # Nothing in the history to resolve: a one-word check keeps off-topic questions unsearched
+                    lambda x: x["route"] == QueryRoute.DIRECT.value,
+                    RunnableParallel({
+                        "question": itemgetter("question"),
+                        "verdict": relevance_prompt | llm | StrOutputParser(),
+                    }) | RunnableLambda(lambda x: checked_question(x["question"], x["verdict"])),
+                ),
+                itemgetter("question"),
+            ),
+            "speculative": RunnableBranch(
+                (
+                    speculate,
+                    RunnableLambda(lambda x: {
+                        "question": x["question"],
+                        "chat_id": x["chat_id"],
+                        "file_fingerprint": x["file_fingerprint"],
+                    }) | RunnableLambda(retriever.search_speculative),
+                ),
+                RunnableLambda(lambda x: None),
+            ),
             "original_inputs": RunnablePassthrough() 
         })
+    # Before retrieval: a cached answer needs no context
+    answer_lookup_step = RunnablePassthrough.assign(cached_answer=RunnableLambda(lookup_cached_answer))
     retrieval_step = RunnableParallel({
-            "context": RunnableLambda(lambda x: {
-                "question": x["standalone_question"],
-                "chat_id": x["original_inputs"]["chat_id"]
-            }) | retriever | RunnableLambda(format_docs_with_citations),
+            "context": RunnableBranch(
+                (lambda x: x["cached_answer"] is not None, RunnableLambda(lambda x: "")),
+                RunnableParallel({
+                    "docs": RunnableBranch(
+                        (
+                            needs_retrieval,
+                            RunnableLambda(lambda x: {
+                                "question": x["standalone_question"],
+                                "chat_id": x["original_inputs"]["chat_id"],
+                                "file_fingerprint": x["original_inputs"]["file_fingerprint"],
+                                "speculative": x["speculative"],
+                            }) | RunnableLambda(retriever.search),
+                        ),
+                        RunnableLambda(lambda x: []),
+                    ),
+                    "chat_history": lambda x: x["original_inputs"]["chat_history"],
+                }) | RunnableLambda(pack_context) | RunnableLambda(format_docs_with_citations),
+            ),
+            "cached_answer": itemgetter("cached_answer"),
+            "retrieved": RunnableLambda(needs_retrieval),
+            "standalone_question": itemgetter("standalone_question"),
+            "file_fingerprint": lambda x: x["original_inputs"]["file_fingerprint"],
             "question": lambda x: x["original_inputs"]["question"],
             "chat_history": lambda x: x["original_inputs"]["chat_history"],
             "file_names": lambda x: x["original_inputs"]["file_names"],
             "persona": lambda x: x["original_inputs"]["persona"],
             "chat_id": lambda x: x["original_inputs"]["chat_id"],
+            "started_at": lambda x: x["original_inputs"]["started_at"],
             "_save_user": RunnableLambda(lambda x: x["original_inputs"]) | RunnableLambda(save_user_input)
         })
     
     response_generation = {
-        "answer": qa_prompt | llm | StrOutputParser(),
+        "answer": RunnableBranch(
+            (lambda x: x["cached_answer"] is not None, itemgetter("cached_answer")),
+            qa_prompt | llm | StrOutputParser(),
+        ),
         "chat_id": itemgetter("chat_id"),
+        "cached_answer": itemgetter("cached_answer"),
+        "retrieved": itemgetter("retrieved"),
+        "standalone_question": itemgetter("standalone_question"),
+        "file_fingerprint": itemgetter("file_fingerprint"),
+        "started_at": itemgetter("started_at"),
     }
     
     # Assemble the complete chain
     full_chain = (
         initial_prep
+        | route_step
         | rephrase_step
+        | answer_lookup_step
         | retrieval_step
         | response_generation
-        | RunnableLambda(save_ai_output)
-    ).with_types(input_type=ChainInput)
+        | RunnableGenerator(stream_answer)
+    ).with_types(input_type=ChainInput, output_type=str)
 
     return full_chain
\ No newline at end of file
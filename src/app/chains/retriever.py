@@ -1,41 +1,134 @@
+import time
 import asyncio
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Optional
+import numpy as np
 from langchain_core.documents import Document
-from langchain_core.runnables import RunnableLambda
 
+from src.app.database.mongo_db import ChunkModel
 from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
-from src.app.utilities.embeder import Embeder
+from src.app.utilities.embeder import get_sparse_embeder
+from src.app.utilities.query_embedder import QueryEmbedder
+from src.app.utilities.reranker import get_reranker
+from src.app.utilities.semantic_cache import SemanticCache
+from src.app.utilities.ProcessEnum import ScoreType
 from src.helper.config import get_settings
 
+# Payload fields read from document points. chunk_content is only present on points indexed before
+# chunk texts moved to Mongo; newer points do not have it, so selecting it costs nothing.
+DOCUMENT_PAYLOAD_FIELDS = ["chunk_hash", "file_id", "original_filename", "page_number", "chunk_content"]
+HISTORY_PAYLOAD_FIELDS = ["content"]
+# Metrics whose scores grow with relevance; Euclid and Manhattan scores are distances
+SIMILARITY_METRICS = ("Cosine", "Dot")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    norms = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / norms) if norms else 0.0
+
+
+def merge_documents(primary: List[Document], secondary: List[Document]) -> List[Document]:
+    """primary followed by the documents of secondary it does not already contain."""
+    def key(doc: Document):
+        if doc.metadata.get("source_type") == "history":
+            return ("history", doc.metadata.get("message"))
+        return ("document", doc.metadata.get("point_id"))
+
+    seen = {key(doc) for doc in primary}
+    return primary + [doc for doc in secondary if key(doc) not in seen]
+
 
 class Retriever:
-    def __init__(self, qdrant_model: QdrantdbModel):
+    def __init__(self, chunk_model: ChunkModel, qdrant_model: QdrantdbModel, query_embedder: QueryEmbedder, semantic_cache: Optional[SemanticCache] = None):
+        self.chunk_model = chunk_model
         self.qdrant_model = qdrant_model
-        self.embeder = Embeder()
+        self.query_embedder = query_embedder
+        self.semantic_cache = semantic_cache
+        self.sparse_embeder = get_sparse_embeder()
+        self.reranker = get_reranker()
         self.settings = get_settings()
+        # With reranking, over-fetch candidates and let the cross-encoder keep the best ones
+        self.documents_limit = self.settings.RERANK_CANDIDATES if self.reranker else 10
+
+    async def _fetch_chunk_texts(self, points) -> dict[str, str]:
+        """Texts of the hit chunks, fetched from Mongo in one query by their hash."""
+        chunk_hashes = [
+            point.payload.get("chunk_hash") for point in points
+            if "chunk_content" not in point.payload and point.payload.get("chunk_hash")
+        ]
+        if not chunk_hashes:
+            return {}
+        return await self.chunk_model.find_contents(chunk_hashes)
 
     async def _search_documents(
-        self, vector: List[float], chat_id: str
+        self, vector: List[float], query: str, chat_id: str
     ) -> List[Document]:
-        """Search for relevant documents in the Qdrant collection based on the query vector and chat_id."""
-        results = await self.qdrant_model.search(
-            collection_name=self.settings.COLLECTION_APP_NAME,
-            query_vector=vector,
-            chat_id=chat_id,
-            limit=10,
-        )
-        return [
+        """
+        Search for relevant documents in the Qdrant collection based on the query vector and chat_id.
+        With hybrid search, dense and keyword (sparse) matches are fused by Qdrant in the same request.
+        """
+        collection_name = self.settings.COLLECTION_APP_NAME
+        if self.sparse_embeder and await self.qdrant_model.has_sparse_vectors(collection_name):
+            sparse_vector = await asyncio.to_thread(self.sparse_embeder.embed_query, query)
+            results = await self.qdrant_model.hybrid_search(
+                collection_name=collection_name,
+                query_vector=vector,
+                sparse_vector=sparse_vector,
+                chat_id=chat_id,
+                limit=self.documents_limit,
+                prefetch_limit=max(self.settings.HYBRID_PREFETCH_LIMIT, self.documents_limit),
+                with_payload=DOCUMENT_PAYLOAD_FIELDS,
+            )
+            score_type = ScoreType.RRF
+        else:
+            results = await self.qdrant_model.search(
+                collection_name=collection_name,
+                query_vector=vector,
+                chat_id=chat_id,
+                limit=self.documents_limit,
+                with_payload=DOCUMENT_PAYLOAD_FIELDS,
+            )
+            score_type = (
+                ScoreType.SIMILARITY if self.settings.DISTANCE_METRIC in SIMILARITY_METRICS else ScoreType.DISTANCE
+            )
+        chunk_texts = await self._fetch_chunk_texts(results.points)
+        docs = [
             Document(
-                page_content=point.payload.get("chunk_content", ""),
+                page_content=point.payload.get("chunk_content") or chunk_texts.get(point.payload.get("chunk_hash"), ""),
                 metadata={
-                    **point.payload.get("metadata", {}),
-                    "relevance_score": point.score,  
+                    "chunk_hash": point.payload.get("chunk_hash"),
+                    "file_id": point.payload.get("file_id"),
+                    "relevance_score": point.score,
+                    "score_type": score_type.value,
                     "original_filename": point.payload.get("original_filename", ""),
                     "page_number": point.payload.get("page_number"),
+                    "point_id": point.id,
                 },
             )
             for point in results.points
         ]
+        if self.reranker:
+            docs = await self.reranker.rerank(query, docs)
+        return docs
+
+    async def _search_documents_cached(
+        self, vector: List[float], query: str, chat_id: str, file_fingerprint: Optional[str]
+    ) -> List[Document]:
+        """Reuse the documents of a similar earlier question of the chat when the semantic cache has them."""
+        if self.semantic_cache is None or file_fingerprint is None:
+            return await self._search_documents(vector, query, chat_id)
+
+        cached_docs = self.semantic_cache.lookup(chat_id, vector, file_fingerprint)
+        if cached_docs is not None:
+            return cached_docs
+
+        started = time.perf_counter()
+        docs = await self._search_documents(vector, query, chat_id)
+        self.semantic_cache.store(chat_id, vector, file_fingerprint, docs, time.perf_counter() - started)
+        return docs
 
     async def _search_history(
         self, vector: List[float], chat_id: str
@@ -46,34 +139,56 @@ class Retriever:
             query_vector=vector,
             chat_id=chat_id,
             limit=2,
+            with_payload=HISTORY_PAYLOAD_FIELDS,
         )
         return [
             Document(
-                page_content=f"[Memory from past conversation]: {point.payload.get('chunk_content', '')}",
-                metadata={"source_type": "history"},
+                page_content=f"[Memory from past conversation]: {point.payload.get('content', '')}",
+                metadata={"source_type": "history", "message": point.payload.get("content", "")},
             )
             for point in results.points
         ]
 
+    async def _search(
+        self, query_vector: List[float], query: str, chat_id: str, file_fingerprint: Optional[str]
+    ) -> List[Document]:
+        docs_task = self._search_documents_cached(query_vector, query, chat_id, file_fingerprint)
+        history_task = self._search_history(query_vector, chat_id)
+
+        docs_results, history_results = await asyncio.gather(docs_task, history_task)
+
+        return history_results + docs_results
+
     async def search(self, inputs: Dict[str, Any]) -> List[Document]:
         """
         takes a question and chat_id, embeds the question, and retrieves relevant documents and conversation history.
-        inputs: dict contains 'question' and 'chat_id'
+        inputs: dict contains 'question' and 'chat_id', and optionally the chat's 'file_fingerprint' for the semantic cache
+        and the 'speculative' result of search_speculative for the raw question
         """
         query = inputs["question"]
         chat_id = inputs["chat_id"]
 
-        query_vector = self.embeder.embed_text(query)
-
-        docs_task = self._search_documents(query_vector, chat_id)
-        history_task = self._search_history(query_vector, chat_id)
-
-        docs_results, history_results = await asyncio.gather(docs_task, history_task)
-
-        return history_results + docs_results
+        query_vector = await self.query_embedder.embed(query)
 
+        speculative = inputs.get("speculative")
+        if speculative is not None:
+            similarity = cosine_similarity(query_vector, speculative["vector"])
+            if similarity >= self.settings.SPECULATIVE_RETRIEVAL_THRESHOLD:
+                return speculative["docs"]
+            logger.debug(f"Speculative retrieval missed (similarity {similarity:.3f}), searching the standalone question")
+            docs = await self._search(query_vector, query, chat_id, inputs.get("file_fingerprint"))
+            # The raw question's hits are already paid for; the context packer drops the ones that do not fit
+            return merge_documents(docs, speculative["docs"])
 
-def get_retriever_runnable(qdrant_model: QdrantdbModel):
-    retriever = Retriever(qdrant_model)
+        return await self._search(query_vector, query, chat_id, inputs.get("file_fingerprint"))
 
-    return RunnableLambda(retriever.search)
+    async def search_speculative(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Retrieval for the raw question, run while the rephrase LLM writes the standalone question.
+        Returns the query vector with the documents, so search can tell whether the standalone
+        question is close enough to reuse them.
+        """
+        query = inputs["question"]
+        query_vector = await self.query_embedder.embed(query)
+        docs = await self._search(query_vector, query, inputs["chat_id"], inputs.get("file_fingerprint"))
+        return {"vector": query_vector, "docs": docs}
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from typing import Optional
+from fastapi import Request
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from src.helper.config import get_settings, Settings
+from src.app.database.vector_store import create_vector_store
+from src.app.database.VectorStoreEnum import VectorStoreType
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.app.database.mongo_db import (
+    ChatModel, ChunkModel, FileModel, FileStatusManager, MessageModel, UploadSessionModel,
+)
+from src.app.utilities.embeder import Embeder
+from src.app.utilities.query_embedder import QueryEmbedder
+from src.app.utilities.semantic_cache import SemanticCache
+from src.app.utilities.latency_stats import LatencyStats
+from src.app.utilities.turn_writer import TurnWriter, TURN_JOURNAL_PATH
+from src.app.utilities.chunked_upload import ChunkedUploadStore
+from src.app.utilities.parse_executor import ParseExecutor
+from src.app.utilities.ingestion import IngestionService
+from src.app.utilities.job_queue import IngestionJobQueue
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class AppContainer:
+    """
+    Everything the app shares across requests, built once in the lifespan: the settings, the
+    database clients, the Mongo models (their collections and indexes are initialized here and
+    nowhere else), the vector store, the embedder and the background services.
+    Routes receive it through Depends(get_container); the chat chain is built with it.
+    """
+
+    settings: Settings
+    mongo_conn: AsyncMongoClient
+    db_client: AsyncDatabase
+    chat_model: ChatModel
+    file_model: FileModel
+    message_model: MessageModel
+    chunk_model: ChunkModel
+    upload_session_model: UploadSessionModel
+    status_manager: FileStatusManager
+    vector_store: QdrantdbModel
+    embeder: Embeder
+    query_embedder: QueryEmbedder
+    semantic_cache: Optional[SemanticCache]
+    latency_stats: LatencyStats
+    turn_writer: Optional[TurnWriter]
+    pending_saves: set[asyncio.Task]
+    chunked_uploads: ChunkedUploadStore
+    parse_executor: ParseExecutor
+    ingestion_queue: IngestionJobQueue
+
+    @classmethod
+    async def create_instance(cls, settings: Optional[Settings] = None):
+        """Factory method that connects the clients and initializes the collections of the app."""
+        container = cls()
+        container.settings = settings or get_settings()
+        settings = container.settings
+
+        container.mongo_conn = AsyncMongoClient(settings.MONGODB_URL)
+        container.db_client = container.mongo_conn[settings.MONGODB_DATABASE]
+        container.chat_model = await ChatModel.create_instance(container.db_client)
+        container.file_model = await FileModel.create_instance(container.db_client)
+        container.message_model = await MessageModel.create_instance(container.db_client)
+        container.chunk_model = await ChunkModel.create_instance(container.db_client)
+        container.upload_session_model = await UploadSessionModel.create_instance(container.db_client)
+        container.status_manager = FileStatusManager(container.chat_model, container.file_model)
+
+        container.vector_store = create_vector_store()
+        await container.vector_store.create_collection_if_not_exists(
+            collection_name=settings.COLLECTION_APP_NAME,
+            vector_size=settings.EMBED_MODEL_SIZE,
+            sparse=settings.HYBRID_SEARCH_ENABLED
+        )
+        hybrid_store = settings.HYBRID_SEARCH_ENABLED and settings.VECTOR_STORE_TYPE == VectorStoreType.QDRANT.value
+        if hybrid_store and not await container.vector_store.has_sparse_vectors(settings.COLLECTION_APP_NAME):
+            logger.warning(
+                f"HYBRID_SEARCH_ENABLED is on but {settings.COLLECTION_APP_NAME} has no sparse vector, so searches "
+                "stay dense-only; run python -m src.scripts.migrate_collections to add it"
+            )
+        await container.vector_store.create_collection_if_not_exists(
+            collection_name=settings.COLLECTION_CHATS_HISTORY_NAME,
+            vector_size=settings.EMBED_MODEL_SIZE
+        )
+
+        # One embedding client for questions, chat turns and ingestion
+        container.embeder = Embeder()
+        container.query_embedder = QueryEmbedder(
+            container.embeder,
+            max_batch_size=settings.QUERY_EMBED_MAX_BATCH_SIZE,
+            max_wait_ms=settings.QUERY_EMBED_MAX_WAIT_MS,
+        )
+        container.semantic_cache = SemanticCache(
+            similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries_per_chat=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_CHAT,
+            max_chats=settings.SEMANTIC_CACHE_MAX_CHATS,
+            cache_answers=settings.SEMANTIC_CACHE_ANSWERS,
+        ) if settings.SEMANTIC_CACHE_ENABLED else None
+        container.latency_stats = LatencyStats(window=settings.LATENCY_STATS_WINDOW)
+        container.turn_writer = TurnWriter(
+            container.message_model,
+            container.vector_store,
+            container.query_embedder,
+            history_collection=settings.COLLECTION_CHATS_HISTORY_NAME,
+            journal_path=settings.TURN_JOURNAL_PATH or TURN_JOURNAL_PATH,
+            batch_size=settings.TURN_FLUSH_BATCH_SIZE,
+            flush_interval_ms=settings.TURN_FLUSH_INTERVAL_MS,
+        ) if settings.TURN_WRITE_BEHIND_ENABLED else None
+        # Assistant turns the chat chain saves after their answer streamed
+        container.pending_saves = set()
+
+        container.chunked_uploads = ChunkedUploadStore(container.upload_session_model)
+        container.parse_executor = ParseExecutor(
+            max_workers=settings.PARSE_WORKERS,
+            pdf_pages_per_task=settings.PARSE_PDF_PAGES_PER_TASK,
+        )
+        ingestion_service = IngestionService(
+            container.file_model,
+            container.status_manager,
+            container.chunk_model,
+            container.vector_store,
+            container.parse_executor,
+            container.semantic_cache,
+            container.embeder,
+        )
+        container.ingestion_queue = IngestionJobQueue(
+            handler=ingestion_service.process_file,
+            num_workers=settings.INGESTION_WORKERS,
+            max_finished_jobs=settings.INGESTION_JOB_HISTORY,
+        )
+        return container
+
+    def start(self):
+        """Spawn the background tasks on the running event loop."""
+        self.ingestion_queue.start()
+        if self.turn_writer is not None:
+            self.turn_writer.start()
+        self.chunked_uploads.start()
+
+    async def close(self):
+        """Stop the background tasks, then close the clients they use."""
+        await self.ingestion_queue.stop()
+        await self.chunked_uploads.stop()
+        # Turns of answers that just finished streaming still need the turn writer and the embedder
+        while self.pending_saves:
+            await asyncio.gather(*self.pending_saves, return_exceptions=True)
+        if self.turn_writer is not None:
+            # Needs the embedder and both stores, so it goes before them
+            await self.turn_writer.stop()
+        await self.query_embedder.stop()
+        self.parse_executor.shutdown()
+        await self.mongo_conn.close()
+        await self.vector_store.close()
+
+
+def get_container(request: Request) -> AppContainer:
+    """FastAPI dependency giving routes the app's container."""
+    return request.app.container
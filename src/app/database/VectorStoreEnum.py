@@ -0,0 +1,5 @@
+from enum import Enum
+
+class VectorStoreType(Enum):
+    QDRANT = "qdrant"
+    NUMPY = "numpy"
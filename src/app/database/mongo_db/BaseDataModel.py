@@ -12,14 +12,11 @@ class BaseDataModel:
         self.model = model
         
     async def init_collection(self):
-        """Initialize the collection and create indexes if the collection does not exist."""
-        all_collection = await self.db_client.list_collection_names()
-        if self.collection_name not in all_collection:
-            self.collection = self.db_client[self.collection_name]
-            indexes = self.model.get_indexes()
-            for index in indexes:
-                await self.collection.create_index(
-                    index['key'],
-                    name=index['name'],
-                    unique = index['unique']
-                )
+        """Create the declared indexes of the collection; indexes that already exist are left as is."""
+        # create_index is idempotent, so indexes added to a schema later also reach existing collections
+        for index in self.model.get_indexes():
+            await self.collection.create_index(
+                index['key'],
+                name=index['name'],
+                unique = index['unique']
+            )
@@ -87,6 +87,14 @@ class ChatModel(BaseDataModel):
         )
         return result.modified_count > 0
 
+    async def replace_chat_file(self, chat_id: str, file_id: str, filename: str) -> bool:
+        """Renames a file INSIDE the chat after its content was replaced."""
+        result = await self.collection.update_one(
+            {"chat_id": chat_id, "files.file_id": file_id},
+            {"$set": {"files.$.filename": filename}}
+        )
+        return result.modified_count > 0
+
     async def get_pending_files(self, chat_id: str) -> list[ChatFile]:
         """Returns only the files that need to be processed (uploaded but not indexed)."""
         chat = await self.find_chat_by_id(chat_id)
@@ -0,0 +1,48 @@
+from pymongo import UpdateOne
+from .schema import Chunk
+from .BaseDataModel import BaseDataModel
+from .DataBaseEnum import DataBaseEnum
+from pymongo.asynchronous.database import AsyncDatabase
+
+class ChunkModel(BaseDataModel):
+    """
+    Text of the indexed chunks, keyed by their hash, so Qdrant points only carry the hash.
+    Identical chunks of different files and chats share one document.
+    """
+    
+    def __init__(self, db_client: AsyncDatabase):
+        super().__init__(db_client, DataBaseEnum.COLLECTION_CHUNK_NAME.value, model=Chunk)
+
+    @classmethod
+    async def create_instance(cls,db_client: AsyncDatabase):
+        """Factory method to create an instance of ChunkModel and initialize the collection."""
+        # we use it because __init__ do not support async and we need to create indexes asynchronously
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def insert_chunks(self, contents: dict[str, str]):
+        """Store the text of each chunk hash in one bulk write; hashes that are already stored are left as is."""
+        if not contents:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"chunk_hash": chunk_hash},
+                    {"$setOnInsert": {"chunk_hash": chunk_hash, "content": content}},
+                    upsert=True
+                )
+                for chunk_hash, content in contents.items()
+            ],
+            ordered=False
+        )
+
+    async def find_contents(self, chunk_hashes: list[str]) -> dict[str, str]:
+        """Map each of the given chunk hashes to its text; unknown hashes are missing from the result."""
+        if not chunk_hashes:
+            return {}
+        cursor = self.collection.find(
+            {"chunk_hash": {"$in": list(set(chunk_hashes))}},
+            {"_id": 0, "chunk_hash": 1, "content": 1}
+        )
+        return {chunk["chunk_hash"]: chunk["content"] async for chunk in cursor}
@@ -4,6 +4,8 @@ class DataBaseEnum(Enum):
     COLLECTION_CHAT_NAME = "chats"
     COLLECTION_FILE_NAME = "files"
     COLLECTION_MESSAGE_NAME = "messages"
+    COLLECTION_UPLOAD_SESSION_NAME = "upload_sessions"
+    COLLECTION_CHUNK_NAME = "chunks"
 
 
 class FileStatus(Enum):
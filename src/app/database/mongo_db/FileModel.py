@@ -1,6 +1,7 @@
+from typing import Optional
 from .schema import File
 from .BaseDataModel import BaseDataModel
-from .DataBaseEnum import DataBaseEnum
+from .DataBaseEnum import DataBaseEnum, FileStatus
 from pymongo.asynchronous.database import AsyncDatabase
 
 class FileModel(BaseDataModel):
@@ -36,6 +37,39 @@ class FileModel(BaseDataModel):
         files_data = await cursor.to_list(length=None)
         return [File(**file_data) for file_data in files_data]
     
+    async def find_pending_files_by_chat_id(self, chat_id: str) -> list[File]:
+        """Find the files of a chat that are not indexed yet, fetching only the fields ingestion needs."""
+        cursor = self.collection.find(
+            {"chat_id": chat_id, "status": {"$ne": FileStatus.INDEXED.value}},
+            projection={
+                "_id": 0,
+                "file_id": 1,
+                "chat_id": 1,
+                "original_filename": 1,
+                "file_path": 1,
+                "content_hash": 1,
+                "status": 1,
+            },
+        )
+        files_data = await cursor.to_list(length=None)
+        return [File(**file_data) for file_data in files_data]
+
+    async def find_indexed_file_by_hash(self, content_hash: str, exclude_file_id: str, chat_id: Optional[str] = None) -> File:
+        """Find another already indexed file with the same content hash, preferring one of the given chat."""
+        query = {
+            "content_hash": content_hash,
+            "status": FileStatus.INDEXED.value,
+            "file_id": {"$ne": exclude_file_id},
+        }
+        file_data = None
+        if chat_id is not None:
+            file_data = await self.collection.find_one({**query, "chat_id": chat_id})
+        if not file_data:
+            file_data = await self.collection.find_one(query)
+        if file_data:
+            return File(**file_data)
+        return None
+    
     async def delete_file_by_id(self, file_id):
         """Delete a file document by its ID."""
         result = await self.collection.delete_one({"file_id": file_id})
@@ -46,6 +80,14 @@ class FileModel(BaseDataModel):
         result = await self.collection.delete_many({"chat_id": chat_id})
         return result.deleted_count
 
+    async def replace_file_content(self, file_id: str, original_filename: str, content_hash: str) -> bool:
+        """Record a new version of a file's content. The status is moved by FileStatusManager."""
+        result = await self.collection.update_one(
+            {"file_id": file_id},
+            {"$set": {"original_filename": original_filename, "content_hash": content_hash}}
+        )
+        return result.modified_count > 0
+
     async def update_file_status_by_id(self, file_id: str, new_status: str) -> bool:
         """Update the status of a file document by its ID."""
         result = await self.collection.update_one(
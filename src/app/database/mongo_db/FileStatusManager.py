@@ -0,0 +1,84 @@
+import asyncio
+from pymongo import UpdateMany, UpdateOne
+from .ChatModel import ChatModel
+from .FileModel import FileModel
+from .DataBaseEnum import FileStatus
+
+# Target status -> statuses a file may move from.
+# A PROCESSING file can be claimed again: the ingestion queue never runs a file twice,
+# so a PROCESSING file that is re-submitted was orphaned by a restart.
+# Files are created UPLOADED and never move back to it.
+FILE_STATUS_TRANSITIONS: dict[FileStatus, set[FileStatus]] = {
+    FileStatus.PROCESSING: {FileStatus.UPLOADED, FileStatus.FAILED, FileStatus.PROCESSING},
+    FileStatus.INDEXED: {FileStatus.PROCESSING},
+    FileStatus.FAILED: {FileStatus.PROCESSING},
+}
+
+# An INDEXED file goes back to PROCESSING only when its content is replaced, through reindex
+REINDEX_SOURCE_STATUSES: set[FileStatus] = FILE_STATUS_TRANSITIONS[FileStatus.PROCESSING] | {FileStatus.INDEXED}
+
+
+class FileStatusManager:
+    """
+    Moves files between statuses in both the files collection and the chat's file registry.
+    Each transition of a group of files is one bulk_write per collection, and the two run concurrently.
+    Only allowed transitions are applied: the allowed source statuses are part of the update filter,
+    so a file in any other status is left untouched even under concurrent writers.
+    """
+
+    def __init__(self, chat_model: ChatModel, file_model: FileModel):
+        self.chat_model = chat_model
+        self.file_model = file_model
+
+    async def transition(self, chat_id: str, file_ids: list[str], new_status: FileStatus) -> int:
+        """
+        Moves the given files of a chat to new_status.
+        Returns how many files were moved; files in a status that cannot reach new_status are skipped.
+        """
+        return await self.transition_many({chat_id: file_ids}, new_status)
+
+    async def transition_many(self, files_by_chat: dict[str, list[str]], new_status: FileStatus) -> int:
+        """Same as transition for files spread over several chats."""
+        if new_status not in FILE_STATUS_TRANSITIONS:
+            raise ValueError(f"Unsupported file status: {new_status}")
+        return await self._apply(files_by_chat, new_status, FILE_STATUS_TRANSITIONS[new_status])
+
+    async def reindex(self, chat_id: str, file_id: str) -> bool:
+        """
+        Claims a file whose content was just replaced for re-indexing.
+        Unlike transition, it also moves an INDEXED file back to PROCESSING; only the replace route calls it.
+        """
+        return await self._apply({chat_id: [file_id]}, FileStatus.PROCESSING, REINDEX_SOURCE_STATUSES) > 0
+
+    async def _apply(
+        self, files_by_chat: dict[str, list[str]], new_status: FileStatus, allowed_sources: set[FileStatus]
+    ) -> int:
+        files_by_chat = {chat_id: ids for chat_id, ids in files_by_chat.items() if ids}
+        if not files_by_chat:
+            return 0
+
+        source_statuses = [status.value for status in allowed_sources]
+        all_file_ids = [file_id for ids in files_by_chat.values() for file_id in ids]
+
+        file_updates = [
+            UpdateMany(
+                {"file_id": {"$in": all_file_ids}, "status": {"$in": source_statuses}},
+                {"$set": {"status": new_status.value}},
+            )
+        ]
+        chat_updates = [
+            UpdateOne(
+                {"chat_id": chat_id},
+                {"$set": {"files.$[file].status": new_status.value}},
+                array_filters=[
+                    {"file.file_id": {"$in": file_ids}, "file.status": {"$in": source_statuses}}
+                ],
+            )
+            for chat_id, file_ids in files_by_chat.items()
+        ]
+
+        file_result, _ = await asyncio.gather(
+            self.file_model.collection.bulk_write(file_updates, ordered=False),
+            self.chat_model.collection.bulk_write(chat_updates, ordered=False),
+        )
+        return file_result.modified_count
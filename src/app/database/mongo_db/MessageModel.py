@@ -1,3 +1,4 @@
+from pymongo.errors import BulkWriteError
 from .schema import Message
 from .BaseDataModel import BaseDataModel
 from .DataBaseEnum import DataBaseEnum
@@ -21,6 +22,20 @@ class MessageModel(BaseDataModel):
         result = await self.collection.insert_one(message.model_dump(by_alias=True, exclude_unset=True))
         message.id = result.inserted_id
         return message
+
+    async def insert_messages(self, messages: list[Message]):
+        """Insert messages that already carry their _id in one request; ids already stored are skipped."""
+        if not messages:
+            return
+        try:
+            await self.collection.insert_many(
+                [message.model_dump(by_alias=True, exclude_unset=True) for message in messages],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            # Messages written before a crash are replayed from the journal; anything else is a real failure
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
         
     async def find_message_by_id(self, message_id):
         """Find a message document by its ID."""
@@ -0,0 +1,41 @@
+from datetime import datetime
+from .schema import UploadSession
+from .BaseDataModel import BaseDataModel
+from .DataBaseEnum import DataBaseEnum
+from pymongo.asynchronous.database import AsyncDatabase
+
+class UploadSessionModel(BaseDataModel):
+    
+    def __init__(self, db_client: AsyncDatabase):
+        super().__init__(db_client, DataBaseEnum.COLLECTION_UPLOAD_SESSION_NAME.value, model=UploadSession)
+
+    @classmethod
+    async def create_instance(cls,db_client: AsyncDatabase):
+        """Factory method to create an instance of UploadSessionModel and initialize the collection."""
+        # we use it because __init__ do not support async and we need to create indexes asynchronously
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+    
+    async def insert_session(self, session: UploadSession) -> UploadSession:
+        """Insert a new upload session document into the collection."""
+        result = await self.collection.insert_one(session.model_dump(by_alias=True, exclude_unset=True))
+        session.id = result.inserted_id
+        return session
+    
+    async def find_session_by_id(self, upload_id: str) -> UploadSession:
+        """Find an upload session document by its ID."""
+        session_data = await self.collection.find_one({"upload_id": upload_id})
+        if session_data:
+            return UploadSession(**session_data)
+        return None
+    
+    async def find_sessions_created_before(self, cutoff: datetime) -> list[UploadSession]:
+        """Find the upload sessions started before the given time."""
+        cursor = self.collection.find({"created_at": {"$lt": cutoff}})
+        return [UploadSession(**session_data) async for session_data in cursor]
+    
+    async def delete_session_by_id(self, upload_id: str):
+        """Delete an upload session document by its ID."""
+        result = await self.collection.delete_one({"upload_id": upload_id})
+        return result.deleted_count > 0
@@ -1,3 +1,6 @@
 from .ChatModel import ChatModel
 from .MessageModel import MessageModel
-from .FileModel import FileModel
\ No newline at end of file
+from .FileModel import FileModel
+from .UploadSessionModel import UploadSessionModel
+from .FileStatusManager import FileStatusManager
+from .ChunkModel import ChunkModel
\ No newline at end of file
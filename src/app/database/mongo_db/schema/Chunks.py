@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from bson.objectid import ObjectId
+
+class Chunk(BaseModel):
+    
+    id: Optional[ObjectId] = Field(None,alias='_id')
+    chunk_hash: str = Field(..., description="SHA-256 of the chunk text, also stored in the payload of its Qdrant points")
+    content: str = Field(..., description="Text of the chunk")
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    
+    @classmethod
+    def get_indexes(cls):
+
+        return [
+            {
+                'key':[('chunk_hash',1)],
+                'name':'chunk_hash_index_1',
+                'unique':True
+            }
+        ]
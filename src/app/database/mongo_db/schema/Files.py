@@ -10,6 +10,7 @@ class File(BaseModel):
     chat_id: str = Field(..., description="Identifier for the chat session this file is associated with")
     original_filename: str = Field(..., description="Original name of the uploaded file")
     file_path : str = Field(..., description="Path where the file is stored on the server")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the file content, used to reuse vectors of identical uploads")
     status: str = Field(..., description="Processing status of the file")
     uploaded_at: datetime = Field(default_factory=datetime.now, description="Timestamp when the file was uploaded")
 
@@ -24,5 +25,15 @@ class File(BaseModel):
                 'key':[('file_id',1)],
                 'name':'file_id_index_1',
                 'unique':True
+            },
+            {
+                'key':[('chat_id',1),('status',1)],
+                'name':'chat_id_status_index_1',
+                'unique':False
+            },
+            {
+                'key':[('content_hash',1)],
+                'name':'content_hash_index_1',
+                'unique':False
             }
         ]
\ No newline at end of file
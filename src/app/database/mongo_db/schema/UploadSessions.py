@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class UploadSession(BaseModel):
+    
+    id: Optional[ObjectId] = Field(None,alias='_id')
+    upload_id: str = Field(..., description="Unique identifier for the resumable upload")
+    chat_id: str = Field(..., description="Identifier for the chat session the file will be attached to")
+    original_filename: str = Field(..., description="Original name of the file being uploaded")
+    content_type: str = Field(..., description="Declared MIME type of the file")
+    total_size: int = Field(..., description="Declared size of the whole file in bytes")
+    created_at: datetime = Field(default_factory=datetime.now, description="Timestamp when the upload was started")
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    
+    @classmethod
+    def get_indexes(cls):
+
+        return [
+            {
+                'key':[('upload_id',1)],
+                'name':'upload_id_index_1',
+                'unique':True
+            },
+            {
+                'key':[('created_at',1)],
+                'name':'created_at_index_1',
+                'unique':False
+            }
+        ]
@@ -1,2 +1,4 @@
 from .Files import File
-from .Messages import Message
\ No newline at end of file
+from .Messages import Message
+from .UploadSessions import UploadSession
+from .Chunks import Chunk
\ No newline at end of file
@@ -0,0 +1,444 @@
+import os
+import json
+import hashlib
+import shutil
+import asyncio
+import logging
+import threading
+from typing import Optional
+import numpy as np
+from qdrant_client.http.models import QueryResponse, Record, ScoredPoint, SparseVector
+from src.app.database.qdrantdb.QdrantdbModel import payload_file_ids
+from src.helper.config import get_settings, Settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# A segment is compacted once it holds more deleted rows than this, and more deleted rows than live ones
+COMPACT_MIN_DELETED = 1024
+# File of a segment directory recording the chat it belongs to
+CHAT_ID_FILE = "chat_id"
+
+
+def _select_payload(payload: dict, with_payload: bool | list[str]) -> Optional[dict]:
+    if with_payload is True:
+        return dict(payload)
+    if not with_payload:
+        return None
+    return {key: payload[key] for key in with_payload if key in payload}
+
+
+class ChatSegment:
+    """
+    The points of one chat in one collection, in their own directory.
+    vectors.f32 holds one float32 row per point and is read through a memory map; points.jsonl is an
+    append-only log of the ids, payloads and deletions, replayed at startup. Updating a point appends
+    a new row and marks the old one deleted; deleted rows are dropped when the segment is compacted.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.log_path = os.path.join(directory, "points.jsonl")
+        self.ids: list = []
+        self.payloads: list[Optional[dict]] = []
+        self.rows: dict = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self._mmap: Optional[np.memmap] = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _load(self):
+        vectors_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        num_rows = vectors_size // (self.dim * 4)
+        entries = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn write of the last line after a crash
+                        break
+        for entry in entries:
+            op = entry["op"]
+            if op == "upsert" and entry["row"] < num_rows:
+                self._apply_upsert(entry["id"], entry["payload"], entry["row"])
+            elif op == "delete":
+                self._apply_delete(entry["id"])
+            elif op == "set_payload" and entry["id"] in self.rows:
+                self.payloads[self.rows[entry["id"]]].update(entry["payload"])
+            elif op == "delete_keys" and entry["id"] in self.rows:
+                for key in entry["keys"]:
+                    self.payloads[self.rows[entry["id"]]].pop(key, None)
+        # Rows written without their log entry (crash in between) are unreachable; drop them
+        num_rows = len(self.ids)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(num_rows * self.dim * 4)
+        self._remap()
+
+    def _remap(self):
+        num_rows = len(self.ids)
+        self._mmap = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(num_rows, self.dim))
+            if num_rows
+            else None
+        )
+
+    def _apply_upsert(self, point_id, payload: dict, row: int):
+        self._apply_delete(point_id)
+        while len(self.ids) <= row:
+            self.ids.append(None)
+            self.payloads.append(None)
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.rows[point_id] = row
+        if len(self.alive) <= row:
+            self.alive = np.concatenate([self.alive, np.zeros(max(row + 1 - len(self.alive), len(self.alive)), bool)])
+        self.alive[row] = True
+
+    def _apply_delete(self, point_id):
+        row = self.rows.pop(point_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.payloads[row] = None
+
+    def _append_log(self, entries: list[dict]):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    def upsert(self, ids: list, vectors: np.ndarray, payloads: list[dict]):
+        first_row = len(self.ids)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.astype(np.float32).tobytes())
+        entries = [
+            {"op": "upsert", "id": point_id, "row": first_row + offset, "payload": payload}
+            for offset, (point_id, payload) in enumerate(zip(ids, payloads))
+        ]
+        self._append_log(entries)
+        for entry in entries:
+            self._apply_upsert(entry["id"], entry["payload"], entry["row"])
+        self._remap()
+
+    def delete(self, ids: list):
+        ids = [point_id for point_id in ids if point_id in self.rows]
+        if not ids:
+            return
+        self._append_log([{"op": "delete", "id": point_id} for point_id in ids])
+        for point_id in ids:
+            self._apply_delete(point_id)
+        deleted = len(self.ids) - len(self.rows)
+        if deleted > COMPACT_MIN_DELETED and deleted > len(self.rows):
+            self.compact()
+
+    def set_payload(self, point_id, payload: dict):
+        if point_id in self.rows:
+            self._append_log([{"op": "set_payload", "id": point_id, "payload": payload}])
+            self.payloads[self.rows[point_id]].update(payload)
+
+    def delete_payload_keys(self, point_id, keys: list[str]):
+        if point_id in self.rows:
+            self._append_log([{"op": "delete_keys", "id": point_id, "keys": keys}])
+            for key in keys:
+                self.payloads[self.rows[point_id]].pop(key, None)
+
+    def compact(self):
+        """Rewrites both files with the live points only."""
+        live_rows = [row for row in range(len(self.ids)) if row < len(self.alive) and self.alive[row]]
+        vectors = np.array(self._mmap[live_rows]) if live_rows else np.empty((0, self.dim), np.float32)
+        entries = [
+            {"op": "upsert", "id": self.ids[row], "row": new_row, "payload": self.payloads[row]}
+            for new_row, row in enumerate(live_rows)
+        ]
+        self._mmap = None
+        for path, content in (
+            (self.vectors_path, vectors.tobytes()),
+            (self.log_path, "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")),
+        ):
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        self.ids, self.payloads, self.rows = [], [], {}
+        self.alive = np.zeros(0, dtype=bool)
+        self._load()
+
+    def vectors(self) -> np.ndarray:
+        if self._mmap is None:
+            return np.empty((0, self.dim), np.float32)
+        return self._mmap
+
+    def records(self, with_vectors: bool, with_payload: bool | list[str]) -> list[Record]:
+        return [
+            Record(
+                id=self.ids[row],
+                payload=_select_payload(self.payloads[row], with_payload),
+                vector=self._mmap[row].tolist() if with_vectors else None,
+            )
+            for row in sorted(self.rows.values())
+        ]
+
+
+def _read_chat_id(segment_dir: str) -> Optional[str]:
+    path = os.path.join(segment_dir, CHAT_ID_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class NumpyCollection:
+    """
+    A collection: one ChatSegment per chat_id, plus the config it was created with.
+    A segment directory is named after the SHA-256 of its chat_id, which it also records; the
+    recorded chat_id, not the directory name, decides which chat a segment belongs to.
+    """
+
+    def __init__(self, directory: str, dim: int, distance: str):
+        self.directory = directory
+        self.dim = dim
+        self.distance = distance
+        self.segments: dict[str, ChatSegment] = {}
+        # point id -> chat_id of the segment holding it
+        self.point_chats: dict = {}
+        for entry in sorted(os.listdir(directory)):
+            segment_dir = os.path.join(directory, entry)
+            if os.path.isdir(segment_dir):
+                chat_id = _read_chat_id(segment_dir)
+                if chat_id is None:
+                    logger.warning(f"Skipping segment {segment_dir}: it records no chat_id")
+                    continue
+                self._add_segment(chat_id, ChatSegment(segment_dir, dim))
+
+    def _add_segment(self, chat_id: str, segment: ChatSegment):
+        self.segments[chat_id] = segment
+        for point_id in segment.rows:
+            self.point_chats[point_id] = chat_id
+
+    def segment(self, chat_id: str) -> ChatSegment:
+        if chat_id not in self.segments:
+            segment_dir = os.path.join(self.directory, hashlib.sha256(chat_id.encode("utf-8")).hexdigest())
+            recorded_chat_id = _read_chat_id(segment_dir)
+            if recorded_chat_id is not None and recorded_chat_id != chat_id:
+                raise ValueError(f"Segment directory {segment_dir} belongs to another chat")
+            os.makedirs(segment_dir, exist_ok=True)
+            with open(os.path.join(segment_dir, CHAT_ID_FILE), "w", encoding="utf-8") as f:
+                f.write(chat_id)
+            self._add_segment(chat_id, ChatSegment(segment_dir, self.dim))
+        return self.segments[chat_id]
+
+    def prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Normalizes vectors for cosine distance, so searching is a single matrix product."""
+        if self.distance == "Cosine":
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            return vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def scores(self, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Higher is better, like Qdrant's scores: similarity for Cosine/Dot, negative distance otherwise."""
+        if self.distance in ("Cosine", "Dot"):
+            return matrix @ query
+        if self.distance == "Euclid":
+            return -np.linalg.norm(matrix - query, axis=1)
+        return -np.abs(matrix - query).sum(axis=1)
+
+
+class NumpyVectorStore:
+    """
+    In-process vector store with the interface of QdrantdbModel, for single-node deployments,
+    tests and benchmarks without a Qdrant server (VECTOR_STORE_TYPE=numpy).
+    Every collection keeps one float32 matrix per chat in a memory-mapped file, and a search is a
+    vectorized brute-force scan of the matrix of the requested chat only, so its cost depends on the
+    size of the chat, not of the collection. There are no sparse vectors (hybrid searches run as dense
+    searches) and no quantization.
+    Only one process may open a store directory at a time.
+    """
+
+    def __init__(self, directory: str):
+        self.settings: Settings = get_settings()
+        self.directory = directory
+        self.collections: dict[str, NumpyCollection] = {}
+        # Guards the segments and the point index. Searches, and writes with their file I/O, run in
+        # worker threads holding it, so the event loop never blocks on the disk or a scan
+        self._lock = threading.Lock()
+        self._warned_hybrid = False
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        if collection_name not in self.collections:
+            directory = os.path.join(self.directory, collection_name)
+            config_path = os.path.join(directory, "config.json")
+            if not os.path.exists(config_path):
+                raise ValueError(f"Collection {collection_name} not found")
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            self.collections[collection_name] = NumpyCollection(directory, config["size"], config["distance"])
+        return self.collections[collection_name]
+
+    async def create_collection_if_not_exists(self, collection_name: str, vector_size: int, sparse: bool = False):
+        """Create a collection if it does not already exist; sparse vectors are ignored."""
+        directory = os.path.join(self.directory, collection_name)
+        config_path = os.path.join(directory, "config.json")
+        if not os.path.exists(config_path):
+            os.makedirs(directory, exist_ok=True)
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump({"size": vector_size, "distance": self.settings.DISTANCE_METRIC}, f)
+        if sparse:
+            logger.info(f"{collection_name}: the numpy vector store has no sparse vectors, searches are dense only")
+        self._collection(collection_name)
+
+    async def has_sparse_vectors(self, collection_name: str) -> bool:
+        return False
+
+    def _upsert(self, collection: NumpyCollection, matrix: np.ndarray, payloads: list[dict], ids: list[str]):
+        by_chat: dict[str, list[int]] = {}
+        for index, payload in enumerate(payloads):
+            by_chat.setdefault(payload.get("chat_id", ""), []).append(index)
+        with self._lock:
+            for chat_id, indexes in by_chat.items():
+                chat_ids = [ids[i] for i in indexes]
+                # A point moving to another chat leaves its old segment
+                for point_id in chat_ids:
+                    previous_chat = collection.point_chats.get(point_id)
+                    if previous_chat is not None and previous_chat != chat_id:
+                        collection.segments[previous_chat].delete([point_id])
+                collection.segment(chat_id).upsert(chat_ids, matrix[indexes], [payloads[i] for i in indexes])
+                for point_id in chat_ids:
+                    collection.point_chats[point_id] = chat_id
+
+    async def upsert_points(self, collection_name: str, vectors: list, payloads: list[dict], ids: list[str], sparse_vectors: Optional[list[SparseVector]] = None):
+        """Upsert points into the segments of their chats; sparse vectors are ignored."""
+        collection = self._collection(collection_name)
+        matrix = collection.prepare(np.asarray(vectors, dtype=np.float32).reshape(len(ids), collection.dim))
+        await asyncio.to_thread(self._upsert, collection, matrix, payloads, ids)
+
+    def _file_points(self, collection: NumpyCollection, file_id: str) -> list[tuple[ChatSegment, object]]:
+        """Caller must hold the lock."""
+        return [
+            (segment, point_id)
+            for segment in collection.segments.values()
+            for point_id, row in segment.rows.items()
+            if file_id in payload_file_ids(segment.payloads[row])
+        ]
+
+    def _file_records(self, collection: NumpyCollection, file_id: str, with_vectors: bool, with_payload: bool | list[str]) -> list[Record]:
+        with self._lock:
+            return [
+                record
+                for segment in collection.segments.values()
+                for record in segment.records(with_vectors, with_payload)
+                if file_id in payload_file_ids(segment.payloads[segment.rows[record.id]])
+            ]
+
+    async def scroll_points_by_file(self, collection_name: str, file_id: str, with_vectors: bool = True, with_payload: bool | list[str] = True, batch_size: int = 256):
+        """Iterate over all points of the given file, one page of records at a time."""
+        records = await asyncio.to_thread(
+            self._file_records, self._collection(collection_name), file_id, with_vectors, with_payload
+        )
+        for start in range(0, len(records), batch_size):
+            yield records[start:start + batch_size]
+
+    def _delete(self, collection: NumpyCollection, ids: list):
+        """Caller must hold the lock."""
+        by_chat: dict[str, list] = {}
+        for point_id in ids:
+            chat_id = collection.point_chats.pop(point_id, None)
+            if chat_id is not None:
+                by_chat.setdefault(chat_id, []).append(point_id)
+        for chat_id, chat_ids in by_chat.items():
+            collection.segments[chat_id].delete(chat_ids)
+
+    def _delete_points(self, collection: NumpyCollection, ids: list):
+        with self._lock:
+            self._delete(collection, ids)
+
+    async def delete_points(self, collection_name: str, ids: list[str]):
+        """Delete the points with the given ids."""
+        await asyncio.to_thread(self._delete_points, self._collection(collection_name), ids)
+
+    def _set_payloads(self, collection: NumpyCollection, updates: list[tuple[str, dict]]):
+        with self._lock:
+            for point_id, payload in updates:
+                chat_id = collection.point_chats.get(point_id)
+                if chat_id is not None:
+                    collection.segments[chat_id].set_payload(point_id, payload)
+
+    async def set_payloads(self, collection_name: str, updates: list[tuple[str, dict]]):
+        """Merge new payload fields into several points."""
+        await asyncio.to_thread(self._set_payloads, self._collection(collection_name), updates)
+
+    def _delete_payload_keys(self, collection: NumpyCollection, ids: list, keys: list[str]):
+        with self._lock:
+            for point_id in ids:
+                chat_id = collection.point_chats.get(point_id)
+                if chat_id is not None:
+                    collection.segments[chat_id].delete_payload_keys(point_id, keys)
+
+    async def delete_payload_keys(self, collection_name: str, ids: list[str], keys: list[str]):
+        """Remove the given payload fields from the points with the given ids."""
+        await asyncio.to_thread(self._delete_payload_keys, self._collection(collection_name), ids, keys)
+
+    def _set_payload_by_file(self, collection: NumpyCollection, file_id: str, payload: dict):
+        with self._lock:
+            for segment, point_id in self._file_points(collection, file_id):
+                segment.set_payload(point_id, payload)
+
+    async def set_payload_by_file(self, collection_name: str, file_id: str, payload: dict):
+        """Merge new payload fields into every point of the given file."""
+        await asyncio.to_thread(self._set_payload_by_file, self._collection(collection_name), file_id, payload)
+
+    def _delete_points_by_file(self, collection: NumpyCollection, file_id: str):
+        with self._lock:
+            self._delete(collection, [point_id for _, point_id in self._file_points(collection, file_id)])
+
+    async def delete_points_by_file(self, collection_name: str, file_id: str):
+        """Delete every point that was indexed from the given file."""
+        await asyncio.to_thread(self._delete_points_by_file, self._collection(collection_name), file_id)
+
+    def _search(self, collection: NumpyCollection, query_vector: list[float], chat_id: str, limit: int, with_payload: bool | list[str]) -> QueryResponse:
+        with self._lock:
+            segment = collection.segments.get(chat_id)
+            if segment is None or not len(segment):
+                return QueryResponse(points=[])
+            matrix = segment.vectors()
+            query = collection.prepare(np.asarray(query_vector, dtype=np.float32))
+            scores = collection.scores(matrix, query)
+            scores[~segment.alive[:len(scores)]] = -np.inf
+            limit = min(limit, len(segment))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return QueryResponse(
+                points=[
+                    ScoredPoint(
+                        id=segment.ids[row],
+                        version=0,
+                        score=float(scores[row]),
+                        payload=_select_payload(segment.payloads[row], with_payload),
+                    )
+                    for row in top
+                ]
+            )
+
+    async def search(self, collection_name: str, query_vector: list[float], chat_id: str, limit: int=10, with_payload: bool | list[str] = True):
+        """Brute-force search of the points of one chat, off the event loop."""
+        collection = self._collection(collection_name)
+        return await asyncio.to_thread(self._search, collection, query_vector, chat_id, limit, with_payload)
+
+    async def hybrid_search(self, collection_name: str, query_vector: list[float], sparse_vector: SparseVector, chat_id: str, limit: int = 10, prefetch_limit: int = 30, with_payload: bool | list[str] = True):
+        """There are no sparse vectors to fuse: falls back to the dense search, whose scores are similarities."""
+        if not self._warned_hybrid:
+            logger.warning("The numpy vector store has no sparse vectors, hybrid searches run as dense searches")
+            self._warned_hybrid = True
+        return await self.search(collection_name, query_vector, chat_id, limit=limit, with_payload=with_payload)
+
+    async def drop_collection(self, collection_name: str):
+        """Delete a collection and its files."""
+        with self._lock:
+            self.collections.pop(collection_name, None)
+            shutil.rmtree(os.path.join(self.directory, collection_name), ignore_errors=True)
+
+    async def close(self):
+        self.collections.clear()
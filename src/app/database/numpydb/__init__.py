@@ -0,0 +1 @@
+from .NumpyVectorStore import NumpyVectorStore
@@ -0,0 +1,17 @@
+from enum import Enum
+
+class QuantizationMode(Enum):
+    NONE = "none"
+    SCALAR = "scalar"
+    PRODUCT = "product"
+    BINARY = "binary"
+
+
+class VectorName(Enum):
+    DENSE = ""
+    SPARSE = "sparse"
+
+
+class PayloadField(Enum):
+    CHAT_ID = "chat_id"
+    FILE_ID = "file_id"
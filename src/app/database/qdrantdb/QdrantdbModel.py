@@ -1,26 +1,155 @@
 from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from typing import Optional
+from qdrant_client.models import VectorParams, PointStruct, Filter, FieldCondition, MatchValue, FilterSelector, PointIdsList, SetPayload, SetPayloadOperation
+from qdrant_client.models import (
+    BinaryQuantization, BinaryQuantizationConfig, CompressionRatio, Disabled, ProductQuantization,
+    ProductQuantizationConfig, QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig,
+    ScalarType, SearchParams, VectorParamsDiff,
+)
+from qdrant_client.models import Fusion, FusionQuery, Modifier, Prefetch, SparseVector, SparseVectorParams
+from qdrant_client.models import HnswConfigDiff, KeywordIndexParams, KeywordIndexType
 from src.helper.config import get_settings , Settings
+from .QdrantdbEnum import QuantizationMode, VectorName, PayloadField
+
+
+def payload_file_ids(payload: dict) -> list[str]:
+    """The file ids of a point: a point shared by duplicate files of one chat lists all of them."""
+    file_ids = payload.get(PayloadField.FILE_ID.value)
+    if file_ids is None:
+        return []
+    return file_ids if isinstance(file_ids, list) else [file_ids]
+
+
 class QdrantdbModel:
     def __init__(self,qdrant_client: AsyncQdrantClient):
         self.qdrant_client = qdrant_client
         self.settings: Settings = get_settings()
+        # collection name -> whether it has the sparse vector used by hybrid search
+        self._sparse_collections: dict[str, bool] = {}
+        # collection name -> whether its dense vectors are quantized
+        self._quantized_collections: dict[str, bool] = {}
         
-    async def create_collection_if_not_exists(self,collection_name: str, vector_size: int):
-        """Create a collection in Qdrant if it does not already exist."""
-        collections = await self.qdrant_client.get_collections()
-        exists = any(c.name == collection_name for c in collections.collections)
-        if not exists:
-            await self.qdrant_client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=vector_size,
-                    distance=self.settings.DISTANCE_METRIC
+    def _quantization_config(self, mode: str):
+        """Quantization config for the given QDRANT_QUANTIZATION mode; None for plain float32 vectors."""
+        always_ram = self.settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        if mode == QuantizationMode.NONE.value:
+            return None
+        elif mode == QuantizationMode.SCALAR.value:
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+            )
+        elif mode == QuantizationMode.PRODUCT.value:
+            return ProductQuantization(
+                product=ProductQuantizationConfig(
+                    compression=CompressionRatio(self.settings.QDRANT_PQ_COMPRESSION), always_ram=always_ram
+                )
+            )
+        elif mode == QuantizationMode.BINARY.value:
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+        else:
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+    def _hnsw_config(self) -> Optional[HnswConfigDiff]:
+        """HNSW layout of new collections; None keeps Qdrant's single global graph."""
+        if not self.settings.QDRANT_TENANT_LAYOUT:
+            return None
+        # Every search is filtered by chat_id: skip the global graph and build one graph per chat instead
+        return HnswConfigDiff(m=0, payload_m=self.settings.QDRANT_HNSW_PAYLOAD_M)
+
+    async def create_collection_if_not_exists(self,collection_name: str, vector_size: int, sparse: bool = False):
+        """
+        Create a collection in Qdrant if it does not already exist, optionally with a sparse vector for hybrid search.
+        The payload indexes are created for new and existing collections alike.
+        """
+        if not await self.qdrant_client.collection_exists(collection_name):
+            await self.create_collection(collection_name, vector_size, sparse)
+        await self.create_payload_indexes(collection_name)
+
+    async def create_collection(self, collection_name: str, vector_size: int, sparse: bool = False):
+        """Create a collection with the configured quantization and HNSW layout."""
+        quantization_config = self._quantization_config(self.settings.QDRANT_QUANTIZATION)
+        self._quantized_collections.pop(collection_name, None)
+        await self.qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(
+                size=vector_size,
+                distance=self.settings.DISTANCE_METRIC,
+                # Searches run on the quantized vectors in RAM; the originals are only read to rescore
+                on_disk=quantization_config is not None
+            ),
+            quantization_config=quantization_config,
+            hnsw_config=self._hnsw_config(),
+            sparse_vectors_config={
+                VectorName.SPARSE.value: SparseVectorParams(
+                    # BM25-style models emit term frequencies and rely on Qdrant for the IDF part
+                    modifier=Modifier.IDF if self.settings.SPARSE_EMBEDDING_IDF else None
                 )
+            } if sparse else None
+        )
+
+    async def create_payload_indexes(self, collection_name: str):
+        """Create the keyword indexes of the fields searches and deletions filter on, skipping existing ones."""
+        info = await self.qdrant_client.get_collection(collection_name)
+        indexed_fields = set(info.payload_schema or {})
+        field_schemas = {
+            # Tenant index: Qdrant stores each chat's points together and builds its per-chat HNSW graph
+            PayloadField.CHAT_ID.value: KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True),
+            # Only used to scroll and delete the points of a file, never to search them
+            PayloadField.FILE_ID.value: KeywordIndexParams(type=KeywordIndexType.KEYWORD, enable_hnsw=False),
+        }
+        for field_name, field_schema in field_schemas.items():
+            if field_name not in indexed_fields:
+                await self.qdrant_client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+
+    async def has_sparse_vectors(self, collection_name: str) -> bool:
+        """Whether the collection was created with the sparse vector; collections created before hybrid search were not."""
+        if collection_name not in self._sparse_collections:
+            info = await self.qdrant_client.get_collection(collection_name)
+            sparse_vectors = info.config.params.sparse_vectors or {}
+            self._sparse_collections[collection_name] = VectorName.SPARSE.value in sparse_vectors
+        return self._sparse_collections[collection_name]
+
+    async def is_quantized(self, collection_name: str) -> bool:
+        """
+        Whether the collection's dense vectors are quantized, as configured in Qdrant rather than in
+        QDRANT_QUANTIZATION, which only applies to new collections. Cached per collection: a collection
+        converted by another process (quantize_collections) is picked up after a restart.
+        """
+        if collection_name not in self._quantized_collections:
+            info = await self.qdrant_client.get_collection(collection_name)
+            vectors = info.config.params.vectors
+            if isinstance(vectors, dict):
+                vectors = vectors.get(VectorName.DENSE.value)
+            self._quantized_collections[collection_name] = (
+                info.config.quantization_config is not None
+                or getattr(vectors, "quantization_config", None) is not None
             )
+        return self._quantized_collections[collection_name]
+
+    async def apply_quantization(self, collection_name: str, mode: Optional[str] = None):
+        """
+        Converts an existing collection to the given quantization mode (QDRANT_QUANTIZATION by default) in place.
+        Qdrant rebuilds the quantized vectors in the background while the collection keeps serving requests.
+        """
+        quantization_config = self._quantization_config(mode or self.settings.QDRANT_QUANTIZATION)
+        await self.qdrant_client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": VectorParamsDiff(on_disk=quantization_config is not None)},
+            quantization_config=quantization_config or Disabled.DISABLED
+        )
+        self._quantized_collections[collection_name] = quantization_config is not None
     
-    async def upsert_points(self, collection_name: str, vectors: list[list[float]], payloads: list[dict], ids: list[str]):
-        """Upsert points into the specified collection."""
+    async def upsert_points(self, collection_name: str, vectors: list, payloads: list[dict], ids: list[str], sparse_vectors: Optional[list[SparseVector]] = None):
+        """Upsert points into the specified collection. With sparse_vectors, each point gets both named vectors."""
+        if sparse_vectors is not None:
+            vectors = [
+                {VectorName.DENSE.value: vector, VectorName.SPARSE.value: sparse_vector}
+                for vector, sparse_vector in zip(vectors, sparse_vectors)
+            ]
         points = [
             PointStruct(
                 id=id,
@@ -34,10 +163,94 @@ class QdrantdbModel:
             points=points
         )
     
-    async def search(self, collection_name: str, query_vector: list[float], chat_id: str, limit: int=10):
-        """Search for similar points in the specified collection based on the query vector and chat_id filter."""
-        
-        filtter_chat_id = Filter(
+    async def scroll_points_by_file(self, collection_name: str, file_id: str, with_vectors: bool = True, with_payload: bool | list[str] = True, batch_size: int = 256):
+        """Iterate over all points of the given file, one page of records at a time."""
+        offset = None
+        while True:
+            records, offset = await self.qdrant_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="file_id",
+                            match=MatchValue(value=file_id)
+                        )
+                    ]
+                ),
+                limit=batch_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors
+            )
+            if records:
+                yield records
+            if offset is None:
+                break
+    
+    async def delete_points(self, collection_name: str, ids: list[str]):
+        """Delete the points with the given ids."""
+        if not ids:
+            return
+        await self.qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=ids)
+        )
+    
+    async def set_payloads(self, collection_name: str, updates: list[tuple[str, dict]]):
+        """Merge new payload fields into several points in a single batched request."""
+        if not updates:
+            return
+        await self.qdrant_client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[id]))
+                for id, payload in updates
+            ]
+        )
+    
+    async def delete_payload_keys(self, collection_name: str, ids: list[str], keys: list[str]):
+        """Remove the given payload fields from the points with the given ids."""
+        if not ids:
+            return
+        await self.qdrant_client.delete_payload(
+            collection_name=collection_name,
+            keys=keys,
+            points=ids
+        )
+
+    async def set_payload_by_file(self, collection_name: str, file_id: str, payload: dict):
+        """Merge new payload fields into every point of the given file."""
+        await self.qdrant_client.set_payload(
+            collection_name=collection_name,
+            payload=payload,
+            points=Filter(
+                must=[
+                    FieldCondition(
+                        key="file_id",
+                        match=MatchValue(value=file_id)
+                    )
+                ]
+            )
+        )
+    
+    async def delete_points_by_file(self, collection_name: str, file_id: str):
+        """Delete every point that was indexed from the given file."""
+        await self.qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="file_id",
+                            match=MatchValue(value=file_id)
+                        )
+                    ]
+                )
+            )
+        )
+    
+    def _chat_filter(self, chat_id: str) -> Filter:
+        return Filter(
             must=[
                 FieldCondition(
                     key="chat_id",
@@ -45,11 +258,62 @@ class QdrantdbModel:
                 )
             ]
         )
+
+    async def _search_params(self, collection_name: str) -> Optional[SearchParams]:
+        if not await self.is_quantized(collection_name):
+            return None
+        # Fetch extra candidates with the quantized vectors, then rank them by the original vectors
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=self.settings.QDRANT_SEARCH_RESCORE,
+                oversampling=self.settings.QDRANT_SEARCH_OVERSAMPLING
+            )
+        )
+
+    async def search(self, collection_name: str, query_vector: list[float], chat_id: str, limit: int=10, with_payload: bool | list[str] = True):
+        """
+        Search for similar points in the specified collection based on the query vector and chat_id filter.
+        with_payload selects the payload fields returned with each point.
+        """
         search_result = await self.qdrant_client.query_points(
             collection_name=collection_name,
-            query_filter=filtter_chat_id,
+            query_filter=self._chat_filter(chat_id),
             query=query_vector,
+            search_params=await self._search_params(collection_name),
+            with_payload=with_payload,
             limit=limit
         )
         return search_result # that will return a list of points with their payloads and distances
+
+    async def close(self):
+        await self.qdrant_client.close()
+
+    async def hybrid_search(self, collection_name: str, query_vector: list[float], sparse_vector: SparseVector, chat_id: str, limit: int = 10, prefetch_limit: int = 30, with_payload: bool | list[str] = True):
+        """
+        Dense and sparse search of a chat's points fused with reciprocal rank fusion, in a single request.
+        Scores of the result are RRF scores, not similarities.
+        """
+        chat_filter = self._chat_filter(chat_id)
+        search_result = await self.qdrant_client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                Prefetch(
+                    query=query_vector,
+                    using=VectorName.DENSE.value,
+                    filter=chat_filter,
+                    params=await self._search_params(collection_name),
+                    limit=prefetch_limit
+                ),
+                Prefetch(
+                    query=sparse_vector,
+                    using=VectorName.SPARSE.value,
+                    filter=chat_filter,
+                    limit=prefetch_limit
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            with_payload=with_payload,
+            limit=limit
+        )
+        return search_result
         
\ No newline at end of file
@@ -0,0 +1,19 @@
+import os
+from qdrant_client import AsyncQdrantClient
+from src.helper.config import get_settings, Settings
+from .VectorStoreEnum import VectorStoreType
+from .numpydb import NumpyVectorStore
+from .qdrantdb.QdrantdbModel import QdrantdbModel
+
+NUMPY_STORE_DIR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "vector_store")
+
+
+def create_vector_store():
+    """The vector store selected by VECTOR_STORE_TYPE; both expose the QdrantdbModel interface."""
+    settings: Settings = get_settings()
+    if settings.VECTOR_STORE_TYPE == VectorStoreType.QDRANT.value:
+        return QdrantdbModel(AsyncQdrantClient(url=settings.URL_QDRANT))
+    elif settings.VECTOR_STORE_TYPE == VectorStoreType.NUMPY.value:
+        return NumpyVectorStore(settings.NUMPY_STORE_DIR or NUMPY_STORE_DIR_PATH)
+    else:
+        raise ValueError(f"Unsupported vector store type: {settings.VECTOR_STORE_TYPE}")
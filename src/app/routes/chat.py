@@ -1,11 +1,9 @@
 from langserve import add_routes
 from src.app.chains.rag_chain import create_full_rag_chain
 from src.app.chains.llm import LLMProvider
-from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
-from fastapi import APIRouter, Request, status
+from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
-from src.app.database.mongo_db.ChatModel import ChatModel
-from src.app.database.mongo_db.MessageModel import MessageModel
+from src.app.container import AppContainer, get_container
 
 router = APIRouter(
     prefix="/chat",
@@ -15,15 +13,10 @@ router = APIRouter(
 def register_chat_routes(app):
     """Register chat routes with the FastAPI app."""
 
-    qdrant_model = QdrantdbModel(app.qdrant_client)
     llm = LLMProvider().get_model()
 
 
-    chain = create_full_rag_chain(
-        llm=llm, 
-        mongo_client=app.db_client, 
-        qdrant_model=qdrant_model
-    )
+    chain = create_full_rag_chain(llm=llm, container=app.container)
 
 
     add_routes(
@@ -34,11 +27,9 @@ def register_chat_routes(app):
     )
 
 @router.get("/history")
-async def get_chat_history(request: Request):
+async def get_chat_history(container: AppContainer = Depends(get_container)):
     """Returns a list of all recent chat sessions."""
-    mongo_client = request.app.db_client
-    chat_model = await ChatModel.create_instance(mongo_client)
-    chats = await chat_model.get_all_chats()
+    chats = await container.chat_model.get_all_chats()
     
     # Return list of chat_ids (and titles if available)
     return JSONResponse(
@@ -47,11 +38,11 @@ async def get_chat_history(request: Request):
     )
 
 @router.get("/history/{chat_id}")
-async def get_chat_messages(request: Request, chat_id: str):
+async def get_chat_messages(chat_id: str, container: AppContainer = Depends(get_container)):
     """Returns all messages for a specific chat session."""
-    mongo_client = request.app.db_client
-    message_model = await MessageModel.create_instance(mongo_client)
-    messages = await message_model.find_messages_by_chat_id(chat_id)
+    messages = await container.message_model.find_messages_by_chat_id(chat_id)
+    if container.turn_writer is not None:
+        messages = container.turn_writer.with_pending(chat_id, messages)
     
     formatted_messages = [
         {"role": msg.role, "content": msg.content} 
@@ -60,4 +51,27 @@ async def get_chat_messages(request: Request, chat_id: str):
     return JSONResponse(
         content={"messages": formatted_messages},
         status_code=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+@router.get("/cache/stats")
+async def get_semantic_cache_stats(container: AppContainer = Depends(get_container)):
+    """Returns the hit rate and the retrieval time saved by the semantic cache."""
+    semantic_cache = container.semantic_cache
+    if semantic_cache is None:
+        return JSONResponse(
+            content={"message": "Semantic cache is disabled."},
+            status_code=status.HTTP_200_OK
+        )
+    return JSONResponse(
+        content=semantic_cache.stats(),
+        status_code=status.HTTP_200_OK
+    )
+
+
+@router.get("/latency/stats")
+async def get_latency_stats(container: AppContainer = Depends(get_container)):
+    """Returns the time to first token and to the full answer of recent chat answers."""
+    return JSONResponse(
+        content=container.latency_stats.stats(),
+        status_code=status.HTTP_200_OK
+    )
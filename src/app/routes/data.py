@@ -1,21 +1,19 @@
 import os
 import uuid
+import asyncio
 from typing import List
-from fastapi import APIRouter, UploadFile, status, Request, Form
+from fastapi import APIRouter, Depends, UploadFile, status, Request, Form
 from fastapi.responses import JSONResponse
 from datetime import datetime, timezone
 import logging
+from src.app.container import AppContainer, get_container
 from src.app.utilities.process_file import FileProcessor, FILES_DIR_PATH
 from src.app.utilities.ProcessEnum import ProcessSignal
-from src.app.utilities.loader import Loader
-from src.app.utilities.splitter import TextSplitter
+from src.app.utilities.embedding_cache import get_embedding_cache
 from src.app.database.mongo_db import FileModel, ChatModel
-from src.app.database.mongo_db.schema import File
+from src.app.database.mongo_db.schema import File, UploadSession
 from src.app.database.mongo_db.DataBaseEnum import FileStatus
 from src.app.routes.schema import ProcessRequest
-from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
-from src.app.utilities.embeder import Embeder
-from src.helper.config import get_settings, Settings
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -29,20 +27,44 @@ async def hello_world():
     )
 
 
+async def register_uploaded_file(
+    chat_model: ChatModel,
+    file_model: FileModel,
+    chat_id: str,
+    file_id: str,
+    filename: str,
+    file_path: str,
+    content_hash: str,
+):
+    """Creates the File document for a saved upload and attaches it to the chat."""
+    file_doc = File(
+        file_id=file_id,
+        chat_id=chat_id,
+        original_filename=filename,
+        file_path=file_path,
+        content_hash=content_hash,
+        status=FileStatus.UPLOADED.value,
+        uploaded_at=datetime.now(timezone.utc),
+    )
+    await file_model.insert_file(file_doc)
+    await chat_model.add_file_to_chat(chat_id, file_id, filename)
+
+
 @router.post("/upload")
 async def upload_files(
-    request: Request,
     files: List[UploadFile],
     chat_id: str = Form(...),
     persona_name: str = Form("General Assistant"),
     persona_instructions: str = Form("You are a helpful assistant."),
+    container: AppContainer = Depends(get_container),
 ):
     """
     Handles multiple file uploads and initializes the chat if it's new.
+    Files are saved concurrently. Starlette spools the whole multipart body before this runs, so the
+    size limit is checked after receipt, while each file is copied from the spool to disk.
     """
-    mongo_client = request.app.db_client
-    chat_model: ChatModel = await ChatModel.create_instance(mongo_client)
-    file_model: FileModel = await FileModel.create_instance(mongo_client)
+    chat_model = container.chat_model
+    file_model = container.file_model
 
     await chat_model.initialize_chat(
         chat_id=chat_id,
@@ -50,39 +72,31 @@ async def upload_files(
         persona_instructions=persona_instructions,
     )
 
-    uploaded_files_info = []
-    failed_files = []
-
-    for file in files:
+    async def save_file(file: UploadFile) -> tuple[bool, dict]:
         file_processor = FileProcessor(file)
         is_valid, signal = file_processor.validate_uploaded_file()
 
         if not is_valid:
-            failed_files.append({"filename": file.filename, "reason": signal})
-            continue
+            return False, {"filename": file.filename, "reason": signal}
 
         file_path, file_id = file_processor.generate_unique_filepath()
 
         try:
-            file_path = await file_processor.save_uploaded_file(file_path)
-
-            file_doc = File(
-                file_id=file_id,
-                chat_id=chat_id,
-                original_filename=file.filename,
-                file_path=file_path,
-                status=FileStatus.UPLOADED.value,
-                uploaded_at=datetime.now(timezone.utc),
+            file_path, content_hash = await file_processor.save_uploaded_file(file_path)
+            await register_uploaded_file(
+                chat_model, file_model, chat_id, file_id, file.filename, file_path, content_hash
             )
-            await file_model.insert_file(file_doc)
-
-            await chat_model.add_file_to_chat(chat_id, file_id, file.filename)
-
-            uploaded_files_info.append({"filename": file.filename, "file_id": file_id})
+            return True, {"filename": file.filename, "file_id": file_id}
 
+        except ValueError as e:
+            return False, {"filename": file.filename, "reason": str(e)}
         except Exception as e:
             logger.error(f"Error saving file {file.filename}: {str(e)}")
-            failed_files.append({"filename": file.filename, "reason": "Server Error"})
+            return False, {"filename": file.filename, "reason": "Server Error"}
+
+    results = await asyncio.gather(*(save_file(file) for file in files))
+    uploaded_files_info = [info for is_saved, info in results if is_saved]
+    failed_files = [info for is_saved, info in results if not is_saved]
 
     if not uploaded_files_info:
         return JSONResponse(
@@ -100,24 +114,180 @@ async def upload_files(
     )
 
 
-@router.post("/process")
-async def process_chat_files(request: Request, process_request: ProcessRequest):
+@router.post("/uploads")
+async def start_chunked_upload(
+    chat_id: str = Form(...),
+    filename: str = Form(...),
+    content_type: str = Form(...),
+    total_size: int = Form(...),
+    persona_name: str = Form("General Assistant"),
+    persona_instructions: str = Form("You are a helpful assistant."),
+    container: AppContainer = Depends(get_container),
+):
     """
-    Finds all 'pending' files for a given chat_id and processes them.
-    Skips files that are already indexed.
+    Starts a resumable upload. The file is then sent with PUT /data/uploads/{upload_id}
+    in chunks and attached to the chat with POST /data/uploads/{upload_id}/complete.
     """
-    chat_id = process_request.chat_id
+    chunked_uploads = container.chunked_uploads
+    is_valid, signal = chunked_uploads.validate_upload(content_type, total_size)
+    if not is_valid:
+        return JSONResponse(
+            content={"message": signal},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    await container.chat_model.initialize_chat(
+        chat_id=chat_id,
+        persona_name=persona_name,
+        persona_instructions=persona_instructions,
+    )
+    session = await container.upload_session_model.insert_session(
+        UploadSession(
+            upload_id=uuid.uuid4().hex,
+            chat_id=chat_id,
+            original_filename=filename,
+            content_type=content_type,
+            total_size=total_size,
+            created_at=datetime.now(timezone.utc),
+        )
+    )
+
+    return JSONResponse(
+        content={
+            "upload_id": session.upload_id,
+            "offset": 0,
+            "total_size": total_size,
+            "chunk_size": chunked_uploads.settings.FILE_UPLOAD_CHUNK_SIZE,
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.get("/uploads/{upload_id}")
+async def get_chunked_upload(upload_id: str, container: AppContainer = Depends(get_container)):
+    """Returns how many bytes of a resumable upload were received, so the client knows where to resume."""
+    session = await container.upload_session_model.find_session_by_id(upload_id)
+    if not session:
+        return JSONResponse(
+            content={"message": ProcessSignal.UPLOAD_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
 
-    mongo_client = request.app.db_client
-    chat_model: ChatModel = await ChatModel.create_instance(mongo_client)
-    file_model: FileModel = await FileModel.create_instance(mongo_client)
+    return JSONResponse(
+        content={
+            "upload_id": upload_id,
+            "offset": container.chunked_uploads.get_offset(upload_id),
+            "total_size": session.total_size,
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    request: Request, upload_id: str, offset: int, container: AppContainer = Depends(get_container)
+):
+    """
+    Appends the raw request body to a resumable upload at the given byte offset.
+    A mismatching offset is rejected with the current offset, so the client can resume from there.
+    """
+    session = await container.upload_session_model.find_session_by_id(upload_id)
+    if not session:
+        return JSONResponse(
+            content={"message": ProcessSignal.UPLOAD_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    is_stored, signal, current_offset = await container.chunked_uploads.append_chunk(
+        upload_id, offset, session.total_size, request.stream()
+    )
+
+    if not is_stored:
+        status_code = (
+            status.HTTP_409_CONFLICT
+            if signal == ProcessSignal.UPLOAD_OFFSET_MISMATCH.value
+            else status.HTTP_413_CONTENT_TOO_LARGE
+        )
+        return JSONResponse(
+            content={"message": signal, "offset": current_offset},
+            status_code=status_code,
+        )
 
-    qdrant_client = request.app.qdrant_client
-    qdrant_model = QdrantdbModel(qdrant_client=qdrant_client)
-    settings: Settings = get_settings()
-    embeder = Embeder()
+    return JSONResponse(
+        content={"message": signal, "offset": current_offset, "total_size": session.total_size},
+        status_code=status.HTTP_200_OK,
+    )
 
-    pending_files = await chat_model.get_pending_files(chat_id)
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_chunked_upload(upload_id: str, container: AppContainer = Depends(get_container)):
+    """Attaches a fully received resumable upload to its chat, like a regular upload."""
+    session_model = container.upload_session_model
+    session = await session_model.find_session_by_id(upload_id)
+    if not session:
+        return JSONResponse(
+            content={"message": ProcessSignal.UPLOAD_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    chunked_uploads = container.chunked_uploads
+    # Checked under the upload's lock, so a concurrent chunk or a second completion cannot interleave
+    finalized = await chunked_uploads.finalize(upload_id, session.original_filename, session.total_size)
+    if finalized is None:
+        return JSONResponse(
+            content={"message": ProcessSignal.UPLOAD_INCOMPLETE.value, "offset": chunked_uploads.get_offset(upload_id)},
+            status_code=status.HTTP_409_CONFLICT,
+        )
+
+    file_path, file_id, content_hash = finalized
+    await register_uploaded_file(
+        container.chat_model,
+        container.file_model,
+        session.chat_id,
+        file_id,
+        session.original_filename,
+        file_path,
+        content_hash,
+    )
+    await session_model.delete_session_by_id(upload_id)
+
+    return JSONResponse(
+        content={
+            "message": ProcessSignal.FILE_UPLOAD_SUCCESS.value,
+            "uploaded": [{"filename": session.original_filename, "file_id": file_id}],
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_chunked_upload(upload_id: str, container: AppContainer = Depends(get_container)):
+    """Aborts a resumable upload, deleting its session and the bytes received so far."""
+    session_model = container.upload_session_model
+    if not await session_model.find_session_by_id(upload_id):
+        return JSONResponse(
+            content={"message": ProcessSignal.UPLOAD_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    await container.chunked_uploads.discard(upload_id)
+    await session_model.delete_session_by_id(upload_id)
+
+    return JSONResponse(
+        content={"message": ProcessSignal.UPLOAD_ABORTED.value},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.post("/process")
+async def process_chat_files(process_request: ProcessRequest, container: AppContainer = Depends(get_container)):
+    """
+    Queues all pending files of a chat for background ingestion and returns the job id.
+    Skips files that are already indexed or already queued.
+    """
+    chat_id = process_request.chat_id
+
+    pending_files = await container.file_model.find_pending_files_by_chat_id(chat_id)
 
     if not pending_files:
         return JSONResponse(
@@ -125,87 +295,145 @@ async def process_chat_files(request: Request, process_request: ProcessRequest):
             status_code=status.HTTP_200_OK,
         )
 
-    processed_ids = []
-    failed_ids = []
-
-    # 2. Process each pending file
-    for chat_file in pending_files:
-        file_id = chat_file.file_id
-
-        # Verify file exists globally
-        file_doc = await file_model.find_file_by_id(file_id)
-        if not FileProcessor.is_file_exists(file_id) or not file_doc:
-            failed_ids.append(
-                {"file_id": file_id, "reason": ProcessSignal.NO_FILE_FOUND.value}
-            )
-            continue
+    # Claim every file of the job in one batch before any worker can pick it up
+    await container.status_manager.transition(
+        chat_id, [file_doc.file_id for file_doc in pending_files], FileStatus.PROCESSING
+    )
 
-        file_extension = file_id.split(".")[-1].lower()
-        file_path = os.path.join(FILES_DIR_PATH, file_id)
-        loader = Loader(file_extension=file_extension)
+    job = await container.ingestion_queue.submit(chat_id, pending_files)
 
-        # Update status to PROCESSING in both collections
-        await chat_model.update_chat_file_status(
-            chat_id, file_id, FileStatus.PROCESSING.value
+    if job is None:
+        return JSONResponse(
+            content={"message": "All pending files are already being processed."},
+            status_code=status.HTTP_200_OK,
         )
-        await file_model.update_file_status_by_id(file_id, FileStatus.PROCESSING.value)
 
-        try:
-            # Extract and chunk
-            documents = loader.load(file_path)
-            page_contents, metadatas = FileProcessor.return_metadatas_and_page_content(
-                documents
-            )
-            splitter = TextSplitter()
-            chunked_documents = splitter.split_texts(page_contents, metadatas)
+    return JSONResponse(
+        content={
+            "message": f"Processing started for {len(job.files)} files.",
+            "job_id": job.job_id,
+            "files": [f.file_id for f in job.files],
+        },
+        status_code=status.HTTP_202_ACCEPTED,
+    )
 
-            # Embed
-            embeddings = embeder.embed_chunks(
-                [doc.page_content for doc in chunked_documents]
-            )
 
-            # Prepare payloads for Qdrant
-            payloads = [
-                {
-                    "chat_id": chat_id,
-                    "metadata": doc.metadata,
-                    "chunk_content": doc.page_content,
-                    "original_filename": file_doc.original_filename,
-                    "page_number": doc.metadata.get("page", None),
-                }
-                for doc in chunked_documents
-            ]
-
-            # Upsert to Vector DB
-            await qdrant_model.upsert_points(
-                collection_name=settings.COLLECTION_APP_NAME,
-                vectors=embeddings,
-                payloads=payloads,
-                ids=[str(uuid.uuid4()) for _ in range(len(chunked_documents))],
-            )
+@router.post("/replace")
+async def replace_file(
+    file: UploadFile,
+    chat_id: str = Form(...),
+    file_id: str = Form(...),
+    container: AppContainer = Depends(get_container),
+):
+    """
+    Replaces an uploaded file with a revised version and queues it for re-indexing.
+    Only new or changed chunks are embedded again; chunks that disappeared are removed from the index.
+    """
+    chat_model = container.chat_model
+    file_model = container.file_model
+    status_manager = container.status_manager
+    ingestion_queue = container.ingestion_queue
 
-            # Update status to INDEXED
-            await chat_model.update_chat_file_status(
-                chat_id, file_id, FileStatus.INDEXED.value
-            )
-            await file_model.update_file_status_by_id(file_id, FileStatus.INDEXED.value)
+    file_doc = await file_model.find_file_by_id(file_id)
+    if not file_doc or file_doc.chat_id != chat_id or not FileProcessor.is_file_exists(file_id):
+        return JSONResponse(
+            content={"message": ProcessSignal.NO_FILE_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    file_processor = FileProcessor(file)
+    is_valid, signal = file_processor.validate_uploaded_file()
+    if is_valid and file_processor.file_extension != file_id.split(".")[-1].lower():
+        is_valid, signal = False, ProcessSignal.FILE_TYPE_MISMATCH.value
+    if not is_valid:
+        return JSONResponse(
+            content={"message": signal},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
 
-            processed_ids.append(file_id)
+    # Claim the file before touching it: no job can start on it until the new version is submitted
+    if not ingestion_queue.reserve(chat_id, file_id):
+        return JSONResponse(
+            content={"message": ProcessSignal.FILE_BUSY.value},
+            status_code=status.HTTP_409_CONFLICT,
+        )
 
-        except Exception as e:
-            logger.error(f"Error processing file {file_id}: {str(e)}")
-            # Mark as FAILED
-            await chat_model.update_chat_file_status(
-                chat_id, file_id, FileStatus.FAILED.value
-            )
-            await file_model.update_file_status_by_id(file_id, FileStatus.FAILED.value)
-            failed_ids.append({"file_id": file_id, "reason": str(e)})
+    # Write next to the original and swap atomically, so the old version stays intact until the upload completes
+    file_path = os.path.join(FILES_DIR_PATH, file_id)
+    temp_path = f"{file_path}.replace"
+    try:
+        _, content_hash = await file_processor.save_uploaded_file(temp_path)
+        os.replace(temp_path, file_path)
+    except ValueError as e:
+        ingestion_queue.release(chat_id, file_id)
+        return JSONResponse(
+            content={"message": str(e)},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    except Exception as e:
+        ingestion_queue.release(chat_id, file_id)
+        logger.error(f"Error replacing file {file_id}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return JSONResponse(
+            content={"message": "Server Error"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
 
+    try:
+        await file_model.replace_file_content(file_id, file.filename, content_hash)
+        await chat_model.replace_chat_file(chat_id, file_id, file.filename)
+        await status_manager.reindex(chat_id, file_id)
+    except Exception:
+        # Free the file so the replace can be retried
+        ingestion_queue.release(chat_id, file_id)
+        raise
+
+    file_doc = file_doc.model_copy(
+        update={"original_filename": file.filename, "content_hash": content_hash}
+    )
+    job = await ingestion_queue.submit(chat_id, [file_doc], reserved=True)
     return JSONResponse(
         content={
-            "message": f"Processing complete. Success: {len(processed_ids)}, Failed: {len(failed_ids)}",
-            "processed": processed_ids,
-            "failed": failed_ids,
+            "message": "File replaced, re-indexing started.",
+            "file_id": file_id,
+            "job_id": job.job_id,
         },
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
+@router.get("/jobs")
+async def list_ingestion_jobs(chat_id: str, container: AppContainer = Depends(get_container)):
+    """Returns the ingestion jobs known for a chat, with per-file progress."""
+    jobs = container.ingestion_queue.list_jobs(chat_id)
+    return JSONResponse(
+        content={"jobs": [job.model_dump(mode="json") for job in jobs]},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str, container: AppContainer = Depends(get_container)):
+    """Returns the status and per-file progress of an ingestion job."""
+    job = container.ingestion_queue.get_job(job_id)
+    if not job:
+        return JSONResponse(
+            content={"message": "Job not found."},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    return JSONResponse(
+        content=job.model_dump(mode="json"),
         status_code=status.HTTP_200_OK,
     )
+
+
+@router.get("/embedding-cache")
+async def get_embedding_cache_stats(container: AppContainer = Depends(get_container)):
+    """Returns hit/miss counters and sizes of the embedding cache."""
+    cache = get_embedding_cache(container.settings.EMBEDDING_MODEL)
+    if cache is None:
+        return JSONResponse(
+            content={"message": "Embedding cache is disabled."},
+            status_code=status.HTTP_200_OK,
+        )
+    return JSONResponse(content=cache.stats(), status_code=status.HTTP_200_OK)
@@ -9,4 +9,45 @@ class ProcessSignal(Enum):
     NO_FILE_FOUND = "The File Not Found"
     FILE_PROCESSING_SUCCESS = "File processed successfully."
     FILE_PROCESSING_FAILED = "File processing failed."
-    FILE_ALREADY_PROCESSED = "File has already been processed."
\ No newline at end of file
+    FILE_ALREADY_PROCESSED = "File has already been processed."
+    FILE_TYPE_MISMATCH = "The replacement must have the same file type as the original file."
+    FILE_BUSY = "The file is currently being processed."
+    UPLOAD_NOT_FOUND = "Upload session not found."
+    UPLOAD_OFFSET_MISMATCH = "Chunk offset does not match the bytes received so far."
+    UPLOAD_INCOMPLETE = "Upload is not complete yet."
+    UPLOAD_CHUNK_SUCCESS = "Chunk stored successfully."
+    UPLOAD_ABORTED = "Upload aborted."
+
+
+class SplitterMode(Enum):
+    RECURSIVE = "recursive"
+    OFFSET = "offset"
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class EmbeddingKind(Enum):
+    QUERY = "query"
+    DOCUMENT = "document"
+
+
+class EmbeddingProviderEnum(Enum):
+    OLLAMA = "ollama"
+    FASTEMBED = "fastembed"
+
+
+class ScoreType(Enum):
+    SIMILARITY = "similarity"
+    DISTANCE = "distance"
+    RRF = "rrf"
+
+
+class QueryRoute(Enum):
+    SMALL_TALK = "small_talk" # answered without rephrasing or retrieval
+    DIRECT = "direct" # no history to resolve: retrieve with the question as asked
+    REPHRASE = "rephrase"
@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+import aiofiles
+from src.app.database.mongo_db import UploadSessionModel
+from src.helper.config import get_settings, Settings
+from .process_file import FileProcessor, FILES_DIR_PATH
+from .ProcessEnum import ProcessSignal
+
+logger = logging.getLogger("uvicorn.error")
+
+PARTIAL_DIR_PATH = os.path.join(FILES_DIR_PATH, ".partial")
+# Seconds between two sweeps of expired uploads
+SWEEP_INTERVAL_S = 3600
+
+
+class ChunkedUploadStore:
+    """Resumable uploads on disk; the size of the partial file is the upload offset, even after a restart."""
+
+    def __init__(self, session_model: UploadSessionModel, directory: str = PARTIAL_DIR_PATH):
+        self.settings: Settings = get_settings()
+        self.session_model = session_model
+        self.directory = directory
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._task: asyncio.Task | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Spawn the sweep task on the running event loop."""
+        self._task = asyncio.create_task(self._run(), name="upload-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep_expired()
+            except Exception as e:
+                logger.error(f"Failed to sweep expired uploads: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL_S)
+
+    async def sweep_expired(self) -> int:
+        """
+        Deletes the sessions started more than UPLOAD_TTL_HOURS ago with their partial files,
+        and partial files left without a session. Returns the number of uploads removed.
+        """
+        ttl = timedelta(hours=self.settings.UPLOAD_TTL_HOURS)
+        expired = await self.session_model.find_sessions_created_before(datetime.now(timezone.utc) - ttl)
+        for session in expired:
+            await self.discard(session.upload_id)
+            await self.session_model.delete_session_by_id(session.upload_id)
+
+        orphans = 0
+        cutoff = time.time() - ttl.total_seconds()
+        for upload_id in os.listdir(self.directory):
+            try:
+                modified_at = os.path.getmtime(self.partial_path(upload_id))
+            except FileNotFoundError:
+                # Completed or discarded meanwhile
+                continue
+            if modified_at < cutoff and not await self.session_model.find_session_by_id(upload_id):
+                await self.discard(upload_id)
+                orphans += 1
+        if expired or orphans:
+            logger.info(f"Removed {len(expired)} expired uploads and {orphans} orphaned partial files")
+        return len(expired) + orphans
+
+    async def discard(self, upload_id: str):
+        """Deletes the received bytes of an upload; waits for a chunk being appended to it."""
+        async with self._lock(upload_id):
+            path = self.partial_path(upload_id)
+            if os.path.exists(path):
+                os.remove(path)
+        self._locks.pop(upload_id, None)
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    @property
+    def max_size_bytes(self) -> int:
+        return self.settings.FILE_MAX_SIZE_MB * 1024 * 1024
+
+    def validate_upload(self, content_type: str, total_size: int) -> tuple[bool, str]:
+        """Validate the declared type and size of an upload before accepting any chunk."""
+        if content_type not in self.settings.FILE_ALLOWED_TYPES:
+            return False, ProcessSignal.FILE_TYPE_NOT_SUPPORTED.value
+        if total_size <= 0 or total_size > self.max_size_bytes:
+            return False, ProcessSignal.FILE_SIZE_EXCEEDED.value
+        return True, ProcessSignal.FILE_VALIDATE_SUCCESS.value
+
+    def partial_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, upload_id)
+
+    def get_offset(self, upload_id: str) -> int:
+        """Number of bytes received so far."""
+        path = self.partial_path(upload_id)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    async def append_chunk(
+        self, upload_id: str, offset: int, total_size: int, content: AsyncIterator[bytes]
+    ) -> tuple[bool, str, int]:
+        """
+        Appends a chunk that starts at the given offset, streaming it to disk.
+        Returns whether it was stored, the signal and the resulting offset. A chunk that would
+        grow the file past its declared total size is rolled back as soon as it crosses the limit.
+        """
+        async with self._lock(upload_id):
+            current_offset = self.get_offset(upload_id)
+            if offset != current_offset:
+                return False, ProcessSignal.UPLOAD_OFFSET_MISMATCH.value, current_offset
+
+            path = self.partial_path(upload_id)
+            written = 0
+            exceeded = False
+            async with aiofiles.open(path, "ab") as f:
+                async for data in content:
+                    written += len(data)
+                    if current_offset + written > total_size:
+                        exceeded = True
+                        break
+                    await f.write(data)
+
+            if exceeded:
+                os.truncate(path, current_offset)
+                return False, ProcessSignal.FILE_SIZE_EXCEEDED.value, current_offset
+            return True, ProcessSignal.UPLOAD_CHUNK_SUCCESS.value, self.get_offset(upload_id)
+
+    async def finalize(self, upload_id: str, filename: str, total_size: int) -> Optional[tuple[str, str, str]]:
+        """
+        Moves a complete upload into the files directory.
+        Returns the file path, the new file_id and the SHA-256 of the content, or None if the upload is not
+        complete, which includes an upload already finalized by a concurrent request.
+        """
+        async with self._lock(upload_id):
+            if self.get_offset(upload_id) != total_size:
+                return None
+            path = self.partial_path(upload_id)
+            sha256 = hashlib.sha256()
+            async with aiofiles.open(path, "rb") as f:
+                while content := await f.read(self.settings.FILE_UPLOAD_CHUNK_SIZE):
+                    sha256.update(content)
+
+            file_path, file_id = FileProcessor.unique_filepath_for(filename)
+            os.replace(path, file_path)
+        self._locks.pop(upload_id, None)
+        return file_path, file_id, sha256.hexdigest()
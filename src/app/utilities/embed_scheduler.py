@@ -0,0 +1,76 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from .embeder import Embeder
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class EmbeddingScheduler:
+    """Embeds the batches of every file being ingested, with an AIMD window of batches in flight and retries."""
+
+    def __init__(
+        self,
+        embeder: Embeder,
+        max_concurrency: int = 4,
+        target_latency_ms: float = 5000,
+        max_retries: int = 3,
+        retry_backoff_ms: float = 500,
+    ):
+        self.embeder = embeder
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency_ms / 1000
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        # Start with one batch in flight and let the window grow
+        self._window = 1.0
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._window)
+
+    @asynccontextmanager
+    async def _slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _on_success(self, latency: float):
+        if latency <= self.target_latency:
+            self._window = min(self.max_concurrency, self._window + 1 / self._window)
+        else:
+            self._on_congestion()
+
+    def _on_congestion(self):
+        self._window = max(1.0, self._window / 2)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embeds one batch of chunk texts, retrying it up to max_retries times."""
+        for attempt in range(self.max_retries + 1):
+            async with self._slot():
+                started = time.perf_counter()
+                try:
+                    vectors = await asyncio.to_thread(self.embeder.embed_chunks, texts)
+                except Exception as e:
+                    self._on_congestion()
+                    if attempt == self.max_retries:
+                        raise
+                    error = e
+                else:
+                    self._on_success(time.perf_counter() - started)
+                    return vectors
+
+            delay = self.retry_backoff * 2 ** attempt
+            logger.warning(
+                f"Embedding batch of {len(texts)} chunks failed ({str(error)}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
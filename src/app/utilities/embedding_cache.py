@@ -0,0 +1,292 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Optional
+import numpy as np
+from src.helper.config import get_settings, Settings
+from .process_file import SRC_DIR_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows: the disk tier is not locked
+    fcntl = None
+
+logger = logging.getLogger("uvicorn.error")
+
+EMBED_CACHE_DIR_PATH = os.path.join(SRC_DIR_PATH, "data", "embed_cache")
+DIGEST_SIZE = 32
+# Share of the disk budget kept when the disk tier is compacted
+DISK_COMPACT_RATIO = 0.75
+
+
+def text_digest(kind: str, text: str) -> bytes:
+    """SHA-256 of the text, namespaced by the kind of embedding (query or document)."""
+    return hashlib.sha256(f"{kind}\x00{text}".encode("utf-8")).digest()
+
+
+class MemoryTier:
+    """Bounded LRU of vectors kept in process memory."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._vectors: OrderedDict[bytes, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        vector = self._vectors.get(digest)
+        if vector is not None:
+            self._vectors.move_to_end(digest)
+        return vector
+
+    def put(self, digest: bytes, vector: np.ndarray) -> int:
+        """Stores a vector and returns how many entries were evicted to make room."""
+        if self.max_items <= 0:
+            return 0
+        self._vectors[digest] = vector
+        self._vectors.move_to_end(digest)
+        evicted = 0
+        while len(self._vectors) > self.max_items:
+            self._vectors.popitem(last=False)
+            evicted += 1
+        return evicted
+
+
+class DiskTier:
+    """Append-only, memory-mapped store of float32 vectors, shared by processes through a file lock."""
+
+    def __init__(self, directory: str, dim: int, max_bytes: int):
+        self.directory = directory
+        self.dim = dim
+        self.max_bytes = max_bytes
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        # One row of `dim` float32 per entry, and the digest of every row in the same order
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self._index: dict[bytes, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        # Rows of keys.bin known to this process, and the file they were read from
+        self._num_rows = 0
+        self._keys_inode: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, ".lock"), "a")
+        with self._locked():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._index) * (self.row_bytes + DIGEST_SIZE)
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load(self):
+        """Caller must hold the lock."""
+        keys = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                keys = f.read()
+        vectors_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+
+        # A crash between the two appends leaves one file longer than the other; drop the partial row
+        num_rows = min(len(keys) // DIGEST_SIZE, vectors_size // self.row_bytes)
+        with open(self.keys_path, "ab") as f:
+            f.truncate(num_rows * DIGEST_SIZE)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(num_rows * self.row_bytes)
+
+        self._index = {
+            keys[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE]: row for row in range(num_rows)
+        }
+        self._num_rows = num_rows
+        self._keys_inode = os.stat(self.keys_path).st_ino
+        self._remap()
+
+    def _refresh(self):
+        """Catches up with the rows other processes appended or compacted away. Caller must hold the lock."""
+        stat = os.stat(self.keys_path)
+        if stat.st_ino != self._keys_inode or stat.st_size < self._num_rows * DIGEST_SIZE:
+            # Compacted by another process: every row may have moved
+            self._load()
+            return
+        if stat.st_size == self._num_rows * DIGEST_SIZE:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._num_rows * DIGEST_SIZE)
+            keys = f.read()
+        for offset in range(len(keys) // DIGEST_SIZE):
+            self._index[keys[offset * DIGEST_SIZE:(offset + 1) * DIGEST_SIZE]] = self._num_rows + offset
+        self._num_rows += len(keys) // DIGEST_SIZE
+        self._remap()
+
+    def _remap(self):
+        self._mmap = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._num_rows, self.dim))
+            if self._num_rows
+            else None
+        )
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        with self._locked():
+            self._refresh()
+            row = self._index.get(digest)
+            if row is None:
+                return None
+            return np.array(self._mmap[row])
+
+    def put_many(self, items: list[tuple[bytes, np.ndarray]]) -> int:
+        """Appends new vectors and returns how many old entries were evicted by compaction."""
+        with self._locked():
+            self._refresh()
+            items = [(digest, vector) for digest, vector in items if digest not in self._index]
+            if not items:
+                return 0
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.stack([vector for _, vector in items]).astype(np.float32).tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(digest for digest, _ in items))
+            for offset, (digest, _) in enumerate(items):
+                self._index[digest] = self._num_rows + offset
+            self._num_rows += len(items)
+            self._remap()
+
+            if self.size_bytes > self.max_bytes:
+                return self._compact()
+            return 0
+
+    def _compact(self) -> int:
+        """Keeps the newest rows that fit in DISK_COMPACT_RATIO of the budget. Caller must hold the lock."""
+        num_rows = self._num_rows
+        keep = min(num_rows, int(self.max_bytes * DISK_COMPACT_RATIO) // (self.row_bytes + DIGEST_SIZE))
+        first_kept = num_rows - keep
+
+        with open(self.keys_path, "rb") as f:
+            f.seek(first_kept * DIGEST_SIZE)
+            keys = f.read()
+        vectors = np.array(self._mmap[first_kept:]) if keep else np.empty((0, self.dim), np.float32)
+        self._mmap = None
+
+        for path, content in ((self.vectors_path, vectors.tobytes()), (self.keys_path, keys)):
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+
+        self._load()
+        return num_rows - keep
+
+
+class EmbeddingCache:
+    """Thread-safe two-tier cache of one model's embeddings: an in-memory LRU in front of a disk tier."""
+
+    def __init__(self, model_name: str, dim: int, memory_items: int, disk_max_bytes: int, directory: str):
+        self.model_name = model_name
+        self.dim = dim
+        self.memory = MemoryTier(memory_items)
+        self.disk: Optional[DiskTier] = None
+        if disk_max_bytes > 0:
+            model_dir = re.sub(r"[^\w.-]", "_", model_name)
+            self.disk = DiskTier(os.path.join(directory, model_dir), dim, disk_max_bytes)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def _lookup(self, digest: bytes) -> Optional[np.ndarray]:
+        vector = self.memory.get(digest)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(digest)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory_evictions += self.memory.put(digest, vector)
+                return vector
+        self.misses += 1
+        return None
+
+    def embed(
+        self, kind: str, texts: list[str], compute: Callable[[list[str]], list[list[float]]]
+    ) -> list[list[float]]:
+        """
+        Returns the embedding of every text, calling compute only once for the texts that miss
+        both tiers (duplicates inside the batch are computed once too).
+        """
+        digests = [text_digest(kind, text) for text in texts]
+        with self._lock:
+            found = {digest: self._lookup(digest) for digest in set(digests)}
+
+        missing = {digest: text for digest, text in zip(digests, texts) if found[digest] is None}
+        if missing:
+            computed = compute(list(missing.values()))
+            new_items = [
+                (digest, np.asarray(vector, dtype=np.float32))
+                for digest, vector in zip(missing, computed)
+            ]
+            with self._lock:
+                for digest, vector in new_items:
+                    found[digest] = vector
+                    self.memory_evictions += self.memory.put(digest, vector)
+                if self.disk is not None:
+                    storable = [(d, v) for d, v in new_items if v.shape == (self.dim,)]
+                    if len(storable) < len(new_items):
+                        logger.warning(
+                            f"Embeddings of {self.model_name} do not match EMBED_MODEL_SIZE={self.dim}; "
+                            "they are not persisted"
+                        )
+                    self.disk_evictions += self.disk.put_many(storable)
+
+        return [found[digest].tolist() for digest in digests]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self.memory),
+                "memory_max_items": self.memory.max_items,
+                "memory_evictions": self.memory_evictions,
+                "disk_items": len(self.disk) if self.disk else 0,
+                "disk_bytes": self.disk.size_bytes if self.disk else 0,
+                "disk_max_bytes": self.disk.max_bytes if self.disk else 0,
+                "disk_evictions": self.disk_evictions,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """The process-wide cache of a model, shared by every Embeder; None when caching is disabled."""
+    settings: Settings = get_settings()
+    if not settings.EMBED_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(
+        model_name=model_name,
+        dim=settings.EMBED_MODEL_SIZE,
+        memory_items=settings.EMBED_CACHE_MEMORY_ITEMS,
+        disk_max_bytes=settings.EMBED_CACHE_DISK_MAX_MB * 1024 * 1024,
+        directory=settings.EMBED_CACHE_DIR or EMBED_CACHE_DIR_PATH,
+    )
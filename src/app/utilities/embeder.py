@@ -1,20 +1,67 @@
+from typing import Optional
 from langchain_ollama import OllamaEmbeddings
 from src.helper.config import get_settings, Settings
+from .embedding_cache import get_embedding_cache
+from .fastembed_embeddings import FastEmbedEmbeddings, FastEmbedSparseEmbeddings
+from .ProcessEnum import EmbeddingKind, EmbeddingProviderEnum
 
 class Embeder:
     def __init__(self):
-        settings: Settings = get_settings()
-        self.model_name = settings.EMBEDDING_MODEL
-        self.embeddings = OllamaEmbeddings(model=self.model_name)
-        self.embed_size = settings.EMBED_MODEL_SIZE
+        self.settings: Settings = get_settings()
+        self.provider_name = self.settings.EMBEDDING_PROVIDER
+        self.model_name = self.settings.EMBEDDING_MODEL
+        self.embed_size = self.settings.EMBED_MODEL_SIZE
+        self.embeddings = self._initialize_model()
+        # Shared by every Embeder of the process; None when EMBED_CACHE_ENABLED is off
+        self.cache = get_embedding_cache(self.model_name)
+
+    def _initialize_model(self):
+        if self.provider_name == EmbeddingProviderEnum.OLLAMA.value:
+            return OllamaEmbeddings(model=self.model_name)
+
+        elif self.provider_name == EmbeddingProviderEnum.FASTEMBED.value:
+            model_size = FastEmbedEmbeddings.get_embedding_size(self.model_name)
+            if model_size != self.embed_size:
+                raise ValueError(
+                    f"{self.model_name} produces {model_size}-d vectors but EMBED_MODEL_SIZE is {self.embed_size}"
+                )
+            return FastEmbedEmbeddings(
+                model_name=self.model_name,
+                batch_size=self.settings.FASTEMBED_BATCH_SIZE,
+                threads=self.settings.FASTEMBED_THREADS or None,
+                cache_dir=self.settings.FASTEMBED_CACHE_DIR or None,
+            )
+        else:
+            raise ValueError(f"Unsupported embedding provider: {self.provider_name}")
+
+    def _embed_query_batch(self, queries: list[str]) -> list[list[float]]:
+        if self.provider_name == EmbeddingProviderEnum.FASTEMBED.value:
+            return self.embeddings.embed_queries(queries)
+        # Ollama embeds a query exactly like a document, so many queries can share one request
+        return self.embeddings.embed_documents(queries)
     
     def embed_chunks(self, texts: list[str]) -> list[list[float]]:
-        return self.embeddings.embed_documents(texts)
+        if self.cache is None:
+            return self.embeddings.embed_documents(texts)
+        return self.cache.embed(EmbeddingKind.DOCUMENT.value, texts, self.embeddings.embed_documents)
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        if self.cache is None:
+            return self._embed_query_batch(queries)
+        return self.cache.embed(EmbeddingKind.QUERY.value, queries, self._embed_query_batch)
     
     def embed_text(self, query: str) -> list[float]:
-        return self.embeddings.embed_query(query)
-
-
-
+        return self.embed_queries([query])[0]
 
 
+def get_sparse_embeder() -> Optional[FastEmbedSparseEmbeddings]:
+    """Sparse encoder of the hybrid search; None when HYBRID_SEARCH_ENABLED is off."""
+    settings: Settings = get_settings()
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return None
+    return FastEmbedSparseEmbeddings(
+        model_name=settings.SPARSE_EMBEDDING_MODEL,
+        batch_size=settings.FASTEMBED_BATCH_SIZE,
+        threads=settings.FASTEMBED_THREADS or None,
+        cache_dir=settings.FASTEMBED_CACHE_DIR or None,
+    )
@@ -0,0 +1,76 @@
+from functools import lru_cache
+from typing import Optional
+from fastembed import SparseTextEmbedding, TextEmbedding
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from qdrant_client.models import SparseVector
+
+
+@lru_cache(maxsize=4)
+def load_text_embedding(model_name: str, threads: Optional[int], cache_dir: Optional[str]) -> TextEmbedding:
+    """Loads an ONNX embedding model once per process; every Embeder shares it."""
+    return TextEmbedding(model_name=model_name, threads=threads, cache_dir=cache_dir)
+
+
+@lru_cache(maxsize=4)
+def load_sparse_text_embedding(model_name: str, threads: Optional[int], cache_dir: Optional[str]) -> SparseTextEmbedding:
+    """Loads a sparse (BM25/SPLADE) model once per process."""
+    return SparseTextEmbedding(model_name=model_name, threads=threads, cache_dir=cache_dir)
+
+
+@lru_cache(maxsize=2)
+def load_cross_encoder(model_name: str, threads: Optional[int], cache_dir: Optional[str]) -> TextCrossEncoder:
+    """Loads a reranking cross-encoder once per process."""
+    return TextCrossEncoder(model_name=model_name, threads=threads, cache_dir=cache_dir)
+
+
+class FastEmbedEmbeddings:
+    """In-process CPU embeddings with fastembed, using each model's passage and query prefixes."""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 64,
+        threads: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = load_text_embedding(model_name, threads, cache_dir)
+
+    @staticmethod
+    def get_embedding_size(model_name: str) -> int:
+        return TextEmbedding.get_embedding_size(model_name)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [vector.tolist() for vector in self.model.passage_embed(texts, batch_size=self.batch_size)]
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        return [vector.tolist() for vector in self.model.query_embed(queries, batch_size=self.batch_size)]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+
+class FastEmbedSparseEmbeddings:
+    """Sparse lexical vectors (BM25, SPLADE) for the keyword half of hybrid search."""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 64,
+        threads: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = load_sparse_text_embedding(model_name, threads, cache_dir)
+
+    def embed_documents(self, texts: list[str]) -> list[SparseVector]:
+        return [
+            SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
+            for embedding in self.model.embed(texts, batch_size=self.batch_size)
+        ]
+
+    def embed_query(self, text: str) -> SparseVector:
+        embedding = next(iter(self.model.query_embed(text)))
+        return SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
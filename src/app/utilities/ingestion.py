@@ -0,0 +1,419 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+from qdrant_client.models import SparseVector
+from langchain_core.documents import Document
+from src.app.database.mongo_db import ChunkModel, FileModel, FileStatusManager
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.database.mongo_db.schema import File
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel, payload_file_ids
+from src.helper.config import get_settings, Settings
+from .embeder import Embeder, get_sparse_embeder
+from .embed_scheduler import EmbeddingScheduler
+from .job_queue import FileProgress
+from .parse_executor import ParseExecutor
+from .process_file import FileProcessor, FILES_DIR_PATH
+from .ProcessEnum import ProcessSignal
+from .semantic_cache import SemanticCache
+from .splitter import TextSplitter
+
+logger = logging.getLogger("uvicorn.error")
+
+# Marks the end of the stream between two pipeline stages
+_END_OF_STREAM = None
+
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _file_id_payload(file_ids: list[str]) -> dict:
+    """file_id payload of a point: a plain id unless the point is shared by several files."""
+    return {"file_id": file_ids[0] if len(file_ids) == 1 else file_ids}
+
+
+async def _run_stages(*stages):
+    """Runs pipeline stages concurrently. The first failure cancels the other stages and is re-raised as is."""
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            for stage in stages:
+                task_group.create_task(stage)
+    except ExceptionGroup as eg:
+        error = eg.exceptions[0]
+        # A stage may run its own task group
+        while isinstance(error, ExceptionGroup):
+            error = error.exceptions[0]
+        raise error
+
+
+class IngestionService:
+    """Parses, chunks, embeds and indexes one file of a chat through a pipeline of bounded queues."""
+
+    def __init__(
+        self,
+        file_model: FileModel,
+        status_manager: FileStatusManager,
+        chunk_model: ChunkModel,
+        qdrant_model: QdrantdbModel,
+        parse_executor: ParseExecutor,
+        semantic_cache: Optional[SemanticCache] = None,
+        embeder: Optional[Embeder] = None,
+    ):
+        self.file_model = file_model
+        self.status_manager = status_manager
+        self.chunk_model = chunk_model
+        self.qdrant_model = qdrant_model
+        self.parse_executor = parse_executor
+        self.semantic_cache = semantic_cache
+        self.settings: Settings = get_settings()
+        # Shared by every file being ingested, so the embedding model sees one adaptive stream of batches
+        self.embed_scheduler = EmbeddingScheduler(
+            embeder or Embeder(),
+            max_concurrency=self.settings.INGESTION_EMBED_CONCURRENCY,
+            target_latency_ms=self.settings.INGESTION_EMBED_TARGET_LATENCY_MS,
+            max_retries=self.settings.INGESTION_EMBED_RETRIES,
+            retry_backoff_ms=self.settings.INGESTION_EMBED_RETRY_BACKOFF_MS,
+        )
+        self.sparse_embeder = get_sparse_embeder()
+        self.splitter = TextSplitter()
+        # Serializes read-modify-write of the file_id list of shared points
+        self._shared_points_lock = asyncio.Lock()
+
+    async def _set_status(self, chat_id: str, file_id: str, new_status: FileStatus):
+        if not await self.status_manager.transition(chat_id, [file_id], new_status):
+            logger.warning(f"File {file_id} was not moved to {new_status.value}: not in an allowed status")
+
+    async def process_file(self, chat_id: str, file_doc: File, progress: FileProgress):
+        """
+        Runs the full ingestion of one file and reports progress as it goes.
+        The file is expected to be PROCESSING already; it was claimed in batch when the job was submitted.
+        Parsing runs in the process pool and embedding in a thread, so the event loop stays responsive.
+        """
+        file_id = file_doc.file_id
+        file_extension = file_id.split(".")[-1].lower()
+        file_path = os.path.join(FILES_DIR_PATH, file_id)
+
+        chunk_queue = asyncio.Queue(maxsize=self.settings.INGESTION_QUEUE_SIZE)
+        vector_queue = asyncio.Queue(maxsize=self.settings.INGESTION_QUEUE_SIZE)
+        # Points written by this run; the only ones a failure may remove
+        written_ids: list[str] = []
+        # Points of a same-chat duplicate this run reused, mapped to whether the file was attached by it
+        attached: dict[str, bool] = {}
+        try:
+            if not FileProcessor.is_file_exists(file_id):
+                raise FileNotFoundError(ProcessSignal.NO_FILE_FOUND.value)
+
+            # Points of a previous version of the file (replace) or of an interrupted run
+            indexed_chunks, shared_ids = await self._load_indexed_chunks(file_id)
+
+            # Identical content was already indexed elsewhere: reuse its chunks and vectors
+            if indexed_chunks or not await self._reuse_indexed_copy(chat_id, file_doc, progress, written_ids, attached):
+                # Collections created before hybrid search have no sparse vector to fill
+                with_sparse = self.sparse_embeder is not None and await self.qdrant_model.has_sparse_vectors(
+                    self.settings.COLLECTION_APP_NAME
+                )
+                await _run_stages(
+                    self._split_pages(file_path, file_extension, indexed_chunks, chunk_queue, progress),
+                    self._embed_batches(chunk_queue, vector_queue, with_sparse, progress),
+                    self._upsert_batches(chat_id, file_doc, vector_queue, progress, written_ids),
+                )
+
+            if indexed_chunks:
+                # Whatever was not matched by a chunk of the new content has been removed from the file
+                stale_ids = [point_id for point_ids in indexed_chunks.values() for point_id, _ in point_ids]
+                await self.qdrant_model.delete_points(self.settings.COLLECTION_APP_NAME, stale_ids)
+                progress.chunks_deleted = len(stale_ids)
+            # Points the previous version shared with a duplicate now belong to the duplicate alone
+            await self._detach_from_points(file_id, shared_ids - attached.keys())
+
+            if indexed_chunks:
+                # The file may have been renamed by the replacement
+                await self.qdrant_model.set_payload_by_file(
+                    self.settings.COLLECTION_APP_NAME,
+                    file_id,
+                    {"original_filename": file_doc.original_filename},
+                )
+
+            await self._set_status(chat_id, file_id, FileStatus.INDEXED)
+            if self.semantic_cache is not None:
+                # Cached retrievals of the chat do not know about the new content
+                self.semantic_cache.invalidate(chat_id)
+
+        except Exception:
+            await self._set_status(chat_id, file_id, FileStatus.FAILED)
+            # Partial results of this run must not stay searchable. Points indexed before it, like the
+            # chunks a replaced file shares with its previous version, are still valid and are kept.
+            await self.qdrant_model.delete_points(self.settings.COLLECTION_APP_NAME, written_ids)
+            await self._detach_from_points(file_id, {point_id for point_id, new in attached.items() if new})
+            raise
+
+    async def _load_indexed_chunks(
+        self, file_id: str
+    ) -> tuple[dict[str, list[tuple[str, int]]], set[str]]:
+        """
+        Maps each chunk hash indexed for the file alone to its (point id, page number) pairs.
+        The ids of points shared with duplicate files are returned apart: they must not be
+        rewritten or deleted for this file.
+        """
+        indexed_chunks: dict[str, list[tuple[str, int]]] = {}
+        shared_ids: set[str] = set()
+        async for records in self.qdrant_model.scroll_points_by_file(
+            collection_name=self.settings.COLLECTION_APP_NAME,
+            file_id=file_id,
+            with_vectors=False,
+            with_payload=["chunk_hash", "page_number", "file_id"],
+        ):
+            for record in records:
+                if len(payload_file_ids(record.payload)) > 1:
+                    shared_ids.add(record.id)
+                    continue
+                # Points indexed before chunk hashes existed are keyed by None and never match
+                indexed_chunks.setdefault(record.payload.get("chunk_hash"), []).append(
+                    (record.id, record.payload.get("page_number"))
+                )
+        return indexed_chunks, shared_ids
+
+    async def _reuse_indexed_copy(
+        self,
+        chat_id: str,
+        file_doc: File,
+        progress: FileProgress,
+        written_ids: list[str],
+        attached: dict[str, bool],
+    ) -> bool:
+        """
+        Reuses the points of an already indexed file with the same content hash. Returns False if there
+        is nothing to reuse. Parsing and embedding are skipped either way.
+        A duplicate in the same chat is attached to the existing points, so nothing is written but a
+        file_id list. Points belong to one chat's tenant, so a copy in another chat writes new points
+        with the vectors of the source.
+        """
+        if not file_doc.content_hash:
+            return False
+        source_doc = await self.file_model.find_indexed_file_by_hash(
+            file_doc.content_hash, exclude_file_id=file_doc.file_id, chat_id=chat_id
+        )
+        if not source_doc:
+            return False
+
+        if source_doc.chat_id == chat_id:
+            await self._attach_to_points(source_doc.file_id, file_doc.file_id, progress, attached)
+        else:
+            await self._copy_points(chat_id, source_doc.file_id, file_doc, progress, written_ids)
+
+        # Points indexed before file_id was stored in the payload cannot be found; index from scratch
+        if progress.chunks_reused == 0:
+            return False
+        progress.reused_from = source_doc.file_id
+        return True
+
+    async def _attach_to_points(self, source_file_id: str, file_id: str, progress: FileProgress, attached: dict[str, bool]):
+        """Adds the file to the file ids of every point of the source file."""
+        # The file ids are read and written under the lock, so concurrent runs do not drop each other's ids
+        async with self._shared_points_lock:
+            async for records in self.qdrant_model.scroll_points_by_file(
+                collection_name=self.settings.COLLECTION_APP_NAME,
+                file_id=source_file_id,
+                with_vectors=False,
+                with_payload=["file_id"],
+                batch_size=self.settings.INGESTION_UPSERT_BATCH_SIZE,
+            ):
+                updates = []
+                for record in records:
+                    file_ids = payload_file_ids(record.payload)
+                    attached[record.id] = file_id not in file_ids
+                    if attached[record.id]:
+                        updates.append((record.id, _file_id_payload(file_ids + [file_id])))
+                await self.qdrant_model.set_payloads(self.settings.COLLECTION_APP_NAME, updates)
+                progress.chunks_total += len(records)
+                progress.chunks_reused += len(records)
+
+    async def _detach_from_points(self, file_id: str, point_ids: set[str]):
+        """Removes the file from the file ids of the given shared points; they stay with the other files."""
+        if not point_ids:
+            return
+        async with self._shared_points_lock:
+            async for records in self.qdrant_model.scroll_points_by_file(
+                collection_name=self.settings.COLLECTION_APP_NAME,
+                file_id=file_id,
+                with_vectors=False,
+                with_payload=["file_id"],
+            ):
+                updates = []
+                for record in records:
+                    file_ids = payload_file_ids(record.payload)
+                    if record.id in point_ids and len(file_ids) > 1:
+                        updates.append((record.id, _file_id_payload([other for other in file_ids if other != file_id])))
+                await self.qdrant_model.set_payloads(self.settings.COLLECTION_APP_NAME, updates)
+
+    async def _copy_points(
+        self, chat_id: str, source_file_id: str, file_doc: File, progress: FileProgress, written_ids: list[str]
+    ):
+        """Writes new points for the file with the vectors of the source file's points."""
+        async for records in self.qdrant_model.scroll_points_by_file(
+            collection_name=self.settings.COLLECTION_APP_NAME,
+            file_id=source_file_id,
+            batch_size=self.settings.INGESTION_UPSERT_BATCH_SIZE,
+        ):
+            payloads = [
+                {
+                    **record.payload,
+                    "chat_id": chat_id,
+                    "file_id": file_doc.file_id,
+                    "original_filename": file_doc.original_filename,
+                }
+                for record in records
+            ]
+            ids = [str(uuid.uuid4()) for _ in range(len(records))]
+            written_ids.extend(ids)
+            await self.qdrant_model.upsert_points(
+                collection_name=self.settings.COLLECTION_APP_NAME,
+                vectors=[record.vector for record in records],
+                payloads=payloads,
+                ids=ids,
+            )
+            progress.chunks_total += len(records)
+            progress.chunks_reused += len(records)
+            progress.points_upserted += len(records)
+
+    def _split_page(self, page: Document) -> list[Document]:
+        """Chunks of one page with their content hash; CPU-bound, so it runs in a worker thread."""
+        chunks = self.splitter.split_texts([page.page_content], [page.metadata])
+        for doc in chunks:
+            doc.metadata["chunk_hash"] = _chunk_hash(doc.page_content)
+        return chunks
+
+    async def _split_pages(
+        self,
+        file_path: str,
+        file_extension: str,
+        indexed_chunks: dict[str, list[tuple[str, int]]],
+        chunk_queue: asyncio.Queue,
+        progress: FileProgress,
+    ):
+        """
+        Stage 1: split pages as soon as they are parsed and emit fixed-size batches of chunks.
+        Chunks that are already indexed are consumed from indexed_chunks instead of being re-embedded;
+        only their page number is patched if it moved.
+        """
+        batch_size = self.settings.INGESTION_EMBED_BATCH_SIZE
+        batch: list[Document] = []
+        moved_chunks: list[tuple[str, dict]] = []
+        async for page in self.parse_executor.iter_pages(file_path, file_extension):
+            progress.pages_parsed += 1
+            # Splitting, token counting and hashing would stall the event loop on large pages
+            chunks = await asyncio.to_thread(self._split_page, page)
+            progress.chunks_total += len(chunks)
+            for doc in chunks:
+                matches = indexed_chunks.get(doc.metadata["chunk_hash"])
+                if not matches:
+                    batch.append(doc)
+                    continue
+                point_id, page_number = matches.pop()
+                if not matches:
+                    del indexed_chunks[doc.metadata["chunk_hash"]]
+                progress.chunks_reused += 1
+                if page_number != doc.metadata.get("page"):
+                    moved_chunks.append(
+                        (point_id, {"page_number": doc.metadata.get("page")})
+                    )
+            while len(batch) >= batch_size:
+                await chunk_queue.put(batch[:batch_size])
+                batch = batch[batch_size:]
+            if len(moved_chunks) >= self.settings.INGESTION_UPSERT_BATCH_SIZE:
+                await self.qdrant_model.set_payloads(self.settings.COLLECTION_APP_NAME, moved_chunks)
+                moved_chunks = []
+        if batch:
+            await chunk_queue.put(batch)
+        await self.qdrant_model.set_payloads(self.settings.COLLECTION_APP_NAME, moved_chunks)
+        await chunk_queue.put(_END_OF_STREAM)
+
+    async def _embed_batches(
+        self, chunk_queue: asyncio.Queue, vector_queue: asyncio.Queue, with_sparse: bool, progress: FileProgress
+    ):
+        """
+        Stage 2: embed batches of chunks, several at a time through the shared scheduler.
+        Sparse vectors for hybrid search are computed locally while the dense batch is in flight.
+        A slot is held until the vectors are handed to the upsert stage, so a slow upsert throttles embedding too.
+        """
+        slots = asyncio.Semaphore(self.settings.INGESTION_EMBED_CONCURRENCY)
+
+        async def embed(chunks: list[Document]):
+            try:
+                texts = [doc.page_content for doc in chunks]
+                if with_sparse:
+                    vectors, sparse_vectors = await asyncio.gather(
+                        self.embed_scheduler.embed(texts),
+                        asyncio.to_thread(self.sparse_embeder.embed_documents, texts),
+                    )
+                else:
+                    vectors, sparse_vectors = await self.embed_scheduler.embed(texts), None
+                progress.chunks_embedded += len(chunks)
+                await vector_queue.put((chunks, vectors, sparse_vectors))
+            finally:
+                slots.release()
+
+        async with asyncio.TaskGroup() as task_group:
+            while True:
+                await slots.acquire()
+                chunks = await chunk_queue.get()
+                if chunks is _END_OF_STREAM:
+                    slots.release()
+                    break
+                task_group.create_task(embed(chunks))
+        await vector_queue.put(_END_OF_STREAM)
+
+    async def _upsert_batches(
+        self, chat_id: str, file_doc: File, vector_queue: asyncio.Queue, progress: FileProgress, written_ids: list[str]
+    ):
+        """Stage 3: collect embedded chunks and upsert them to Qdrant in batches."""
+        chunks: list[Document] = []
+        vectors: list[list[float]] = []
+        sparse_vectors: list[SparseVector] = []
+        while (item := await vector_queue.get()) is not _END_OF_STREAM:
+            chunks.extend(item[0])
+            vectors.extend(item[1])
+            sparse_vectors.extend(item[2] or [])
+            if len(chunks) >= self.settings.INGESTION_UPSERT_BATCH_SIZE:
+                await self._upsert(chat_id, file_doc, chunks, vectors, sparse_vectors or None, progress, written_ids)
+                chunks, vectors, sparse_vectors = [], [], []
+        if chunks:
+            await self._upsert(chat_id, file_doc, chunks, vectors, sparse_vectors or None, progress, written_ids)
+
+    async def _upsert(
+        self,
+        chat_id: str,
+        file_doc: File,
+        chunks: list[Document],
+        vectors: list[list[float]],
+        sparse_vectors: Optional[list[SparseVector]],
+        progress: FileProgress,
+        written_ids: list[str],
+    ):
+        # Points only carry what filtering and citations need; the text is stored once per hash in Mongo,
+        # before the points, so a search never finds a point whose text is missing
+        await self.chunk_model.insert_chunks({doc.metadata["chunk_hash"]: doc.page_content for doc in chunks})
+        payloads = [
+            {
+                "chat_id": chat_id,
+                "file_id": file_doc.file_id,
+                "chunk_hash": doc.metadata["chunk_hash"],
+                "original_filename": file_doc.original_filename,
+                "page_number": doc.metadata.get("page", None),
+            }
+            for doc in chunks
+        ]
+        ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
+        # Recorded before the request: a failed upsert may still have written some of them
+        written_ids.extend(ids)
+        await self.qdrant_model.upsert_points(
+            collection_name=self.settings.COLLECTION_APP_NAME,
+            vectors=vectors,
+            payloads=payloads,
+            ids=ids,
+            sparse_vectors=sparse_vectors,
+        )
+        progress.points_upserted += len(payloads)
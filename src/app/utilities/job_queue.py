@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+from pydantic import BaseModel, Field
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.database.mongo_db.schema import File
+from .ProcessEnum import JobStatus
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class FileProgress(BaseModel):
+    """Progress of a single file inside an ingestion job."""
+    file_id: str
+    status: str = Field(default=FileStatus.UPLOADED.value)
+    pages_parsed: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    points_upserted: int = 0
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+    reused_from: Optional[str] = None
+    error: Optional[str] = None
+
+    def is_finished(self) -> bool:
+        return self.status in (FileStatus.INDEXED.value, FileStatus.FAILED.value)
+
+
+class IngestionJob(BaseModel):
+    """A batch of files of one chat submitted through /data/process."""
+    job_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    chat_id: str
+    status: str = Field(default=JobStatus.QUEUED.value)
+    files: list[FileProgress] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED.value, JobStatus.FAILED.value)
+
+
+FileHandler = Callable[[str, File, FileProgress], Awaitable[None]]
+
+
+class IngestionJobQueue:
+    """Runs ingestion jobs on a bounded pool of workers, file by file and round-robin across chats."""
+
+    def __init__(self, handler: FileHandler, num_workers: int, max_finished_jobs: int = 500):
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: dict[str, IngestionJob] = {}
+        # chat_id -> files waiting for a worker; a chat is in the rotation only while it has work
+        self._pending: dict[str, deque[tuple[IngestionJob, File, FileProgress]]] = {}
+        self._rotation: deque[str] = deque()
+        self._in_flight: set[tuple[str, str]] = set()
+        self._condition = asyncio.Condition()
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        """Spawn the worker tasks on the running event loop."""
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+
+    async def stop(self):
+        """Cancel the workers. Files left half-processed stay pending and are picked up by the next job."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, chat_id: str, files: list[File], reserved: bool = False) -> Optional[IngestionJob]:
+        """
+        Queue the given files of a chat as one job. The file documents are handed to the handler as is.
+        Files that are already queued or running are skipped; returns None if nothing is left.
+        With reserved=True the files were claimed through reserve and are queued regardless.
+        """
+        async with self._condition:
+            new_files = files if reserved else [f for f in files if (chat_id, f.file_id) not in self._in_flight]
+            if not new_files:
+                return None
+
+            job = IngestionJob(
+                chat_id=chat_id,
+                files=[FileProgress(file_id=file_doc.file_id) for file_doc in new_files],
+            )
+            self.jobs[job.job_id] = job
+
+            if chat_id not in self._pending:
+                self._pending[chat_id] = deque()
+                self._rotation.append(chat_id)
+            for file_doc, progress in zip(new_files, job.files):
+                self._in_flight.add((chat_id, progress.file_id))
+                self._pending[chat_id].append((job, file_doc, progress))
+
+            self._prune_finished_jobs()
+            self._condition.notify(len(job.files))
+        return job
+
+    def is_in_flight(self, chat_id: str, file_id: str) -> bool:
+        """True while the file is queued or being processed."""
+        return (chat_id, file_id) in self._in_flight
+
+    def reserve(self, chat_id: str, file_id: str) -> bool:
+        """
+        Claim a file before it is submitted, so no other job picks it up meanwhile.
+        Returns False if the file is already queued, running or reserved. A reservation
+        ends with submit(..., reserved=True) or, if the file is not submitted after all, release.
+        """
+        if (chat_id, file_id) in self._in_flight:
+            return False
+        self._in_flight.add((chat_id, file_id))
+        return True
+
+    def release(self, chat_id: str, file_id: str):
+        """Drop a reservation that is not going to be submitted."""
+        self._in_flight.discard((chat_id, file_id))
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self, chat_id: str) -> list[IngestionJob]:
+        return [job for job in self.jobs.values() if job.chat_id == chat_id]
+
+    def _next_task(self) -> tuple[IngestionJob, File, FileProgress]:
+        """Pop one file from the chat at the head of the rotation. Caller must hold the condition lock."""
+        chat_id = self._rotation.popleft()
+        chat_queue = self._pending[chat_id]
+        task = chat_queue.popleft()
+        if chat_queue:
+            self._rotation.append(chat_id)
+        else:
+            del self._pending[chat_id]
+        return task
+
+    async def _worker(self):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._rotation)
+                job, file_doc, progress = self._next_task()
+            await self._run(job, file_doc, progress)
+
+    async def _run(self, job: IngestionJob, file_doc: File, progress: FileProgress):
+        if job.status == JobStatus.QUEUED.value:
+            job.status = JobStatus.RUNNING.value
+            job.started_at = datetime.now(timezone.utc)
+
+        progress.status = FileStatus.PROCESSING.value
+        try:
+            await self.handler(job.chat_id, file_doc, progress)
+            progress.status = FileStatus.INDEXED.value
+        except Exception as e:
+            logger.error(f"Ingestion of file {progress.file_id} in job {job.job_id} failed: {str(e)}")
+            progress.status = FileStatus.FAILED.value
+            progress.error = str(e)
+        finally:
+            self._in_flight.discard((job.chat_id, progress.file_id))
+
+        if all(f.is_finished() for f in job.files):
+            all_failed = all(f.status == FileStatus.FAILED.value for f in job.files)
+            job.status = JobStatus.FAILED.value if all_failed else JobStatus.COMPLETED.value
+            job.finished_at = datetime.now(timezone.utc)
+
+    def _prune_finished_jobs(self):
+        """Forget the oldest finished jobs once more than max_finished_jobs are kept."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished()]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
@@ -0,0 +1,34 @@
+from collections import deque
+import numpy as np
+
+
+class LatencyStats:
+    """Rolling window of time to first token and time to full answer of chat answers."""
+
+    def __init__(self, window: int = 1000):
+        self._first_token: deque[float] = deque(maxlen=window)
+        self._total: deque[float] = deque(maxlen=window)
+        self.answers = 0
+
+    def record(self, first_token_seconds: float, total_seconds: float):
+        self._first_token.append(first_token_seconds)
+        self._total.append(total_seconds)
+        self.answers += 1
+
+    @staticmethod
+    def _percentiles(samples: deque) -> dict:
+        if not samples:
+            return {"p50_ms": None, "p95_ms": None}
+        values = np.array(samples) * 1000
+        return {
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p95_ms": round(float(np.percentile(values, 95)), 1),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "answers": self.answers,
+            "window": len(self._total),
+            "time_to_first_token": self._percentiles(self._first_token),
+            "time_to_full_answer": self._percentiles(self._total),
+        }
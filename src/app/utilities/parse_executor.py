@@ -0,0 +1,103 @@
+import os
+import asyncio
+import multiprocessing
+from collections import deque
+from typing import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+import pymupdf
+from langchain_core.documents import Document
+from .loader import Loader
+from .ProcessEnum import ProcessSignal
+
+
+# The functions below run inside the worker processes, so they must stay module-level (picklable).
+
+def _load_file(file_path: str, file_extension: str) -> list:
+    """Loads a whole file with the regular Loader."""
+    return Loader(file_extension=file_extension).load(file_path)
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    with pymupdf.open(file_path) as pdf:
+        return pdf.page_count
+
+
+def _pdf_metadata(pdf: pymupdf.Document, file_path: str) -> dict:
+    """Builds the same document-level metadata PyMuPDFLoader attaches to every page."""
+    metadata = {
+        "producer": "PyMuPDF",
+        "creator": "PyMuPDF",
+        "creationdate": "",
+        "source": file_path,
+        "file_path": file_path,
+        "total_pages": pdf.page_count,
+    }
+    metadata.update(
+        {k: v for k, v in pdf.metadata.items() if isinstance(v, (str, int)) and v != ""}
+    )
+    return metadata
+
+
+def _load_pdf_pages(file_path: str, start: int, stop: int) -> list[Document]:
+    """Extracts the pages [start, stop) of a PDF, one Document per page."""
+    with pymupdf.open(file_path) as pdf:
+        doc_metadata = _pdf_metadata(pdf, file_path)
+        return [
+            Document(
+                page_content=pdf[page_number].get_text().strip(),
+                metadata={**doc_metadata, "page": page_number},
+            )
+            for page_number in range(start, stop)
+        ]
+
+
+class ParseExecutor:
+    """Parses documents in a process pool, splitting large PDFs into page ranges parsed in parallel."""
+
+    def __init__(self, max_workers: int = 0, pdf_pages_per_task: int = 50):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pdf_pages_per_task = pdf_pages_per_task
+        # spawn keeps the workers clean of the server's event loop and client threads
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def page_ranges(self, page_count: int) -> list[tuple[int, int]]:
+        """Splits [0, page_count) into consecutive ranges of at most pdf_pages_per_task pages."""
+        step = max(1, self.pdf_pages_per_task)
+        return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    async def iter_pages(self, file_path: str, file_extension: str) -> AsyncIterator[Document]:
+        """
+        Yields the pages of a file in order while it is still being parsed.
+        At most max_workers PDF page ranges are in flight, so memory stays bounded for huge files.
+        """
+        loop = asyncio.get_running_loop()
+        if file_extension != "pdf":
+            documents = await loop.run_in_executor(self.pool, _load_file, file_path, file_extension)
+            if documents is None:
+                raise ValueError(ProcessSignal.FILE_TYPE_NOT_SUPPORTED.value)
+            for doc in documents:
+                yield doc
+            return
+
+        page_count = await loop.run_in_executor(self.pool, _count_pdf_pages, file_path)
+        in_flight: deque[asyncio.Future] = deque()
+        try:
+            for start, stop in self.page_ranges(page_count):
+                in_flight.append(
+                    loop.run_in_executor(self.pool, _load_pdf_pages, file_path, start, stop)
+                )
+                if len(in_flight) >= self.max_workers:
+                    for doc in await in_flight.popleft():
+                        yield doc
+            while in_flight:
+                for doc in await in_flight.popleft():
+                    yield doc
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
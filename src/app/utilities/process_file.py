@@ -1,5 +1,6 @@
 import os
 import re
+import hashlib
 from fastapi import UploadFile
 import aiofiles
 from .ProcessEnum import ProcessSignal
@@ -25,31 +26,43 @@ class FileProcessor:
         
         if self.file.content_type not in self.setttings.FILE_ALLOWED_TYPES:
             return False, ProcessSignal.FILE_TYPE_NOT_SUPPORTED.value
-        if self.file.size > self.setttings.FILE_MAX_SIZE_MB * 1024 * 1024:
+        # The declared size is only a hint; the limit is enforced again while saving
+        if self.file.size is not None and self.file.size > self.max_size_bytes:
             return False, ProcessSignal.FILE_SIZE_EXCEEDED.value
         
         return True, ProcessSignal.FILE_VALIDATE_SUCCESS.value
     
-    def generate_random_string(self,length:int = 12):
+    @property
+    def max_size_bytes(self) -> int:
+        return self.setttings.FILE_MAX_SIZE_MB * 1024 * 1024
+
+    @staticmethod
+    def generate_random_string(length:int = 12):
         return ''.join(random.choices(string.ascii_lowercase+string.digits,k=length))
-    def get_clean_filename(self,orignal_filename:str):
+    @staticmethod
+    def get_clean_filename(orignal_filename:str):
         cleaned_filename = re.sub(r'[^\w.]','',orignal_filename.strip()).replace(' ','_')
         
         return cleaned_filename
 
     def generate_unique_filepath(self) -> tuple[str, str]:
         """Generates a unique file path for the uploaded file to prevent overwriting existing files."""
-        random_key = self.generate_random_string() 
-        cleaned_filename = self.get_clean_filename(self.file.filename)
+        return self.unique_filepath_for(self.file.filename)
+
+    @classmethod
+    def unique_filepath_for(cls, filename: str) -> tuple[str, str]:
+        """Generates a unique file path and file_id for the given original filename."""
+        random_key = cls.generate_random_string() 
+        cleaned_filename = cls.get_clean_filename(filename)
         new_file_path = os.path.join(
-            self.files_dir,
+            FILES_DIR_PATH,
             random_key+"_"+cleaned_filename
         )
 
         while os.path.exists(new_file_path):
-            random_key = self.generate_random_string() 
+            random_key = cls.generate_random_string() 
             new_file_path = os.path.join(
-                self.files_dir,
+                FILES_DIR_PATH,
                 random_key+"_"+cleaned_filename
             )      
             
@@ -57,16 +70,30 @@ class FileProcessor:
     
 
     
-    async def save_uploaded_file(self, file_path: str) -> str:
-        """Saves the uploaded file to the specified file path asynchronously."""
+    async def save_uploaded_file(self, file_path: str) -> tuple[str, str]:
+        """
+        Saves the uploaded file to the specified file path asynchronously.
+        Returns the file path and the SHA-256 of the content, computed while copying.
+        Aborts with ValueError and removes the partial file as soon as FILE_MAX_SIZE_MB is exceeded.
+        The upload is already fully received (spooled by Starlette), so this bounds what is kept, not what is read off the wire.
+        """
         await self.file.seek(0)
+        sha256 = hashlib.sha256()
+        written = 0
         
         async with aiofiles.open(file_path, "wb") as f:
             while content := await self.file.read(self.setttings.FILE_UPLOAD_CHUNK_SIZE):
+                written += len(content)
+                if written > self.max_size_bytes:
+                    break
+                sha256.update(content)
                 await f.write(content)
 
+        if written > self.max_size_bytes:
+            os.remove(file_path)
+            raise ValueError(ProcessSignal.FILE_SIZE_EXCEEDED.value)
         
-        return file_path
+        return file_path, sha256.hexdigest()
     
     @classmethod 
     def is_file_exists(cls, file_id: str) -> bool:
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Optional
+from .embeder import Embeder
+
+
+class QueryEmbedder:
+    """Micro-batches the query texts of concurrent callers into as few embedding requests as possible."""
+
+    def __init__(self, embeder: Embeder, max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.embeder = embeder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def stop(self):
+        """Sends what is still pending and waits for the batches in flight."""
+        if self._pending:
+            self._flush()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = loop.create_task(self._embed_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _embed_batch(self, batch: list[tuple[str, asyncio.Future]]):
+        try:
+            vectors = await asyncio.to_thread(self.embeder.embed_queries, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            # The caller may have been cancelled while the batch was in flight
+            if not future.done():
+                future.set_result(vector)
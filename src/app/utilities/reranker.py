@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.documents import Document
+from src.helper.config import get_settings, Settings
+from .fastembed_embeddings import load_cross_encoder
+
+
+class Reranker:
+    """Re-orders retrieved chunks with a local cross-encoder, caching scores per (query, chunk)."""
+
+    def __init__(self):
+        self.settings: Settings = get_settings()
+        self.top_n = self.settings.RERANK_TOP_N
+        self.batch_size = self.settings.RERANK_BATCH_SIZE
+        self.model = load_cross_encoder(
+            self.settings.RERANK_MODEL,
+            self.settings.FASTEMBED_THREADS or None,
+            self.settings.FASTEMBED_CACHE_DIR or None,
+        )
+        self.cache_size = self.settings.RERANK_CACHE_SIZE
+        self._scores: OrderedDict[tuple[bytes, str], float] = OrderedDict()
+
+    def _score(self, query: str, texts: list[str]) -> list[float]:
+        return list(self.model.rerank(query, texts, batch_size=self.batch_size))
+
+    def _remember(self, key: tuple[bytes, str], score: float):
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.cache_size:
+            self._scores.popitem(last=False)
+
+    async def rerank(self, query: str, docs: list[Document], top_n: Optional[int] = None) -> list[Document]:
+        """Scores docs against the query and returns the top_n, best first, with a rerank_score in the metadata."""
+        if not docs:
+            return docs
+        query_digest = hashlib.sha256(query.encode("utf-8")).digest()
+        keys = [(query_digest, doc.metadata.get("point_id")) for doc in docs]
+
+        scores: dict[int, float] = {}
+        missing: list[int] = []
+        for i, key in enumerate(keys):
+            # Documents without a point id cannot be cached
+            if key[1] is not None and key in self._scores:
+                self._scores.move_to_end(key)
+                scores[i] = self._scores[key]
+            else:
+                missing.append(i)
+
+        if missing:
+            computed = await asyncio.to_thread(self._score, query, [docs[i].page_content for i in missing])
+            for i, score in zip(missing, computed):
+                scores[i] = score
+                if keys[i][1] is not None:
+                    self._remember(keys[i], score)
+
+        ranked = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in ranked[: top_n or self.top_n]:
+            docs[i].metadata["rerank_score"] = scores[i]
+            reranked.append(docs[i])
+        return reranked
+
+
+def get_reranker() -> Optional[Reranker]:
+    """The reranking stage of the retriever; None when RERANK_ENABLED is off."""
+    if not get_settings().RERANK_ENABLED:
+        return None
+    return Reranker()
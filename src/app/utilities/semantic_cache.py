@@ -0,0 +1,134 @@
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from langchain_core.documents import Document
+from pydantic import BaseModel, ConfigDict, Field
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.database.mongo_db.schema import File
+
+
+def file_fingerprint(files: list[File]) -> str:
+    """Identifies the indexed content of a chat; it changes whenever a file is indexed or re-indexed."""
+    indexed = sorted(
+        f"{f.file_id}:{f.content_hash}" for f in files if f.status == FileStatus.INDEXED.value
+    )
+    return hashlib.sha256("\n".join(indexed).encode("utf-8")).hexdigest()
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class SemanticCacheEntry(BaseModel):
+    """Retrieval result (and optionally the answer) of one standalone question."""
+    vector: np.ndarray
+    file_fingerprint: str
+    documents: list[Document]
+    retrieval_seconds: float
+    answer: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+class SemanticCache:
+    """Per-chat cache of retrieval results, keyed by the embedding of the standalone question."""
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries_per_chat: int = 64,
+        max_chats: int = 1000,
+        cache_answers: bool = False,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_chat = max_entries_per_chat
+        self.max_chats = max_chats
+        self.cache_answers = cache_answers
+        self._chats: OrderedDict[str, list[SemanticCacheEntry]] = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.answer_hits = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def _find(self, chat_id: str, vector: np.ndarray, fingerprint: str) -> Optional[SemanticCacheEntry]:
+        entries = self._chats.get(chat_id)
+        if not entries:
+            return None
+        # Entries computed for another set of files can never match again
+        entries[:] = [entry for entry in entries if entry.file_fingerprint == fingerprint]
+        if not entries:
+            return None
+        similarities = np.stack([entry.vector for entry in entries]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        self._chats.move_to_end(chat_id)
+        return entries[best]
+
+    def lookup(self, chat_id: str, vector: list[float], fingerprint: str) -> Optional[list[Document]]:
+        """Cached documents of a similar question, or None."""
+        self.lookups += 1
+        entry = self._find(chat_id, _normalize(vector), fingerprint)
+        if entry is None:
+            return None
+        self.hits += 1
+        self.saved_seconds += entry.retrieval_seconds
+        return list(entry.documents)
+
+    def store(
+        self, chat_id: str, vector: list[float], fingerprint: str, documents: list[Document], retrieval_seconds: float
+    ):
+        entries = self._chats.setdefault(chat_id, [])
+        self._chats.move_to_end(chat_id)
+        entries.append(
+            SemanticCacheEntry(
+                vector=_normalize(vector),
+                file_fingerprint=fingerprint,
+                documents=documents,
+                retrieval_seconds=retrieval_seconds,
+            )
+        )
+        del entries[: -self.max_entries_per_chat]
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+
+    def lookup_answer(self, chat_id: str, vector: list[float], fingerprint: str) -> Optional[str]:
+        """Cached answer of a similar question; always None unless answers are cached."""
+        if not self.cache_answers:
+            return None
+        entry = self._find(chat_id, _normalize(vector), fingerprint)
+        if entry is None or entry.answer is None:
+            return None
+        self.answer_hits += 1
+        return entry.answer
+
+    def store_answer(self, chat_id: str, vector: list[float], fingerprint: str, answer: str):
+        """Attaches the answer to the entry of its question, stored earlier by the retriever."""
+        if not self.cache_answers:
+            return
+        entry = self._find(chat_id, _normalize(vector), fingerprint)
+        if entry is not None and entry.answer is None:
+            entry.answer = answer
+
+    def invalidate(self, chat_id: str):
+        """Drops every entry of a chat, e.g. after new content was indexed."""
+        if self._chats.pop(chat_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "answer_hits": self.answer_hits,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "invalidations": self.invalidations,
+            "chats": len(self._chats),
+            "entries": sum(len(entries) for entries in self._chats.values()),
+        }
@@ -1,19 +1,132 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter 
+from bisect import bisect_right
+from typing import Iterator, Optional
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from src.helper.config import get_settings , Settings
+from .ProcessEnum import SplitterMode
+from .tokenizer import TokenCounter
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+
+class OffsetTextSplitter:
+    """Splits text by walking character offsets into the original string, in characters or tokens."""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        token_counter: Optional[TokenCounter] = None,
+        separators: list[str] = DEFAULT_SEPARATORS,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.token_counter = token_counter
+        self.separators = separators
+
+    def _find_boundary(self, text: str, lo: int, hi: int) -> int:
+        """Split position in text[lo:hi], preferring the strongest separator closest to hi."""
+        for separator in self.separators:
+            position = text.rfind(separator, lo, hi)
+            if position != -1:
+                return position + len(separator)
+        return hi
+
+    def _char_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        length = len(text)
+        start = 0
+        while start < length:
+            hard_end = min(start + self.chunk_size, length)
+            if hard_end == length:
+                end = length
+            else:
+                # never cut a chunk below half its size just to land on a separator
+                end = self._find_boundary(text, start + self.chunk_size // 2, hard_end)
+            yield start, end
+            if end >= length:
+                break
+
+            next_start = max(end - self.chunk_overlap, start + 1)
+            if next_start < end:
+                # start the overlap on a word boundary
+                space = text.find(" ", next_start, end)
+                if space != -1:
+                    next_start = space + 1
+            start = next_start
+
+    def _token_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        offsets = self.token_counter.token_offsets(text)
+        token_ends = [end for _, end in offsets]
+        num_tokens = len(offsets)
+        first = 0
+        while first < num_tokens:
+            last = min(first + self.chunk_size, num_tokens)
+            if last < num_tokens:
+                lo = offsets[first + self.chunk_size // 2][0]
+                boundary = self._find_boundary(text, lo, token_ends[last - 1])
+                # keep only the tokens that end before the chosen boundary
+                last = max(bisect_right(token_ends, boundary, first, last), first + 1)
+            yield offsets[first][0], token_ends[last - 1]
+            if last >= num_tokens:
+                break
+            first = max(last - self.chunk_overlap, first + 1)
+
+    def split_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yields the (start, end) character offsets of every chunk, trimmed of surrounding whitespace."""
+        spans = self._token_spans(text) if self.token_counter else self._char_spans(text)
+        for start, end in spans:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                yield start, end
+
+    def create_documents(self, texts: list[str], metadatas: list[dict]) -> list[Document]:
+        """Same contract as the langchain splitters; chunk offsets are added to the metadata."""
+        return [
+            Document(
+                page_content=text[start:end],
+                metadata={**metadata, "start_index": start, "end_index": end},
+            )
+            for text, metadata in zip(texts, metadatas)
+            for start, end in self.split_spans(text)
+        ]
+
 
 class TextSplitter:
-    
+
     def __init__(self):
         self.settings: Settings = get_settings()
         self.chunk_size = self.settings.CHUNK_SIZE
         self.chunk_overlap = self.settings.CHUNK_OVERLAP
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap
-        )    
-    
-    def split_texts(self, texts: list[str], metadatas: list[dict]) -> list[dict]:
+        self.mode = self.settings.SPLITTER_MODE
+        self.splitter = self._initialize_splitter()
+
+    def _initialize_splitter(self):
+        if self.mode == SplitterMode.RECURSIVE.value:
+            return RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap
+            )
+
+        elif self.mode == SplitterMode.OFFSET.value:
+            # With a tokenizer configured, CHUNK_SIZE/CHUNK_OVERLAP are counted in tokens
+            token_counter = (
+                TokenCounter(self.settings.SPLITTER_TOKENIZER)
+                if self.settings.SPLITTER_TOKENIZER
+                else None
+            )
+            return OffsetTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                token_counter=token_counter,
+            )
+        else:
+            raise ValueError(f"Unsupported splitter mode: {self.mode}")
+
+    def split_texts(self, texts: list[str], metadatas: list[dict]) -> list[Document]:
         documents = self.splitter.create_documents(texts=texts, metadatas=metadatas)
         return documents
-
-    
\ No newline at end of file
@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Optional
+from tokenizers import Tokenizer
+
+# Rough characters-per-token ratio used when no tokenizer is configured
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=4)
+def load_tokenizer(tokenizer_name: str) -> Tokenizer:
+    """Loads a HuggingFace tokenizer once per process."""
+    return Tokenizer.from_pretrained(tokenizer_name)
+
+
+class TokenCounter:
+    """Counts tokens like the configured model, or estimates them from characters without a tokenizer."""
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.tokenizer_name = tokenizer_name
+        self.tokenizer: Optional[Tokenizer] = load_tokenizer(tokenizer_name) if tokenizer_name else None
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def token_offsets(self, text: str) -> list[tuple[int, int]]:
+        """Character span of every token in the text."""
+        return self.tokenizer.encode(text, add_special_tokens=False).offsets
@@ -0,0 +1,251 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional, TextIO
+from bson.objectid import ObjectId
+from pydantic import BaseModel, Field
+from src.app.database.mongo_db import MessageModel
+from src.app.database.mongo_db.schema import Message
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.app.utilities.query_embedder import QueryEmbedder
+from .process_file import SRC_DIR_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is not locked
+    fcntl = None
+
+logger = logging.getLogger("uvicorn.error")
+
+TURN_JOURNAL_PATH = os.path.join(SRC_DIR_PATH, "data", "turn_journal.jsonl")
+
+
+class PendingTurn(BaseModel):
+    """A chat turn accepted but not yet written to MongoDB and Qdrant, as stored in the journal."""
+    message_id: str = Field(default_factory=lambda: str(ObjectId()))
+    point_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    chat_id: str
+    role: str
+    content: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_message(self) -> Message:
+        return Message(
+            _id=ObjectId(self.message_id),
+            chat_id=self.chat_id,
+            role=self.role,
+            content=self.content,
+            timestamp=self.timestamp,
+        )
+
+
+def _sort_key(message: Message) -> datetime:
+    # Mongo hands back naive UTC datetimes, pending turns carry aware ones
+    timestamp = message.timestamp
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class TurnWriter:
+    """Write-behind persistence of chat turns through an append-only journal flushed in batches."""
+
+    def __init__(
+        self,
+        message_model: MessageModel,
+        qdrant_model: QdrantdbModel,
+        query_embedder: QueryEmbedder,
+        history_collection: str,
+        journal_path: str = TURN_JOURNAL_PATH,
+        batch_size: int = 64,
+        flush_interval_ms: float = 500,
+    ):
+        self.message_model = message_model
+        self.qdrant_model = qdrant_model
+        self.query_embedder = query_embedder
+        self.history_collection = history_collection
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._pending: list[PendingTurn] = []
+        self._journal: Optional[TextIO] = None
+        # Guards the journal file and the line counts below, used from worker threads
+        self._journal_lock = threading.Lock()
+        # Turn lines in the journal, and how many of them are committed
+        self._journal_turns = 0
+        self._journal_committed = 0
+        # Appends made, and appends known to be on disk; an fsync covers every append before it
+        self._appended = 0
+        self._synced = 0
+        self._sync_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Reload the turns left in the journal and spawn the flush task on the running event loop."""
+        self._open_journal()
+        self._pending = self._read_journal()
+        # Drops committed turns and a torn last line, so the next append starts on a line of its own
+        self._compact_journal()
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} chat turns from {self.journal_path}")
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run(), name="turn-writer")
+
+    async def stop(self):
+        """Stop the flush task and write what is still pending; turns that fail stay in the journal."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._journal is not None:
+            # Closing the file releases its lock
+            self._journal.close()
+            self._journal = None
+
+    async def add(self, chat_id: str, role: str, content: str):
+        """Accept a turn: it is durable once this returns, and written to the stores later."""
+        turn = PendingTurn(chat_id=chat_id, role=role, content=content)
+        await asyncio.to_thread(self._append_journal, turn)
+        self._appended += 1
+        self._pending.append(turn)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        await self._sync_journal(self._appended)
+
+    def with_pending(self, chat_id: str, messages: list[Message]) -> list[Message]:
+        """The given stored messages of a chat plus its turns not written yet, oldest first."""
+        stored_ids = {str(message.id) for message in messages}
+        pending = [
+            turn.to_message() for turn in self._pending
+            if turn.chat_id == chat_id and turn.message_id not in stored_ids
+        ]
+        return sorted(messages + pending, key=_sort_key)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Write pending turns batch by batch; returns False if a batch failed and was kept for later."""
+        async with self._flush_lock:
+            while self._pending:
+                # Turns are only appended, so the head of the list stays the batch being written
+                batch = self._pending[:self.batch_size]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} chat turns, retrying later: {e}")
+                    return False
+                del self._pending[:len(batch)]
+                await asyncio.to_thread(self._commit_journal, [turn.message_id for turn in batch])
+            return True
+
+    async def _write(self, batch: list[PendingTurn]):
+        vectors = await asyncio.gather(*(self.query_embedder.embed(turn.content) for turn in batch))
+        payloads = [
+            {
+                "chat_id": turn.chat_id,
+                "content": turn.content,
+                "role": turn.role,
+                "timestamp": turn.timestamp.isoformat(),
+                "type": "history_memory",
+            }
+            for turn in batch
+        ]
+        await asyncio.gather(
+            self.message_model.insert_messages([turn.to_message() for turn in batch]),
+            self.qdrant_model.upsert_points(
+                collection_name=self.history_collection,
+                vectors=list(vectors),
+                payloads=payloads,
+                ids=[turn.point_id for turn in batch],
+            ),
+        )
+
+    def _open_journal(self):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._journal.close()
+                self._journal = None
+                raise RuntimeError(
+                    f"{self.journal_path} is used by another process; run a single worker "
+                    "or give each worker its own TURN_JOURNAL_PATH"
+                )
+
+    def _read_journal(self) -> list[PendingTurn]:
+        """Turns of the journal that no commit line lists, in the order they were accepted."""
+        turns: dict[str, PendingTurn] = {}
+        with open(self.journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                    if "committed" in entry:
+                        for message_id in entry["committed"]:
+                            turns.pop(message_id, None)
+                    else:
+                        turn = PendingTurn.model_validate(entry)
+                        turns[turn.message_id] = turn
+                except ValueError:
+                    # Torn last line of a crash mid-append; that turn was never acknowledged
+                    logger.warning(f"Skipping an unreadable line of {self.journal_path}")
+        return list(turns.values())
+
+    def _compact_journal(self):
+        """Rewrite the journal with the pending turns only; runs at startup, before any append."""
+        with self._journal_lock:
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as journal:
+                journal.writelines(turn.model_dump_json() + "\n" for turn in self._pending)
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(tmp_path, self.journal_path)
+            # The lock is held on the open file, which now points to the replaced one: reopen and relock
+            self._journal.close()
+            self._open_journal()
+            self._journal_turns = len(self._pending)
+            self._journal_committed = 0
+
+    def _append_journal(self, turn: PendingTurn):
+        with self._journal_lock:
+            self._journal.write(turn.model_dump_json() + "\n")
+            self._journal.flush()
+            self._journal_turns += 1
+
+    async def _sync_journal(self, appended: int):
+        """Wait until the first appended turns are on disk; concurrent callers share one fsync."""
+        async with self._sync_lock:
+            if self._synced >= appended:
+                return
+            target = self._appended
+            await asyncio.to_thread(os.fsync, self._journal.fileno())
+            self._synced = target
+
+    def _commit_journal(self, message_ids: list[str]):
+        """Record that these turns were written, or empty the journal once every turn in it is."""
+        with self._journal_lock:
+            self._journal_committed += len(message_ids)
+            if self._journal_committed == self._journal_turns:
+                self._journal.truncate(0)
+                self._journal_turns = self._journal_committed = 0
+            else:
+                self._journal.write(json.dumps({"committed": message_ids}) + "\n")
+            self._journal.flush()
@@ -1,5 +1,8 @@
+import asyncio
 import gradio as gr
 import httpx
+import json
+import time
 import uuid
 import logging
 import os
@@ -7,6 +10,7 @@ import os
 # System Configuration
 BACKEND_URL = "http://127.0.0.1:8000"
 TIMEOUT = 300.0
+JOB_POLL_INTERVAL = 1.0
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -91,16 +95,47 @@ async def handle_file_workflow(files, chat_id, persona_name, persona_instruction
             process_resp = await client.post(f"{BACKEND_URL}/data/process", json=process_payload)
             
             if process_resp.status_code == 200:
-                process_data = process_resp.json()
-                processed_count = len(process_data.get("processed", []))
-                return f"Operation Successful: {uploaded_count} uploaded, {processed_count} indexed."
-            
-            return f"Processing Incomplete: Server returned status {process_resp.status_code}."
+                return f"Operation Successful: {uploaded_count} uploaded, nothing new to index."
+            if process_resp.status_code != 202:
+                return f"Processing Incomplete: Server returned status {process_resp.status_code}."
+
+            # Ingestion runs in the background; poll the job until every file is done
+            job_id = process_resp.json()["job_id"]
+            while True:
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                job_resp = await client.get(f"{BACKEND_URL}/data/jobs/{job_id}")
+                if job_resp.status_code != 200:
+                    return f"Processing Incomplete: Server returned status {job_resp.status_code}."
+                job = job_resp.json()
+                if job["status"] in ("completed", "failed"):
+                    break
+
+            indexed_count = sum(1 for f in job["files"] if f["status"] == "indexed")
+            return f"Operation Successful: {uploaded_count} uploaded, {indexed_count} indexed."
         except Exception as e:
             return f"System Error: {str(e)}"
 
+async def stream_chat_tokens(client, payload):
+    """Yields the answer tokens of LangServe's /chat/stream server-sent events as they arrive."""
+    async with client.stream("POST", f"{BACKEND_URL}/chat/stream", json=payload) as response:
+        if response.status_code != 200:
+            body = (await response.aread()).decode("utf-8", errors="replace")
+            raise RuntimeError(f"Backend Error ({response.status_code}): {body}")
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):].strip() or "null")
+                if event == "data" and data:
+                    yield data
+                elif event == "error":
+                    raise RuntimeError(f"Backend Error ({data.get('status_code')}): {data.get('message')}")
+            elif not line:
+                event = None
+
 async def handle_user_message(message, history, chat_id):
-    """Processes the message, updates UI immediately, and yields backend response."""
+    """Processes the message, updates UI immediately, and renders the answer as its tokens stream in."""
     if not message.strip():
         yield history, ""
         return
@@ -117,15 +152,26 @@ async def handle_user_message(message, history, chat_id):
     yield history, ""
 
     payload = {"input": {"question": message, "chat_id": chat_id}}
+    started = time.perf_counter()
+    first_token_seconds = None
 
     async with httpx.AsyncClient(timeout=120.0) as client:
         try:
-            response = await client.post(f"{BACKEND_URL}/chat/invoke", json=payload)
-            if response.status_code == 200:
-                result = response.json()
-                history[-1]["content"] = result.get("output", "Error: Unrecognized format.")
+            async for token in stream_chat_tokens(client, payload):
+                if first_token_seconds is None:
+                    first_token_seconds = time.perf_counter() - started
+                    history[-1]["content"] = ""
+                history[-1]["content"] += token
+                yield history, ""
+            if first_token_seconds is None:
+                history[-1]["content"] = "Error: The backend returned an empty answer."
             else:
-                history[-1]["content"] = f"Backend Error ({response.status_code}): {response.text}"
+                logger.info(
+                    f"Chat {chat_id}: first token after {first_token_seconds:.2f}s, "
+                    f"full answer after {time.perf_counter() - started:.2f}s"
+                )
+        except RuntimeError as e:
+            history[-1]["content"] = str(e)
         except Exception as e:
             history[-1]["content"] = f"Network Exception: {str(e)}"
             
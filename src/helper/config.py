@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings ,SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,13 +7,18 @@ class Settings(BaseSettings):
     FILE_ALLOWED_TYPES: list[str]
     FILE_MAX_SIZE_MB: int
     FILE_UPLOAD_CHUNK_SIZE: int
+    UPLOAD_TTL_HOURS: float = 24 # resumable uploads not completed by then are deleted
     
     # Chunk Config
     CHUNK_SIZE: int
     CHUNK_OVERLAP: int
+    SPLITTER_MODE: str = "recursive" # "recursive" or "offset"
+    SPLITTER_TOKENIZER: str = "" # HuggingFace tokenizer; when set, the offset splitter counts chunk sizes in tokens
     
     # Vector Store Config
-    VECTOR_STORE_TYPE: str
+    VECTOR_STORE_TYPE: str # "qdrant" or "numpy" (in-process, memory-mapped)
+    NUMPY_STORE_DIR: str = "" # numpy store directory (default: src/data/vector_store)
+    EMBEDDING_PROVIDER: str = "ollama" # "ollama" or "fastembed"
     EMBEDDING_MODEL: str
     EMBED_MODEL_SIZE: int
     DISTANCE_METRIC: str
@@ -20,6 +26,61 @@ class Settings(BaseSettings):
     QDRANT_API_KEY: str
     COLLECTION_APP_NAME: str
     COLLECTION_CHATS_HISTORY_NAME: str
+    QDRANT_QUANTIZATION: str = "none" # "none", "scalar", "product" or "binary"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_PQ_COMPRESSION: str = "x16" # product quantization: x4, x8, x16, x32 or x64
+    QDRANT_SEARCH_RESCORE: bool = True
+    QDRANT_SEARCH_OVERSAMPLING: float = 2.0
+    QDRANT_TENANT_LAYOUT: bool = True # per-chat HNSW graphs (m=0 + payload_m) for collections created from now on
+    QDRANT_HNSW_PAYLOAD_M: int = 16
+
+    # Hybrid Search Config
+    HYBRID_SEARCH_ENABLED: bool = False # opt-in: needs fastembed and a collection created with the sparse vector
+    SPARSE_EMBEDDING_MODEL: str = "Qdrant/bm25" # any fastembed sparse model, e.g. prithivida/Splade_PP_en_v1
+    SPARSE_EMBEDDING_IDF: bool = True # BM25/BM42 need Qdrant's IDF modifier, SPLADE does not
+    HYBRID_PREFETCH_LIMIT: int = 30 # candidates per dense/sparse branch before fusion
+
+    # Semantic Cache Config
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95 # cosine similarity of standalone questions
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_CHAT: int = 64
+    SEMANTIC_CACHE_MAX_CHATS: int = 1000
+    SEMANTIC_CACHE_ANSWERS: bool = False # also reuse answers; they ignore the rest of the chat history
+
+    # Chat Latency Config
+    LATENCY_STATS_WINDOW: int = 1000 # most recent answers the latency percentiles are computed over
+
+    # Chat Persistence Config
+    TURN_WRITE_BEHIND_ENABLED: bool = True # journal turns and write them in batches off the response path
+    TURN_FLUSH_BATCH_SIZE: int = 64
+    TURN_FLUSH_INTERVAL_MS: float = 500
+    TURN_JOURNAL_PATH: str = "" # defaults to src/data/turn_journal.jsonl
+
+    # Query Router Config
+    QUERY_ROUTER_ENABLED: bool = True # skip rephrasing on first turns and retrieval for small talk
+
+    # Speculative Retrieval Config
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = True # search the raw question while the rephrase LLM runs
+    SPECULATIVE_RETRIEVAL_THRESHOLD: float = 0.92 # cosine similarity above which the standalone question reuses it
+
+    # Context Packing Config
+    CONTEXT_MAX_TOKENS: int = 3000 # retrieved chunks and memories in the prompt
+    CONTEXT_HISTORY_MAX_TOKENS: int = 1000 # recent chat messages in the prompt
+    CONTEXT_HISTORY_MESSAGES: int = 10 # recent messages fetched before trimming
+    CONTEXT_MAX_DOCUMENTS: int = 8
+    CONTEXT_MIN_SCORE: float = 0.3 # minimum similarity of dense-only hits (Cosine/Dot); distances and fused hybrid hits are not thresholded
+    CONTEXT_MIN_RERANK_SCORE: float = -5.0 # minimum cross-encoder score when reranking
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8 # shingle overlap (Jaccard) above which a chunk is a near-duplicate
+    CONTEXT_MMR_LAMBDA: float = 0.7 # 1 = relevance only, 0 = diversity only
+    CONTEXT_TOKENIZER: str = "" # HuggingFace tokenizer of the LLM; empty = ~4 characters per token
+
+    # Reranking Config
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "Xenova/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 30 # chunks retrieved before reranking
+    RERANK_TOP_N: int = 5 # chunks kept after reranking
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_CACHE_SIZE: int = 10000 # cached (query, chunk) scores
     
     # MongoDB Config
     MONGODB_URL: str
@@ -34,10 +95,41 @@ class Settings(BaseSettings):
     API_KEY_GROQ: str
     API_URL_LLM: str # Use it if you want to run ollama
     LLM_TEMPERATURE: float
+
+    # Ingestion Config
+    INGESTION_WORKERS: int = 4
+    INGESTION_JOB_HISTORY: int = 500
+    PARSE_WORKERS: int = 0 # 0 uses every CPU core
+    PARSE_PDF_PAGES_PER_TASK: int = 50
+    INGESTION_EMBED_BATCH_SIZE: int = 64
+    INGESTION_EMBED_CONCURRENCY: int = 4 # upper bound of embedding batches in flight
+    INGESTION_EMBED_TARGET_LATENCY_MS: int = 5000 # batches slower than this shrink the in-flight window
+    INGESTION_EMBED_RETRIES: int = 3
+    INGESTION_EMBED_RETRY_BACKOFF_MS: int = 500
+    INGESTION_UPSERT_BATCH_SIZE: int = 256
+    INGESTION_QUEUE_SIZE: int = 4
+
+    # FastEmbed Config (EMBEDDING_PROVIDER=fastembed)
+    FASTEMBED_BATCH_SIZE: int = 64
+    FASTEMBED_THREADS: int = 0 # 0 lets ONNX runtime use every CPU core
+    FASTEMBED_CACHE_DIR: str = "" # where models are downloaded; fastembed's default when empty
+
+    # Embedding Cache Config
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_MEMORY_ITEMS: int = 10000
+    EMBED_CACHE_DISK_MAX_MB: int = 1024 # 0 keeps the cache in memory only
+    EMBED_CACHE_DIR: str = "" # defaults to src/data/embed_cache
+
+    # Query Embedding Config
+    QUERY_EMBED_MAX_BATCH_SIZE: int = 32
+    QUERY_EMBED_MAX_WAIT_MS: float = 5
     
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+    # Frozen: one instance is shared by the whole process
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
 
+@lru_cache
 def get_settings():
+    """The process-wide settings; .env and the environment are read on the first call only."""
     return Settings()
 
 if __name__ == "__main__":
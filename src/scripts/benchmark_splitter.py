@@ -0,0 +1,91 @@
+"""
+Compares the throughput of the langchain RecursiveCharacterTextSplitter with the native OffsetTextSplitter.
+
+    python -m src.scripts.benchmark_splitter --pages 2000
+    python -m src.scripts.benchmark_splitter --pdf path/to/manual.pdf
+"""
+import argparse
+import random
+import time
+import pymupdf
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.app.utilities.splitter import OffsetTextSplitter
+
+WORDS = (
+    "retrieval vector embedding chunk document page index query context model token "
+    "qdrant mongo upload process persona citation answer question section figure table"
+).split()
+
+
+def synthetic_pages(num_pages: int, seed: int = 7) -> list[str]:
+    """Builds pages of ~3,000 characters with sentences and paragraphs, like extracted PDF text."""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(num_pages):
+        paragraphs = []
+        for _ in range(rng.randint(4, 8)):
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + "."
+                for _ in range(rng.randint(2, 5))
+            ]
+            paragraphs.append(" ".join(sentences))
+        pages.append("\n\n".join(paragraphs))
+    return pages
+
+
+def pdf_pages(file_path: str) -> list[str]:
+    with pymupdf.open(file_path) as pdf:
+        return [page.get_text() for page in pdf]
+
+
+def run(name: str, splitter, pages: list[str], repeat: int) -> dict:
+    metadatas = [{"page": i} for i in range(len(pages))]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        documents = splitter.create_documents(texts=pages, metadatas=metadatas)
+        best = min(best, time.perf_counter() - started)
+    return {
+        "name": name,
+        "chunks": len(documents),
+        "seconds": best,
+        "chunks_per_sec": len(documents) / best,
+        "mb_per_sec": sum(len(p) for p in pages) / best / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to split instead of synthetic pages")
+    parser.add_argument("--pages", type=int, default=2000, help="number of synthetic pages")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per splitter, the best one is reported")
+    args = parser.parse_args()
+
+    pages = pdf_pages(args.pdf) if args.pdf else synthetic_pages(args.pages)
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.1f} M characters\n")
+
+    results = [
+        run(
+            "recursive (langchain)",
+            RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+            pages,
+            args.repeat,
+        ),
+        run(
+            "offset (native)",
+            OffsetTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+            pages,
+            args.repeat,
+        ),
+    ]
+
+    print(f"{'splitter':<24}{'chunks':>10}{'seconds':>10}{'chunks/s':>12}{'MB/s':>8}")
+    for r in results:
+        print(f"{r['name']:<24}{r['chunks']:>10}{r['seconds']:>10.3f}{r['chunks_per_sec']:>12.0f}{r['mb_per_sec']:>8.1f}")
+    print(f"\nspeedup: {results[0]['seconds'] / results[1]['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares per-chat search latency of the in-process numpy vector store with Qdrant on synthetic vectors.
+Both stores get the same points, spread over several chats, and answer the same chat-filtered queries.
+
+    python -m src.scripts.benchmark_vector_store --chats 50 --points-per-chat 2000
+    python -m src.scripts.benchmark_vector_store --qdrant-url :memory:   # Qdrant local mode, no server
+    python -m src.scripts.benchmark_vector_store --skip-qdrant
+"""
+import time
+import uuid
+import shutil
+import argparse
+import asyncio
+import tempfile
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from src.app.database.numpydb import NumpyVectorStore
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.helper.config import get_settings, Settings
+
+COLLECTION_NAME = "benchmark_vectors"
+UPSERT_BATCH_SIZE = 512
+
+
+def synthetic_points(num_chats: int, points_per_chat: int, dim: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_chats * points_per_chat, dim), dtype=np.float32)
+    payloads = [
+        {"chat_id": f"chat-{i % num_chats}", "file_id": f"file-{i % (num_chats * 3)}", "chunk_hash": str(i)}
+        for i in range(len(vectors))
+    ]
+    ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+    return vectors, payloads, ids
+
+
+async def run(name: str, store, vectors: np.ndarray, payloads: list[dict], ids: list[str], queries: np.ndarray, num_chats: int, limit: int) -> dict:
+    await store.create_collection_if_not_exists(COLLECTION_NAME, vectors.shape[1])
+    started = time.perf_counter()
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        end = start + UPSERT_BATCH_SIZE
+        await store.upsert_points(COLLECTION_NAME, vectors[start:end].tolist(), payloads[start:end], ids[start:end])
+    upsert_seconds = time.perf_counter() - started
+
+    latencies = []
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        await store.search(COLLECTION_NAME, query.tolist(), f"chat-{i % num_chats}", limit, ["chunk_hash"])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+    return {
+        "name": name,
+        "upsert_seconds": upsert_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "qps": len(latencies) / (latencies.sum() / 1000),
+    }
+
+
+async def main_async(args):
+    settings: Settings = get_settings()
+    vectors, payloads, ids = synthetic_points(args.chats, args.points_per_chat, args.dim)
+    queries = np.random.default_rng(11).standard_normal((args.queries, args.dim), dtype=np.float32)
+    print(f"{len(ids)} points of dim {args.dim} in {args.chats} chats, {args.queries} queries, top {args.limit}\n")
+
+    results = []
+    directory = tempfile.mkdtemp(prefix="numpy_store_")
+    try:
+        results.append(
+            await run("numpy", NumpyVectorStore(directory), vectors, payloads, ids, queries, args.chats, args.limit)
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if not args.skip_qdrant:
+        qdrant_url = args.qdrant_url or settings.URL_QDRANT
+        qdrant_client = AsyncQdrantClient(location=qdrant_url) if qdrant_url == ":memory:" else AsyncQdrantClient(url=qdrant_url)
+        try:
+            if await qdrant_client.collection_exists(COLLECTION_NAME):
+                await qdrant_client.delete_collection(COLLECTION_NAME)
+            results.append(
+                await run(f"qdrant ({qdrant_url})", QdrantdbModel(qdrant_client), vectors, payloads, ids, queries, args.chats, args.limit)
+            )
+            await qdrant_client.delete_collection(COLLECTION_NAME)
+        finally:
+            await qdrant_client.close()
+
+    print(f"{'store':<36}{'upsert s':>10}{'p50 ms':>10}{'p95 ms':>10}{'qps':>10}")
+    for r in results:
+        print(f"{r['name']:<36}{r['upsert_seconds']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['qps']:>10.0f}")
+    if len(results) == 2:
+        print(f"\np50 speedup of numpy: {results[1]['p50_ms'] / results[0]['p50_ms']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--points-per-chat", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--qdrant-url", help="Qdrant to compare with (default: URL_QDRANT; ':memory:' for local mode)")
+    parser.add_argument("--skip-qdrant", action="store_true", help="only benchmark the numpy store")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
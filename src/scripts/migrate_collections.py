@@ -0,0 +1,175 @@
+"""
+Re-lays-out existing Qdrant collections for per-chat search: keyword payload indexes (chat_id as tenant
+index) and per-chat HNSW graphs, as configured by QDRANT_TENANT_LAYOUT and QDRANT_HNSW_PAYLOAD_M.
+
+Every point is copied into a new collection, the point counts are compared, and the original name is
+turned into an alias of the new collection, so the app keeps using the same collection names.
+With HYBRID_SEARCH_ENABLED, a documents collection created without the sparse vector gets it: the sparse
+vector of every point is computed from its chunk text while it is copied.
+Run it with the app stopped: points written during the copy would be lost.
+
+    python -m src.scripts.migrate_collections                   # both app collections
+    python -m src.scripts.migrate_collections --collection my_documents --batch-size 512
+"""
+import time
+import argparse
+import asyncio
+from typing import Optional
+from pymongo import AsyncMongoClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation, PointStruct, Record
+from src.app.database.mongo_db import ChunkModel
+from src.app.database.qdrantdb.QdrantdbEnum import VectorName
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.app.utilities.embeder import get_sparse_embeder
+from src.app.utilities.fastembed_embeddings import FastEmbedSparseEmbeddings
+from src.helper.config import get_settings, Settings
+
+
+async def resolve_alias(qdrant_client: AsyncQdrantClient, name: str):
+    """The collection an alias points to, or None when name is not an alias."""
+    aliases = await qdrant_client.get_aliases()
+    return next((a.collection_name for a in aliases.aliases if a.alias_name == name), None)
+
+
+async def with_sparse_vectors(
+    records: list[Record], sparse_embeder: FastEmbedSparseEmbeddings, chunk_model: ChunkModel
+) -> list[dict]:
+    """Named dense and sparse vectors of the records; the sparse ones are computed from the chunk texts."""
+    chunk_texts = await chunk_model.find_contents([
+        record.payload.get("chunk_hash") for record in records
+        if "chunk_content" not in record.payload and record.payload.get("chunk_hash")
+    ])
+    texts = [
+        record.payload.get("chunk_content") or chunk_texts.get(record.payload.get("chunk_hash"), "")
+        for record in records
+    ]
+    sparse_vectors = await asyncio.to_thread(sparse_embeder.embed_documents, texts)
+    return [
+        {VectorName.DENSE.value: record.vector, VectorName.SPARSE.value: sparse_vector}
+        for record, sparse_vector in zip(records, sparse_vectors)
+    ]
+
+
+async def copy_points(
+    qdrant_client: AsyncQdrantClient,
+    source: str,
+    target: str,
+    batch_size: int,
+    sparse_embeder: Optional[FastEmbedSparseEmbeddings] = None,
+    chunk_model: Optional[ChunkModel] = None,
+) -> int:
+    """Copies every point of source into target; with sparse_embeder, the sparse vectors are backfilled."""
+    copied = 0
+    offset = None
+    while True:
+        records, offset = await qdrant_client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if records:
+            vectors = (
+                await with_sparse_vectors(records, sparse_embeder, chunk_model)
+                if sparse_embeder is not None
+                else [record.vector for record in records]
+            )
+            await qdrant_client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=record.id, vector=vector, payload=record.payload)
+                    for record, vector in zip(records, vectors)
+                ],
+                wait=True
+            )
+            copied += len(records)
+            print(f"  {copied} points copied")
+        if offset is None:
+            return copied
+
+
+async def migrate(qdrant_model: QdrantdbModel, name: str, batch_size: int, chunk_model: ChunkModel):
+    settings: Settings = get_settings()
+    qdrant_client = qdrant_model.qdrant_client
+    source = await resolve_alias(qdrant_client, name) or name
+    info = await qdrant_client.get_collection(source)
+    vectors_config = info.config.params.vectors
+    if isinstance(vectors_config, dict):
+        vectors_config = vectors_config[VectorName.DENSE.value]
+    sparse = VectorName.SPARSE.value in (info.config.params.sparse_vectors or {})
+    # Only the documents collection is searched with hybrid search
+    backfill_sparse = not sparse and settings.HYBRID_SEARCH_ENABLED and name == settings.COLLECTION_APP_NAME
+
+    target = f"{name}_{int(time.time())}"
+    print(f"{name}: copying {source} into {target}" + (", adding sparse vectors" if backfill_sparse else ""))
+    await qdrant_model.create_collection(target, vectors_config.size, sparse or backfill_sparse)
+    await qdrant_model.create_payload_indexes(target)
+    await copy_points(
+        qdrant_client, source, target, batch_size,
+        sparse_embeder=get_sparse_embeder() if backfill_sparse else None,
+        chunk_model=chunk_model,
+    )
+
+    source_count = (await qdrant_client.count(source, exact=True)).count
+    target_count = (await qdrant_client.count(target, exact=True)).count
+    if source_count != target_count:
+        await qdrant_client.delete_collection(target)
+        raise RuntimeError(
+            f"{name}: {target} has {target_count} points but {source} has {source_count}; was the app running?"
+        )
+
+    if source == name:
+        # An alias cannot shadow a collection: the original must go before its name can point to the copy
+        await qdrant_client.delete_collection(source)
+        await qdrant_client.update_collection_aliases(
+            change_aliases_operations=[CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=name))]
+        )
+    else:
+        # Migrated before: switch the alias atomically, then drop the previous copy
+        await qdrant_client.update_collection_aliases(
+            change_aliases_operations=[
+                DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=name)),
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=name)),
+            ]
+        )
+        await qdrant_client.delete_collection(source)
+    print(f"{name}: {target_count} points, now an alias of {target}")
+
+
+async def run(collection_names: list[str], batch_size: int):
+    settings: Settings = get_settings()
+    # Chunk texts live in Mongo; they are read to compute missing sparse vectors
+    mongo_conn = AsyncMongoClient(settings.MONGODB_URL)
+    qdrant_client = AsyncQdrantClient(url=settings.URL_QDRANT)
+    chunk_model = await ChunkModel.create_instance(mongo_conn[settings.MONGODB_DATABASE])
+    qdrant_model = QdrantdbModel(qdrant_client)
+    try:
+        for collection_name in collection_names:
+            if not await qdrant_client.collection_exists(collection_name):
+                print(f"{collection_name}: does not exist, skipped")
+                continue
+            await migrate(qdrant_model, collection_name, batch_size, chunk_model)
+    finally:
+        await qdrant_client.close()
+        await mongo_conn.close()
+
+
+def main():
+    settings: Settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--collection",
+        action="append",
+        help="collection to migrate, can be repeated (default: the documents and chat history collections)",
+    )
+    parser.add_argument("--batch-size", type=int, default=256, help="points copied per request (default: 256)")
+    args = parser.parse_args()
+
+    collection_names = args.collection or [settings.COLLECTION_APP_NAME, settings.COLLECTION_CHATS_HISTORY_NAME]
+    asyncio.run(run(collection_names, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
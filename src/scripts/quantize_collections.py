@@ -0,0 +1,69 @@
+"""
+Converts existing Qdrant collections to a quantization mode in place.
+The collections keep serving searches while Qdrant rebuilds the quantized vectors in the background.
+
+    python -m src.scripts.quantize_collections                  # QDRANT_QUANTIZATION, both app collections
+    python -m src.scripts.quantize_collections --mode scalar --wait
+    python -m src.scripts.quantize_collections --mode none      # back to plain float32 in RAM
+"""
+import argparse
+import asyncio
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import CollectionStatus
+from src.app.database.qdrantdb.QdrantdbEnum import QuantizationMode
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.helper.config import get_settings, Settings
+
+POLL_INTERVAL = 2.0
+
+
+async def wait_until_optimized(qdrant_client: AsyncQdrantClient, collection_name: str):
+    while True:
+        info = await qdrant_client.get_collection(collection_name)
+        if info.status == CollectionStatus.GREEN:
+            return info
+        print(f"  {collection_name}: {info.status.value}, optimizing...")
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def run(mode: str, collection_names: list[str], wait: bool):
+    settings: Settings = get_settings()
+    qdrant_client = AsyncQdrantClient(url=settings.URL_QDRANT)
+    qdrant_model = QdrantdbModel(qdrant_client)
+    try:
+        for collection_name in collection_names:
+            if not await qdrant_client.collection_exists(collection_name):
+                print(f"{collection_name}: does not exist, skipped")
+                continue
+            await qdrant_model.apply_quantization(collection_name, mode)
+            print(f"{collection_name}: quantization set to {mode}")
+            if wait:
+                info = await wait_until_optimized(qdrant_client, collection_name)
+                print(f"  {collection_name}: {info.points_count} points, {info.status.value}")
+    finally:
+        await qdrant_client.close()
+
+
+def main():
+    settings: Settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--mode",
+        choices=[m.value for m in QuantizationMode],
+        default=settings.QDRANT_QUANTIZATION,
+        help="quantization mode (default: QDRANT_QUANTIZATION)",
+    )
+    parser.add_argument(
+        "--collection",
+        action="append",
+        help="collection to convert, can be repeated (default: the documents and chat history collections)",
+    )
+    parser.add_argument("--wait", action="store_true", help="wait until Qdrant finished rebuilding the vectors")
+    args = parser.parse_args()
+
+    collection_names = args.collection or [settings.COLLECTION_APP_NAME, settings.COLLECTION_CHATS_HISTORY_NAME]
+    asyncio.run(run(args.mode, collection_names, args.wait))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Moves the chunk texts of points indexed before the chunk text store into Mongo and strips the
+chunk_content and metadata fields from their payloads. Points indexed since then are already slim.
+Searches keep working while it runs: the retriever reads chunk_content when a point still has it.
+
+    python -m src.scripts.slim_payloads
+    python -m src.scripts.slim_payloads --batch-size 512
+"""
+import hashlib
+import argparse
+import asyncio
+from pymongo import AsyncMongoClient
+from qdrant_client import AsyncQdrantClient
+from src.app.database.mongo_db import ChunkModel
+from src.app.database.qdrantdb.QdrantdbModel import QdrantdbModel
+from src.helper.config import get_settings, Settings
+
+LEGACY_PAYLOAD_FIELDS = ["chunk_content", "metadata"]
+
+
+async def run(batch_size: int):
+    settings: Settings = get_settings()
+    mongo_conn = AsyncMongoClient(settings.MONGODB_URL)
+    qdrant_client = AsyncQdrantClient(url=settings.URL_QDRANT)
+    chunk_model = await ChunkModel.create_instance(mongo_conn[settings.MONGODB_DATABASE])
+    qdrant_model = QdrantdbModel(qdrant_client)
+    collection_name = settings.COLLECTION_APP_NAME
+    scanned = slimmed = 0
+    offset = None
+    try:
+        while True:
+            records, offset = await qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["chunk_content", "chunk_hash"],
+                with_vectors=False
+            )
+            scanned += len(records)
+            legacy = [record for record in records if "chunk_content" in record.payload]
+            if legacy:
+                contents, missing_hashes = {}, []
+                for record in legacy:
+                    content = record.payload["chunk_content"]
+                    chunk_hash = record.payload.get("chunk_hash")
+                    if not chunk_hash:
+                        # Indexed before chunk hashes existed
+                        chunk_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                        missing_hashes.append((record.id, {"chunk_hash": chunk_hash}))
+                    contents[chunk_hash] = content
+                # Texts first: a point must never lose its text before Mongo has it
+                await chunk_model.insert_chunks(contents)
+                await qdrant_model.set_payloads(collection_name, missing_hashes)
+                await qdrant_model.delete_payload_keys(
+                    collection_name, [record.id for record in legacy], LEGACY_PAYLOAD_FIELDS
+                )
+                slimmed += len(legacy)
+                print(f"  {scanned} points scanned, {slimmed} slimmed")
+            if offset is None:
+                break
+        print(f"{collection_name}: {slimmed} of {scanned} points slimmed")
+    finally:
+        await qdrant_client.close()
+        await mongo_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=256, help="points processed per request (default: 256)")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import pytest
+
+# Settings has required fields and is cached on first use, so the tests give it
+# placeholder values before anything under src is imported. Nothing here connects to them.
+TEST_ENV = {
+    "FILE_ALLOWED_TYPES": '["text/plain","application/pdf"]',
+    "FILE_MAX_SIZE_MB": "10",
+    "FILE_UPLOAD_CHUNK_SIZE": "1048576",
+    "CHUNK_SIZE": "512",
+    "CHUNK_OVERLAP": "64",
+    "VECTOR_STORE_TYPE": "numpy",
+    "EMBEDDING_MODEL": "nomic-embed-text",
+    "EMBED_MODEL_SIZE": "4",
+    "DISTANCE_METRIC": "Cosine",
+    "URL_QDRANT": "http://localhost:6333",
+    "QDRANT_API_KEY": "",
+    "COLLECTION_APP_NAME": "test_documents",
+    "COLLECTION_CHATS_HISTORY_NAME": "test_chat_history",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "MONGOBD_USERNAME": "test",
+    "MONGODB_PASSWORD": "test",
+    "MONGODB_DATABASE": "test",
+    "LLM_PROVIDER": "ollama",
+    "LLM_MODEL": "llama3",
+    "API_KEY_GROQ": "",
+    "API_URL_LLM": "http://localhost:11434",
+    "LLM_TEMPERATURE": "0.2",
+}
+
+for name, value in TEST_ENV.items():
+    os.environ.setdefault(name, value)
+
+
+# Imported once the placeholders are set
+from src.app.database.mongo_db.DataBaseEnum import FileStatus  # noqa: E402
+from src.app.database.mongo_db.schema import File  # noqa: E402
+
+
+@pytest.fixture
+def make_file():
+    """Factory of File documents; only file_id is required."""
+    def make(
+        file_id: str, chat_id: str = "chat", status: FileStatus = FileStatus.UPLOADED, content_hash: str = None
+    ) -> File:
+        return File(
+            file_id=file_id,
+            chat_id=chat_id,
+            original_filename=file_id,
+            file_path=f"/tmp/{file_id}",
+            content_hash=content_hash,
+            status=status.value,
+        )
+    return make
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from src.app.database.mongo_db.schema import UploadSession
+from src.app.utilities.chunked_upload import ChunkedUploadStore
+from src.app.utilities.process_file import FileProcessor
+
+
+class FakeSessionModel:
+    def __init__(self, sessions: list[UploadSession]):
+        self.sessions = {session.upload_id: session for session in sessions}
+
+    async def find_session_by_id(self, upload_id):
+        return self.sessions.get(upload_id)
+
+    async def find_sessions_created_before(self, cutoff):
+        return [session for session in self.sessions.values() if session.created_at < cutoff]
+
+    async def delete_session_by_id(self, upload_id):
+        return self.sessions.pop(upload_id, None) is not None
+
+
+def make_session(upload_id: str, age: timedelta = timedelta()) -> UploadSession:
+    return UploadSession(
+        upload_id=upload_id,
+        chat_id="chat",
+        original_filename="doc.txt",
+        content_type="text/plain",
+        total_size=5,
+        created_at=datetime.now(timezone.utc) - age,
+    )
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_second_finalize_is_rejected(tmp_path, monkeypatch):
+    targets = iter(["first", "second"])
+
+    def unique_filepath_for(filename):
+        file_id = next(targets)
+        return str(tmp_path / file_id), file_id
+
+    monkeypatch.setattr(FileProcessor, "unique_filepath_for", unique_filepath_for)
+
+    async def scenario():
+        store = ChunkedUploadStore(FakeSessionModel([make_session("up")]), directory=str(tmp_path / "partial"))
+        await store.append_chunk("up", 0, 5, stream(b"hello"))
+        return await asyncio.gather(store.finalize("up", "doc.txt", 5), store.finalize("up", "doc.txt", 5))
+
+    first, second = asyncio.run(scenario())
+    assert first[1] == "first"
+    assert (tmp_path / "first").read_bytes() == b"hello"
+    assert second is None
+
+
+def test_finalize_rejects_an_incomplete_upload(tmp_path):
+    async def scenario():
+        store = ChunkedUploadStore(FakeSessionModel([make_session("up")]), directory=str(tmp_path))
+        await store.append_chunk("up", 0, 5, stream(b"hel"))
+        return await store.finalize("up", "doc.txt", 5), store.get_offset("up")
+
+    finalized, offset = asyncio.run(scenario())
+    assert finalized is None
+    assert offset == 3
+
+
+def test_sweep_removes_expired_uploads_and_orphaned_partial_files(tmp_path):
+    sessions = FakeSessionModel([make_session("old", age=timedelta(hours=48)), make_session("fresh")])
+
+    async def scenario():
+        store = ChunkedUploadStore(sessions, directory=str(tmp_path))
+        for upload_id in ["old", "fresh", "orphan"]:
+            await store.append_chunk(upload_id, 0, 5, stream(b"hel"))
+        long_ago = (datetime.now() - timedelta(hours=48)).timestamp()
+        os.utime(store.partial_path("orphan"), (long_ago, long_ago))
+        return await store.sweep_expired()
+
+    removed = asyncio.run(scenario())
+    assert removed == 2
+    assert sorted(os.listdir(tmp_path)) == ["fresh"]
+    assert list(sessions.sessions) == ["fresh"]
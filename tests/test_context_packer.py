@@ -0,0 +1,91 @@
+from langchain_core.documents import Document
+from src.app.chains.context_packer import ContextPacker, jaccard, shingles
+from src.app.utilities.ProcessEnum import ScoreType
+
+
+def chunk(text: str, score: float = 0.9, score_type: ScoreType = ScoreType.SIMILARITY, **metadata) -> Document:
+    return Document(
+        page_content=text,
+        metadata={"relevance_score": score, "score_type": score_type.value, **metadata},
+    )
+
+
+def make_packer(**overrides) -> ContextPacker:
+    packer = ContextPacker(formatter=lambda doc: doc.page_content)
+    packer.min_score = 0.3
+    packer.min_rerank_score = 0.0
+    packer.dedup_threshold = 0.8
+    packer.mmr_lambda = 0.7
+    packer.max_tokens = 1000
+    packer.max_documents = 8
+    for name, value in overrides.items():
+        setattr(packer, name, value)
+    return packer
+
+
+def test_shingle_overlap():
+    a = shingles("the quick brown fox jumps")
+    assert jaccard(a, a) == 1.0
+    assert jaccard(a, shingles("an entirely different sentence here")) == 0.0
+    assert jaccard(a, set()) == 0.0
+
+
+def test_similarity_hits_below_min_score_are_dropped():
+    packer = make_packer()
+    docs = [chunk("relevant passage about invoices", 0.8), chunk("unrelated passage about weather", 0.1)]
+    assert [doc.page_content for doc in packer.pack_documents(docs)] == ["relevant passage about invoices"]
+
+
+def test_distance_and_fused_scores_are_not_thresholded():
+    packer = make_packer()
+    docs = [
+        # A Euclid distance of 0.1 is a very close match, not a low similarity
+        chunk("close match by euclidean distance", 0.1, ScoreType.DISTANCE),
+        chunk("hybrid hit with a small rrf score", 0.02, ScoreType.RRF),
+    ]
+    assert len(packer.pack_documents(docs)) == 2
+
+
+def test_rerank_score_takes_precedence():
+    packer = make_packer(min_rerank_score=1.0)
+    docs = [chunk("kept by the reranker", 0.1, rerank_score=2.0), chunk("dropped by the reranker", 0.9, rerank_score=-1.0)]
+    assert [doc.page_content for doc in packer.pack_documents(docs)] == ["kept by the reranker"]
+
+
+def test_near_duplicates_are_dropped():
+    packer = make_packer()
+    text = "the invoice total is due within thirty days of delivery"
+    docs = [chunk(text, 0.9), chunk(text + " .", 0.85), chunk("shipping is free above fifty euros", 0.7)]
+    selected = packer.pack_documents(docs)
+    assert [doc.page_content for doc in selected] == [text, "shipping is free above fifty euros"]
+
+
+def test_token_budget_skips_long_chunks_for_shorter_ones():
+    # Without a tokenizer a token is about 4 characters
+    packer = make_packer(max_tokens=10)
+    docs = [chunk("a" * 24, 0.9), chunk("b" * 40, 0.8), chunk("c" * 12, 0.7)]
+    assert [doc.page_content for doc in packer.pack_documents(docs)] == ["a" * 24, "c" * 12]
+
+
+def test_max_documents_caps_the_selection():
+    packer = make_packer(max_documents=2)
+    docs = [chunk(f"distinct passage number {word}", 0.9) for word in ("one", "two", "three")]
+    assert len(packer.pack_documents(docs)) == 2
+
+
+def test_memories_come_first_and_skip_messages_already_in_history():
+    packer = make_packer()
+    in_history = Document(page_content="user: hi", metadata={"source_type": "history", "message": "hi"})
+    older = Document(page_content="user: my name is Sam", metadata={"source_type": "history", "message": "my name is Sam"})
+    docs = [chunk("a relevant chunk of a document", 0.9), in_history, older]
+
+    selected = packer.pack_documents(docs, chat_history="user: hi")
+    assert selected[0] is older
+    assert in_history not in selected
+    assert len(selected) == 2
+
+
+def test_history_keeps_the_most_recent_messages_that_fit():
+    packer = make_packer(history_max_tokens=5)
+    messages = ["a" * 8, "b" * 8, "c" * 8]
+    assert packer.pack_history(messages) == "b" * 8 + "\n" + "c" * 8
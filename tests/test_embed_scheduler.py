@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.app.utilities.embed_scheduler import EmbeddingScheduler
+
+
+class FakeEmbeder:
+    """Embeds each text as [len(text)], optionally failing the first calls or sleeping."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_chunks(self, texts: list[str]) -> list[list[float]]:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.calls <= self.failures
+        try:
+            time.sleep(self.delay)
+            if fail:
+                raise RuntimeError("embedding server unavailable")
+            return [[float(len(text))] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_embeds_a_batch():
+    scheduler = EmbeddingScheduler(FakeEmbeder())
+    assert asyncio.run(scheduler.embed(["a", "bcd"])) == [[1.0], [3.0]]
+
+
+def test_failed_batch_is_retried():
+    embeder = FakeEmbeder(failures=2)
+    scheduler = EmbeddingScheduler(embeder, max_retries=3, retry_backoff_ms=1)
+
+    assert asyncio.run(scheduler.embed(["ab"])) == [[2.0]]
+    assert embeder.calls == 3
+
+
+def test_error_is_raised_once_retries_are_exhausted():
+    embeder = FakeEmbeder(failures=10)
+    scheduler = EmbeddingScheduler(embeder, max_retries=2, retry_backoff_ms=1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler.embed(["ab"]))
+    assert embeder.calls == 3
+    assert scheduler.limit == 1
+
+
+def test_window_grows_with_fast_batches_up_to_max_concurrency():
+    scheduler = EmbeddingScheduler(FakeEmbeder(), max_concurrency=3)
+
+    async def scenario():
+        for _ in range(20):
+            await scheduler.embed(["a"])
+
+    asyncio.run(scenario())
+    assert scheduler.limit == 3
+
+
+def test_slow_batches_halve_the_window():
+    scheduler = EmbeddingScheduler(FakeEmbeder(), max_concurrency=8, target_latency_ms=1000)
+    scheduler._window = 8.0
+    scheduler._on_success(latency=2.0)
+    assert scheduler.limit == 4
+    scheduler._on_congestion()
+    scheduler._on_congestion()
+    scheduler._on_congestion()
+    assert scheduler.limit == 1
+
+
+def test_batches_in_flight_never_exceed_the_window():
+    embeder = FakeEmbeder(delay=0.02)
+    scheduler = EmbeddingScheduler(embeder, max_concurrency=2)
+
+    async def scenario():
+        await asyncio.gather(*(scheduler.embed(["a"]) for _ in range(12)))
+
+    asyncio.run(scenario())
+    assert embeder.max_in_flight <= 2
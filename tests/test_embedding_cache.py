@@ -0,0 +1,33 @@
+import numpy as np
+from src.app.utilities.embedding_cache import DIGEST_SIZE, DiskTier, text_digest
+
+
+def vector(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+
+def test_processes_sharing_a_directory_see_each_other_appends(tmp_path):
+    first = DiskTier(str(tmp_path), dim=4, max_bytes=1 << 20)
+    second = DiskTier(str(tmp_path), dim=4, max_bytes=1 << 20)
+
+    first.put_many([(text_digest("query", "a"), vector(1))])
+    second.put_many([(text_digest("query", "b"), vector(2))])
+
+    assert np.array_equal(second.get(text_digest("query", "a")), vector(1))
+    assert np.array_equal(first.get(text_digest("query", "b")), vector(2))
+    # Neither writer overwrote the other's row
+    assert (tmp_path / "keys.bin").stat().st_size == 2 * DIGEST_SIZE
+
+
+def test_compaction_by_another_process_does_not_return_moved_rows(tmp_path):
+    row_bytes = 4 * 4 + DIGEST_SIZE
+    first = DiskTier(str(tmp_path), dim=4, max_bytes=4 * row_bytes)
+    second = DiskTier(str(tmp_path), dim=4, max_bytes=4 * row_bytes)
+
+    first.put_many([(text_digest("query", str(i)), vector(i)) for i in range(4)])
+    assert np.array_equal(second.get(text_digest("query", "3")), vector(3))
+    # The fifth row makes the first process drop the oldest rows and rewrite both files
+    assert first.put_many([(text_digest("query", "4"), vector(4))]) > 0
+
+    assert second.get(text_digest("query", "0")) is None
+    assert np.array_equal(second.get(text_digest("query", "4")), vector(4))
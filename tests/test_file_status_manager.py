@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.database.mongo_db.FileStatusManager import FileStatusManager
+
+
+class FakeFilesCollection:
+    """Applies the UpdateMany requests of a bulk_write to an in-memory file_id -> status map."""
+
+    def __init__(self, statuses: dict[str, str]):
+        self.statuses = statuses
+
+    async def bulk_write(self, requests, ordered=True):
+        modified = 0
+        for request in requests:
+            query, update = request._filter, request._doc
+            for file_id, file_status in self.statuses.items():
+                if file_id in query["file_id"]["$in"] and file_status in query["status"]["$in"]:
+                    self.statuses[file_id] = update["$set"]["status"]
+                    modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+
+class FakeChatsCollection:
+    async def bulk_write(self, requests, ordered=True):
+        return SimpleNamespace(modified_count=len(requests))
+
+
+def make_manager(statuses: dict[str, str]) -> tuple[FileStatusManager, dict[str, str]]:
+    files = FakeFilesCollection(statuses)
+    manager = FileStatusManager(
+        SimpleNamespace(collection=FakeChatsCollection()), SimpleNamespace(collection=files)
+    )
+    return manager, files.statuses
+
+
+def test_processing_an_indexed_file_is_rejected():
+    manager, statuses = make_manager({"a.txt": FileStatus.INDEXED.value, "b.txt": FileStatus.UPLOADED.value})
+
+    moved = asyncio.run(manager.transition("chat", ["a.txt", "b.txt"], FileStatus.PROCESSING))
+
+    assert moved == 1
+    assert statuses == {"a.txt": FileStatus.INDEXED.value, "b.txt": FileStatus.PROCESSING.value}
+
+
+def test_reindex_claims_an_indexed_file():
+    manager, statuses = make_manager({"a.txt": FileStatus.INDEXED.value})
+
+    assert asyncio.run(manager.reindex("chat", "a.txt"))
+    assert statuses["a.txt"] == FileStatus.PROCESSING.value
+
+
+def test_files_never_move_back_to_uploaded():
+    manager, _ = make_manager({"a.txt": FileStatus.FAILED.value})
+
+    with pytest.raises(ValueError):
+        asyncio.run(manager.transition("chat", ["a.txt"], FileStatus.UPLOADED))
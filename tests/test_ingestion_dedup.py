@@ -0,0 +1,84 @@
+import asyncio
+from src.app.database.mongo_db.schema import File
+from src.app.database.numpydb.NumpyVectorStore import NumpyVectorStore
+from src.app.utilities.ingestion import IngestionService
+from src.app.utilities.job_queue import FileProgress
+from src.helper.config import get_settings
+
+COLLECTION = get_settings().COLLECTION_APP_NAME
+
+
+class FakeFileModel:
+    def __init__(self, files: list[File]):
+        self.files = files
+
+    async def find_indexed_file_by_hash(self, content_hash, exclude_file_id, chat_id=None):
+        candidates = [f for f in self.files if f.content_hash == content_hash and f.file_id != exclude_file_id]
+        candidates.sort(key=lambda f: f.chat_id != chat_id)
+        return candidates[0] if candidates else None
+
+
+async def open_service(directory, files: list[File]) -> tuple[IngestionService, NumpyVectorStore]:
+    store = NumpyVectorStore(str(directory))
+    await store.create_collection_if_not_exists(COLLECTION, vector_size=4)
+    await store.upsert_points(
+        COLLECTION,
+        vectors=[[1, 0, 0, 0], [0, 1, 0, 0]],
+        payloads=[
+            {"chat_id": "chat", "file_id": "a.txt", "chunk_hash": "h1", "page_number": 0},
+            {"chat_id": "chat", "file_id": "a.txt", "chunk_hash": "h2", "page_number": 0},
+        ],
+        ids=["p1", "p2"],
+    )
+    service = IngestionService(FakeFileModel(files), None, None, store, None, embeder=object())
+    return service, store
+
+
+async def file_ids_of(store: NumpyVectorStore, file_id: str) -> dict:
+    return {
+        record.id: record.payload["file_id"]
+        async for records in store.scroll_points_by_file(COLLECTION, file_id, with_vectors=False)
+        for record in records
+    }
+
+
+def test_same_chat_duplicate_is_attached_to_existing_points(tmp_path, make_file):
+    async def scenario():
+        source = make_file("a.txt", content_hash="hash")
+        service, store = await open_service(tmp_path, [source])
+        progress, written_ids, attached = FileProgress(file_id="b.txt"), [], {}
+        reused = await service._reuse_indexed_copy("chat", make_file("b.txt", content_hash="hash"), progress, written_ids, attached)
+        return reused, progress, written_ids, await file_ids_of(store, "b.txt")
+
+    reused, progress, written_ids, points = asyncio.run(scenario())
+    assert reused
+    assert written_ids == [] and progress.points_upserted == 0
+    assert progress.chunks_reused == 2 and progress.reused_from == "a.txt"
+    assert points == {"p1": ["a.txt", "b.txt"], "p2": ["a.txt", "b.txt"]}
+
+
+def test_other_chat_duplicate_gets_its_own_points(tmp_path, make_file):
+    async def scenario():
+        service, store = await open_service(tmp_path, [make_file("a.txt", content_hash="hash")])
+        progress, written_ids = FileProgress(file_id="c.txt"), []
+        await service._reuse_indexed_copy("other", make_file("c.txt", chat_id="other", content_hash="hash"), progress, written_ids, {})
+        return progress, written_ids, await file_ids_of(store, "a.txt")
+
+    progress, written_ids, source_points = asyncio.run(scenario())
+    assert len(written_ids) == 2 and progress.points_upserted == 2
+    assert source_points == {"p1": "a.txt", "p2": "a.txt"}
+
+
+def test_replaced_file_leaves_shared_points_to_the_duplicate(tmp_path, make_file):
+    async def scenario():
+        service, store = await open_service(tmp_path, [make_file("a.txt", content_hash="hash")])
+        await service._reuse_indexed_copy("chat", make_file("b.txt", content_hash="hash"), FileProgress(file_id="b.txt"), [], {})
+        indexed_chunks, shared_ids = await service._load_indexed_chunks("a.txt")
+        await service._detach_from_points("a.txt", shared_ids)
+        return indexed_chunks, shared_ids, await file_ids_of(store, "a.txt"), await file_ids_of(store, "b.txt")
+
+    indexed_chunks, shared_ids, a_points, b_points = asyncio.run(scenario())
+    # Shared points are never offered for reuse or deletion by the replaced file
+    assert indexed_chunks == {} and shared_ids == {"p1", "p2"}
+    assert a_points == {}
+    assert b_points == {"p1": "b.txt", "p2": "b.txt"}
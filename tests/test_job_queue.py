@@ -0,0 +1,135 @@
+import asyncio
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.utilities.job_queue import IngestionJobQueue
+from src.app.utilities.ProcessEnum import JobStatus
+
+
+async def wait_until_finished(queue: IngestionJobQueue, job_ids: list[str]):
+    while not all(queue.get_job(job_id).is_finished() for job_id in job_ids):
+        await asyncio.sleep(0.01)
+
+
+def test_files_of_a_job_are_processed_and_job_completes(make_file):
+    async def scenario():
+        processed = []
+
+        async def handler(chat_id, file_doc, progress):
+            processed.append((chat_id, file_doc.file_id))
+
+        queue = IngestionJobQueue(handler, num_workers=2)
+        queue.start()
+        job = await queue.submit("chat", [make_file("a.txt"), make_file("b.txt")])
+        await wait_until_finished(queue, [job.job_id])
+        await queue.stop()
+        return job, processed
+
+    job, processed = asyncio.run(scenario())
+    assert job.status == JobStatus.COMPLETED.value
+    assert sorted(processed) == [("chat", "a.txt"), ("chat", "b.txt")]
+    assert all(f.status == FileStatus.INDEXED.value for f in job.files)
+
+
+def test_failed_file_is_reported_and_all_failed_job_fails(make_file):
+    async def scenario():
+        async def handler(chat_id, file_doc, progress):
+            raise RuntimeError("parse error")
+
+        queue = IngestionJobQueue(handler, num_workers=1)
+        queue.start()
+        job = await queue.submit("chat", [make_file("a.txt")])
+        await wait_until_finished(queue, [job.job_id])
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == JobStatus.FAILED.value
+    assert job.files[0].status == FileStatus.FAILED.value
+    assert job.files[0].error == "parse error"
+
+
+def test_in_flight_files_are_not_submitted_twice(make_file):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(chat_id, file_doc, progress):
+            await release.wait()
+
+        queue = IngestionJobQueue(handler, num_workers=1)
+        queue.start()
+        first = await queue.submit("chat", [make_file("a.txt")])
+        duplicate = await queue.submit("chat", [make_file("a.txt")])
+        in_flight = queue.is_in_flight("chat", "a.txt")
+        release.set()
+        await wait_until_finished(queue, [first.job_id])
+        await queue.stop()
+        return duplicate, in_flight, queue.is_in_flight("chat", "a.txt")
+
+    duplicate, in_flight_before, in_flight_after = asyncio.run(scenario())
+    assert duplicate is None
+    assert in_flight_before
+    assert not in_flight_after
+
+
+def test_chats_are_served_round_robin(make_file):
+    async def scenario():
+        order = []
+
+        async def handler(chat_id, file_doc, progress):
+            order.append(chat_id)
+
+        queue = IngestionJobQueue(handler, num_workers=1)
+        # Submit before starting the single worker, so the whole backlog is queued at once
+        busy = await queue.submit("busy", [make_file(f"{i}.txt", chat_id="busy") for i in range(3)])
+        quiet = await queue.submit("quiet", [make_file("q.txt", chat_id="quiet")])
+        queue.start()
+        await wait_until_finished(queue, [busy.job_id, quiet.job_id])
+        await queue.stop()
+        return order
+
+    assert asyncio.run(scenario()) == ["busy", "quiet", "busy", "busy"]
+
+
+def test_reserved_file_is_only_queued_by_its_reservation(make_file):
+    async def scenario():
+        async def handler(chat_id, file_doc, progress):
+            pass
+
+        queue = IngestionJobQueue(handler, num_workers=1)
+        queue.start()
+        reserved = queue.reserve("chat", "a.txt")
+        reserved_twice = queue.reserve("chat", "a.txt")
+        skipped = await queue.submit("chat", [make_file("a.txt")])
+        job = await queue.submit("chat", [make_file("a.txt")], reserved=True)
+        await wait_until_finished(queue, [job.job_id])
+        queue.reserve("chat", "b.txt")
+        queue.release("chat", "b.txt")
+        await queue.stop()
+        return reserved, reserved_twice, skipped, job, queue.is_in_flight("chat", "b.txt")
+
+    reserved, reserved_twice, skipped, job, b_in_flight = asyncio.run(scenario())
+    assert reserved and not reserved_twice
+    assert skipped is None
+    assert job.status == JobStatus.COMPLETED.value
+    assert not b_in_flight
+
+
+def test_oldest_finished_jobs_are_pruned(make_file):
+    async def scenario():
+        async def handler(chat_id, file_doc, progress):
+            pass
+
+        queue = IngestionJobQueue(handler, num_workers=1, max_finished_jobs=1)
+        queue.start()
+        job_ids = []
+        for i in range(3):
+            job = await queue.submit("chat", [make_file(f"{i}.txt")])
+            await wait_until_finished(queue, [job.job_id])
+            job_ids.append(job.job_id)
+        await queue.stop()
+        return queue, job_ids
+
+    queue, job_ids = asyncio.run(scenario())
+    # Pruning runs on submit, so the last submit keeps the job before it too
+    assert queue.get_job(job_ids[0]) is None
+    assert queue.get_job(job_ids[1]) is not None
+    assert queue.get_job(job_ids[2]) is not None
@@ -0,0 +1,176 @@
+import asyncio
+import importlib
+import os
+import pytest
+from qdrant_client.models import SparseVector
+from src.app.database.numpydb.NumpyVectorStore import NumpyVectorStore
+
+# The package re-exports the class under the module's name, so fetch the module itself
+numpy_store_module = importlib.import_module("src.app.database.numpydb.NumpyVectorStore")
+
+COLLECTION = "documents"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def open_store(directory) -> NumpyVectorStore:
+    store = NumpyVectorStore(str(directory))
+    await store.create_collection_if_not_exists(COLLECTION, vector_size=4)
+    return store
+
+
+async def add_points(store: NumpyVectorStore):
+    await store.upsert_points(
+        COLLECTION,
+        vectors=[[1, 0, 0, 0], [0.9, 0.1, 0, 0], [0, 1, 0, 0], [1, 0, 0, 0]],
+        payloads=[
+            {"chat_id": "chat-a", "file_id": "a1.txt"},
+            {"chat_id": "chat-a", "file_id": "a2.txt"},
+            {"chat_id": "chat-a", "file_id": "a2.txt"},
+            {"chat_id": "chat-b", "file_id": "b1.txt"},
+        ],
+        ids=["p1", "p2", "p3", "p4"],
+    )
+
+
+async def search_ids(store: NumpyVectorStore, chat_id: str, limit: int = 10) -> list:
+    result = await store.search(COLLECTION, [1, 0, 0, 0], chat_id, limit=limit)
+    return [point.id for point in result.points]
+
+
+def test_search_ranks_points_of_the_chat_by_similarity(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        result = await store.search(COLLECTION, [1, 0, 0, 0], "chat-a", limit=2, with_payload=["file_id"])
+        return result.points
+
+    points = run(scenario())
+    assert [point.id for point in points] == ["p1", "p2"]
+    assert points[0].score == pytest.approx(1.0)
+    assert points[0].score > points[1].score
+    assert points[0].payload == {"file_id": "a1.txt"}
+
+
+def test_chats_never_see_each_others_points(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        return await search_ids(store, "chat-a"), await search_ids(store, "chat-b"), await search_ids(store, "chat-c")
+
+    chat_a, chat_b, unknown = run(scenario())
+    assert sorted(chat_a) == ["p1", "p2", "p3"]
+    assert chat_b == ["p4"]
+    assert unknown == []
+
+
+def test_chat_ids_that_sanitize_alike_get_their_own_segments(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await store.upsert_points(
+            COLLECTION,
+            vectors=[[1, 0, 0, 0], [1, 0, 0, 0]],
+            payloads=[{"chat_id": "team/a"}, {"chat_id": "team_a"}],
+            ids=["slash", "underscore"],
+        )
+        return await search_ids(store, "team/a"), await search_ids(store, "team_a")
+
+    assert run(scenario()) == (["slash"], ["underscore"])
+
+
+def test_upsert_of_an_existing_id_replaces_the_point(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        await store.upsert_points(
+            COLLECTION, vectors=[[0, 0, 0, 1]], payloads=[{"chat_id": "chat-b", "file_id": "b1.txt"}], ids=["p1"]
+        )
+        return await search_ids(store, "chat-a"), await search_ids(store, "chat-b")
+
+    chat_a, chat_b = run(scenario())
+    assert "p1" not in chat_a
+    assert sorted(chat_b) == ["p1", "p4"]
+
+
+def test_delete_by_file_only_removes_that_file(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        await store.delete_points_by_file(COLLECTION, "a2.txt")
+        remaining = [
+            record.id
+            async for batch in store.scroll_points_by_file(COLLECTION, "a2.txt", with_vectors=False)
+            for record in batch
+        ]
+        return await search_ids(store, "chat-a"), await search_ids(store, "chat-b"), remaining
+
+    chat_a, chat_b, remaining = run(scenario())
+    assert chat_a == ["p1"]
+    assert chat_b == ["p4"]
+    assert remaining == []
+
+
+def test_payload_updates(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        await store.set_payload_by_file(COLLECTION, "a2.txt", {"original_filename": "renamed.txt"})
+        await store.set_payloads(COLLECTION, [("p1", {"page_number": 3})])
+        await store.delete_payload_keys(COLLECTION, ["p2"], ["file_id"])
+        result = await store.search(COLLECTION, [1, 0, 0, 0], "chat-a")
+        return {point.id: point.payload for point in result.points}
+
+    payloads = run(scenario())
+    assert payloads["p1"]["page_number"] == 3
+    assert payloads["p2"] == {"chat_id": "chat-a", "original_filename": "renamed.txt"}
+    assert payloads["p3"]["original_filename"] == "renamed.txt"
+
+
+def test_points_survive_reopening_the_store(tmp_path):
+    async def write():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        await store.delete_points(COLLECTION, ["p2"])
+        await store.set_payloads(COLLECTION, [("p1", {"page_number": 7})])
+        await store.close()
+
+    async def reopen():
+        store = await open_store(tmp_path)
+        result = await store.search(COLLECTION, [1, 0, 0, 0], "chat-a")
+        return {point.id: point.payload for point in result.points}, await search_ids(store, "chat-b")
+
+    run(write())
+    chat_a, chat_b = run(reopen())
+    assert sorted(chat_a) == ["p1", "p3"]
+    assert chat_a["p1"]["page_number"] == 7
+    assert chat_b == ["p4"]
+
+
+def test_deleted_rows_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store_module, "COMPACT_MIN_DELETED", 1)
+
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        await store.delete_points(COLLECTION, ["p1", "p2"])
+        segment = store.collections[COLLECTION].segments["chat-a"]
+        return segment, await search_ids(store, "chat-a")
+
+    segment, chat_a = run(scenario())
+    assert chat_a == ["p3"]
+    assert len(segment.ids) == 1
+    assert os.path.getsize(segment.vectors_path) == 4 * 4
+
+
+def test_hybrid_search_falls_back_to_dense_search(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path)
+        await add_points(store)
+        result = await store.hybrid_search(
+            COLLECTION, [1, 0, 0, 0], SparseVector(indices=[1], values=[1.0]), "chat-a", limit=1
+        )
+        return [point.id for point in result.points]
+
+    assert run(scenario()) == ["p1"]
@@ -0,0 +1,46 @@
+import pytest
+from src.app.chains.query_router import checked_question, is_no_search, is_small_talk, normalize, route_query
+from src.app.utilities.ProcessEnum import QueryRoute
+
+
+def test_normalize_strips_case_punctuation_and_spaces():
+    assert normalize("  Hello,   THERE!! 👋 ") == "hello there"
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["Hi!", "hello there", "Thanks a lot :)", "ok thanks bye", "Good morning, bot", "who are you?", "help"],
+)
+def test_small_talk_is_recognized(question):
+    assert is_small_talk(question)
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "hi, what is the refund policy?",
+        "thanks, and what about the second invoice",
+        "What does the contract say about termination?",
+        "help me find the total of the invoice",
+        "",
+    ],
+)
+def test_questions_with_content_are_not_small_talk(question):
+    assert not is_small_talk(question)
+
+
+def test_none_answer_of_the_rephrase_llm_skips_search():
+    assert is_no_search(" None. ")
+    assert not is_no_search("none of the invoices were paid late")
+
+
+def test_relevance_check_of_a_first_turn():
+    assert checked_question("What is the weather in Paris?", "None.") == "none"
+    assert checked_question("What is the total?", "search") == "What is the total?"
+
+
+def test_routes():
+    assert route_query("thank you!", "user: what is the total?") == QueryRoute.SMALL_TALK
+    assert route_query("What is the total?", "") == QueryRoute.DIRECT
+    assert route_query("What is the total?", "  \n") == QueryRoute.DIRECT
+    assert route_query("And the tax?", "user: What is the total?") == QueryRoute.REPHRASE
@@ -0,0 +1,75 @@
+from langchain_core.documents import Document
+from src.app.database.mongo_db.DataBaseEnum import FileStatus
+from src.app.utilities.semantic_cache import SemanticCache, file_fingerprint
+
+DOCS = [Document(page_content="Paris is the capital of France.", metadata={"file_id": "geo.txt"})]
+
+
+def test_fingerprint_only_depends_on_indexed_files(make_file):
+    indexed = [
+        make_file("a.txt", status=FileStatus.INDEXED, content_hash="h1"),
+        make_file("b.txt", status=FileStatus.INDEXED, content_hash="h2"),
+    ]
+    with_pending = indexed + [make_file("c.txt", content_hash="h3")]
+    changed = [make_file("a.txt", status=FileStatus.INDEXED, content_hash="h1-new"), indexed[1]]
+
+    assert file_fingerprint(indexed) == file_fingerprint(list(reversed(with_pending)))
+    assert file_fingerprint(indexed) != file_fingerprint(changed)
+
+
+def test_similar_question_hits_and_dissimilar_misses():
+    cache = SemanticCache(similarity_threshold=0.95)
+    cache.store("chat", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.2)
+
+    assert cache.lookup("chat", [0.99, 0.05], "fp") == DOCS
+    assert cache.lookup("chat", [0.0, 1.0], "fp") is None
+    stats = cache.stats()
+    assert stats["lookups"] == 2 and stats["hits"] == 1
+    assert stats["saved_seconds"] == 0.2
+
+
+def test_entries_are_scoped_to_chat_and_file_fingerprint():
+    cache = SemanticCache()
+    cache.store("chat", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+
+    assert cache.lookup("other-chat", [1.0, 0.0], "fp") is None
+    assert cache.lookup("chat", [1.0, 0.0], "fp-after-reindex") is None
+    # The stale entry was dropped by the lookup with the new fingerprint
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_drops_a_chat():
+    cache = SemanticCache()
+    cache.store("chat", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+    cache.invalidate("chat")
+
+    assert cache.lookup("chat", [1.0, 0.0], "fp") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_entries_and_chats_are_bounded():
+    cache = SemanticCache(max_entries_per_chat=2, max_chats=2)
+    for i in range(3):
+        cache.store("chat-a", [1.0, float(i)], "fp", DOCS, retrieval_seconds=0.1)
+    cache.store("chat-b", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+    cache.store("chat-c", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+
+    stats = cache.stats()
+    assert stats["chats"] == 2
+    # chat-a was the least recently used chat and was evicted
+    assert cache.lookup("chat-a", [1.0, 2.0], "fp") is None
+    assert stats["entries"] == 2
+
+
+def test_answers_are_only_cached_when_enabled():
+    disabled = SemanticCache(cache_answers=False)
+    disabled.store("chat", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+    disabled.store_answer("chat", [1.0, 0.0], "fp", "Paris")
+    assert disabled.lookup_answer("chat", [1.0, 0.0], "fp") is None
+
+    enabled = SemanticCache(cache_answers=True)
+    enabled.store("chat", [1.0, 0.0], "fp", DOCS, retrieval_seconds=0.1)
+    assert enabled.lookup_answer("chat", [1.0, 0.0], "fp") is None
+    enabled.store_answer("chat", [1.0, 0.0], "fp", "Paris")
+    assert enabled.lookup_answer("chat", [0.99, 0.05], "fp") == "Paris"
+    assert enabled.stats()["answer_hits"] == 1
@@ -0,0 +1,80 @@
+import re
+import pytest
+from src.app.utilities.splitter import OffsetTextSplitter
+
+TEXT = (
+    "Retrieval augmented generation grounds answers in documents.\n\n"
+    "Each document is split into chunks. Chunks are embedded and stored. "
+    "At question time the closest chunks are retrieved and passed to the model.\n"
+    "Overlap between chunks keeps sentences that straddle a boundary searchable."
+)
+
+
+class WhitespaceTokenCounter:
+    """Stand-in for TokenCounter: one token per run of non-space characters."""
+
+    def token_offsets(self, text: str) -> list[tuple[int, int]]:
+        return [match.span() for match in re.finditer(r"\S+", text)]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        OffsetTextSplitter(chunk_size=10, chunk_overlap=10)
+
+
+def test_spans_slice_the_original_text_within_chunk_size():
+    splitter = OffsetTextSplitter(chunk_size=80, chunk_overlap=20)
+    spans = list(splitter.split_spans(TEXT))
+
+    assert len(spans) > 1
+    for start, end in spans:
+        chunk = TEXT[start:end]
+        assert 0 < len(chunk) <= 80
+        assert chunk == chunk.strip()
+    # Chunks cover the text from its first to its last character
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(TEXT)
+
+
+def test_consecutive_chunks_overlap_and_advance():
+    splitter = OffsetTextSplitter(chunk_size=80, chunk_overlap=20)
+    spans = list(splitter.split_spans(TEXT))
+
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start < end
+        assert next_end > end
+
+
+def test_chunks_end_on_separators():
+    splitter = OffsetTextSplitter(chunk_size=80, chunk_overlap=0)
+    spans = list(splitter.split_spans(TEXT))
+
+    for _, end in spans[:-1]:
+        # The trimmed chunk ends right before whitespace, never inside a word
+        assert TEXT[end].isspace()
+
+
+def test_text_without_separators_is_cut_at_chunk_size():
+    text = "x" * 25
+    splitter = OffsetTextSplitter(chunk_size=10, chunk_overlap=2)
+    assert list(splitter.split_spans(text)) == [(0, 10), (8, 18), (16, 25)]
+
+
+def test_token_mode_counts_tokens():
+    splitter = OffsetTextSplitter(chunk_size=8, chunk_overlap=2, token_counter=WhitespaceTokenCounter())
+    spans = list(splitter.split_spans(TEXT))
+
+    assert len(spans) > 1
+    for start, end in spans:
+        assert len(TEXT[start:end].split()) <= 8
+    assert spans[-1][1] == len(TEXT)
+
+
+def test_create_documents_records_offsets():
+    splitter = OffsetTextSplitter(chunk_size=80, chunk_overlap=20)
+    documents = splitter.create_documents([TEXT], [{"page_number": 3}])
+
+    for document in documents:
+        start, end = document.metadata["start_index"], document.metadata["end_index"]
+        assert document.page_content == TEXT[start:end]
+        assert document.metadata["page_number"] == 3
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import pytest
+from src.app.utilities.turn_writer import PendingTurn, TurnWriter
+
+
+class FakeMessageModel:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.messages = []
+
+    async def insert_messages(self, messages):
+        if self.fail:
+            raise ConnectionError("mongo is down")
+        self.messages.extend(messages)
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.ids = []
+
+    async def upsert_points(self, collection_name, vectors, payloads, ids, sparse_vectors=None):
+        self.ids.extend(ids)
+
+
+class FakeQueryEmbedder:
+    async def embed(self, text: str) -> list[float]:
+        return [1.0, 0.0]
+
+
+def make_writer(journal_path, message_model=None, batch_size: int = 64) -> TurnWriter:
+    return TurnWriter(
+        message_model or FakeMessageModel(),
+        FakeVectorStore(),
+        FakeQueryEmbedder(),
+        history_collection="history",
+        journal_path=str(journal_path),
+        batch_size=batch_size,
+        flush_interval_ms=60_000,
+    )
+
+
+def journal_lines(journal_path) -> list[dict]:
+    return [json.loads(line) for line in journal_path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_accepted_turns_are_journaled_and_visible_before_they_are_written(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+
+    async def scenario():
+        writer = make_writer(journal_path)
+        writer.start()
+        await asyncio.gather(
+            writer.add("chat", "user", "hello"),
+            writer.add("chat", "assistant", "hi there"),
+        )
+        messages = writer.with_pending("chat", [])
+        lines = journal_lines(journal_path)
+        await writer.stop()
+        return writer, messages, lines
+
+    writer, messages, lines = asyncio.run(scenario())
+    assert [message.content for message in messages] == ["hello", "hi there"]
+    assert [line["content"] for line in lines] == ["hello", "hi there"]
+    # Both appends were covered by a single fsync
+    assert writer._synced == 2
+
+
+def test_written_turns_leave_the_journal(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    message_model = FakeMessageModel()
+
+    async def scenario():
+        writer = make_writer(journal_path, message_model)
+        writer.start()
+        await writer.add("chat", "user", "hello")
+        assert await writer.flush()
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert [message.content for message in message_model.messages] == ["hello"]
+    assert writer.pending_count() == 0
+    # Every turn was committed, so the journal was emptied instead of growing a commit line
+    assert journal_path.read_text(encoding="utf-8") == ""
+
+
+def test_failed_batch_stays_pending_and_is_replayed_on_restart(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+
+    async def first_run():
+        writer = make_writer(journal_path, FakeMessageModel(fail=True))
+        writer.start()
+        await writer.add("chat", "user", "hello")
+        assert not await writer.flush()
+        await writer.stop()
+        return writer.pending_count()
+
+    message_model = FakeMessageModel()
+
+    async def second_run():
+        writer = make_writer(journal_path, message_model)
+        writer.start()
+        replayed = writer.pending_count()
+        await writer.stop()
+        return replayed
+
+    assert asyncio.run(first_run()) == 1
+    assert asyncio.run(second_run()) == 1
+    assert [message.content for message in message_model.messages] == ["hello"]
+
+
+def test_replay_skips_committed_turns_and_a_torn_last_line(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    written = PendingTurn(chat_id="chat", role="user", content="already written")
+    pending = PendingTurn(chat_id="chat", role="assistant", content="not written yet")
+    journal_path.write_text(
+        written.model_dump_json() + "\n"
+        + pending.model_dump_json() + "\n"
+        + json.dumps({"committed": [written.message_id]}) + "\n"
+        + '{"message_id": "torn',
+        encoding="utf-8",
+    )
+
+    async def scenario():
+        writer = make_writer(journal_path)
+        writer.start()
+        messages = writer.with_pending("chat", [])
+        lines = journal_lines(journal_path)
+        await writer.stop()
+        return messages, lines
+
+    messages, compacted = asyncio.run(scenario())
+    assert [message.content for message in messages] == ["not written yet"]
+    assert str(messages[0].id) == pending.message_id
+    # Startup compaction keeps only the pending turn
+    assert [line["message_id"] for line in compacted] == [pending.message_id]
+
+
+class FailingOnContent(FakeMessageModel):
+    async def insert_messages(self, messages):
+        if any(message.content == "second" for message in messages):
+            raise ConnectionError("mongo rejected the batch")
+        await super().insert_messages(messages)
+
+
+def test_partial_flush_appends_a_commit_line(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+
+    async def scenario():
+        writer = make_writer(journal_path, FailingOnContent())
+        writer.start()
+        await writer.add("chat", "user", "first")
+        await writer.add("chat", "user", "second")
+        # Write them one batch at a time: the first one succeeds while the second is still in the journal
+        writer.batch_size = 1
+        assert not await writer.flush()
+        lines = journal_lines(journal_path)
+        await writer.stop()
+        return lines
+
+    first, second, commit = asyncio.run(scenario())
+    assert [first["content"], second["content"]] == ["first", "second"]
+    assert commit == {"committed": [first["message_id"]]}
+
+
+def test_journal_is_locked_to_one_process(tmp_path):
+    pytest.importorskip("fcntl")
+    journal_path = tmp_path / "journal.jsonl"
+
+    async def scenario():
+        writer = make_writer(journal_path)
+        writer.start()
+        try:
+            with pytest.raises(RuntimeError):
+                make_writer(journal_path)._open_journal()
+        finally:
+            await writer.stop()
+        # Released on stop
+        other = make_writer(journal_path)
+        other._open_journal()
+        other._journal.close()
+
+    asyncio.run(scenario())